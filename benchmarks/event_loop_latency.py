@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import statistics
+import time
+import typing
+
+import tenacity
+
+from circuit_breaker_box import Retrier
+
+
+CONCURRENT_RETRIES = 1_000
+MAX_RETRIES = 3
+BACKOFF_IN_SECONDS = 0.05
+PROBE_INTERVAL_IN_SECONDS = 0.005
+
+
+class BlockingRetrier(Retrier[None]):
+    """Reproduces the former behaviour: synchronous tenacity.Retrying inside a coroutine."""
+
+    async def retry(  # type: ignore[override]
+        self,
+        coroutine: typing.Callable[[], typing.Awaitable[None]],
+        /,
+        host: str | None = None,  # noqa: ARG002
+    ) -> None:
+        for attempt in tenacity.Retrying(
+            stop=self.stop_rule,
+            wait=self.wait_strategy,
+            retry=self.retry_cause,
+            reraise=self.reraise,
+        ):
+            with attempt:
+                return await coroutine()
+        msg = "Unreachable code"
+        raise RuntimeError(msg)
+
+
+def build_retrier(retrier_type: type[Retrier[None]]) -> Retrier[None]:
+    return retrier_type(
+        stop_rule=tenacity.stop.stop_after_attempt(MAX_RETRIES),
+        retry_cause=tenacity.retry_if_exception_type(ZeroDivisionError),
+        wait_strategy=tenacity.wait_fixed(BACKOFF_IN_SECONDS),
+    )
+
+
+async def always_failing() -> None:
+    raise ZeroDivisionError
+
+
+async def probe_event_loop_lag(stop_event: asyncio.Event, lags: list[float]) -> None:
+    while not stop_event.is_set():
+        started_at = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL_IN_SECONDS)
+        lags.append(time.perf_counter() - started_at - PROBE_INTERVAL_IN_SECONDS)
+
+
+async def measure(retrier: Retrier[None], concurrency: int) -> tuple[float, list[float]]:
+    lags: list[float] = []
+    stop_event = asyncio.Event()
+    probe_task = asyncio.create_task(probe_event_loop_lag(stop_event, lags))
+    await asyncio.sleep(0)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(
+        *(retrier.retry(always_failing) for _ in range(concurrency)),
+        return_exceptions=True,
+    )
+    elapsed = time.perf_counter() - started_at
+
+    stop_event.set()
+    await probe_task
+    return elapsed, lags
+
+
+def report(name: str, elapsed: float, lags: list[float]) -> None:
+    lags_in_ms = sorted(lag * 1000 for lag in lags) or [0.0]
+    print(  # noqa: T201
+        f"{name:<10} total: {elapsed:8.3f}s  probes: {len(lags_in_ms):5d}  "
+        f"lag p50: {statistics.median(lags_in_ms):9.3f}ms  max: {lags_in_ms[-1]:9.3f}ms"
+    )
+
+
+async def main() -> None:
+    """Measure event-loop responsiveness while CONCURRENT_RETRIES retries sit in backoff.
+
+    The blocking variant only runs a tenth of the load, otherwise it would hold the loop for minutes.
+    """
+    logging.disable(logging.WARNING)
+    elapsed, lags = await measure(build_retrier(Retrier[None]), CONCURRENT_RETRIES)
+    report("async", elapsed, lags)
+
+    elapsed, lags = await measure(build_retrier(BlockingRetrier), CONCURRENT_RETRIES // 10)
+    report("blocking", elapsed, lags)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+import statistics
+import subprocess
+import sys
+import typing
+
+
+RUNS_COUNT = 10
+STATEMENTS: typing.Final = (
+    "import circuit_breaker_box",
+    "from circuit_breaker_box import CircuitBreakerFastInMemory",
+    "from circuit_breaker_box import CircuitBreakerInMemory, Retrier",
+    "from circuit_breaker_box import CircuitBreakerRedis, Retrier",
+    "from circuit_breaker_box import RetryingTransport",
+)
+
+
+class ImportTime(typing.NamedTuple):
+    module_name: str
+    cumulative_time_in_us: int
+    # imported by another module, its time is included in the time of the importing one
+    is_nested: bool
+
+
+def measure_imports(statement: str) -> list[ImportTime]:
+    """Run the statement in a fresh interpreter under -X importtime, return every module it imported."""
+    completed_process: typing.Final = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", statement], capture_output=True, check=True, text=True
+    )
+    imports_times: typing.Final[list[ImportTime]] = []
+    # "import time: self [us] | cumulative | imported package", nested imports are indented
+    for line in completed_process.stderr.splitlines():
+        if not line.startswith("import time:") or line.endswith("imported package"):
+            continue
+        _, cumulative_time, module_name = line.split("|")
+        imports_times.append(
+            ImportTime(
+                module_name=module_name.strip(),
+                cumulative_time_in_us=int(cumulative_time),
+                is_nested=module_name.startswith("  "),
+            )
+        )
+    return imports_times
+
+
+def main() -> None:
+    """Print the median import time of STATEMENTS over RUNS_COUNT fresh interpreters and what they pull in.
+
+    Modules the interpreter imports at startup are left out.
+    """
+    startup_modules: typing.Final = {import_time.module_name for import_time in measure_imports("pass")}
+    for statement in STATEMENTS:
+        runs = [
+            [
+                import_time
+                for import_time in measure_imports(statement)
+                if not import_time.is_nested and import_time.module_name not in startup_modules
+            ]
+            for _ in range(RUNS_COUNT)
+        ]
+        total_in_ms = statistics.median(sum(import_time.cumulative_time_in_us for import_time in run) for run in runs)
+        heaviest = sorted(runs[-1], key=lambda import_time: import_time.cumulative_time_in_us, reverse=True)[:3]
+        print(  # noqa: T201
+            f"{statement:<66} {total_in_ms / 1000:8.1f} ms  "
+            f"{', '.join(import_time.module_name for import_time in heaviest)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import asyncio
+import logging
+import time
+
+from circuit_breaker_box import BaseCircuitBreaker, CircuitBreakerFastInMemory, CircuitBreakerInMemory
+
+
+HOSTS_COUNT = 10_000
+CHECKS_COUNT = 500_000
+RESET_TIMEOUT_IN_SECONDS = 60
+MAX_FAILURE_COUNT = 5
+BANNED_HOSTS_SHARE = 10
+
+
+def build_circuit_breakers() -> dict[str, BaseCircuitBreaker]:
+    return {
+        "in_memory": CircuitBreakerInMemory(
+            reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+            max_failure_count=MAX_FAILURE_COUNT,
+            max_cache_size=HOSTS_COUNT,
+        ),
+        "fast": CircuitBreakerFastInMemory(
+            reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+            max_failure_count=MAX_FAILURE_COUNT,
+            max_cache_size=HOSTS_COUNT,
+        ),
+    }
+
+
+async def populate(circuit_breaker: BaseCircuitBreaker, hosts: list[str]) -> None:
+    """Every host has failures on record, every BANNED_HOSTS_SHARE-th one is banned."""
+    for index, host in enumerate(hosts):
+        failures_count = MAX_FAILURE_COUNT + 1 if index % BANNED_HOSTS_SHARE == 0 else 1
+        for _ in range(failures_count):
+            await circuit_breaker.increment_failures_count(host)
+
+
+async def measure_awaited(circuit_breaker: BaseCircuitBreaker, hosts: list[str]) -> float:
+    started_at = time.perf_counter()
+    for index in range(CHECKS_COUNT):
+        await circuit_breaker.is_host_available(hosts[index % HOSTS_COUNT])
+    return CHECKS_COUNT / (time.perf_counter() - started_at)
+
+
+def measure_nowait(circuit_breaker: CircuitBreakerFastInMemory, hosts: list[str]) -> float:
+    started_at = time.perf_counter()
+    for index in range(CHECKS_COUNT):
+        circuit_breaker.is_host_available_nowait(hosts[index % HOSTS_COUNT])
+    return CHECKS_COUNT / (time.perf_counter() - started_at)
+
+
+def report(name: str, checks_per_second: float) -> None:
+    print(f"{name:<16} {checks_per_second:12,.0f} checks/s")  # noqa: T201
+
+
+async def main() -> None:
+    """Measure availability checks per second over HOSTS_COUNT distinct hosts, logging stays configured."""
+    logging.basicConfig(level=logging.INFO)
+    hosts = [f"host-{index}.example.com" for index in range(HOSTS_COUNT)]
+    for name, circuit_breaker in build_circuit_breakers().items():
+        await populate(circuit_breaker, hosts)
+        report(name, await measure_awaited(circuit_breaker, hosts))
+        if isinstance(circuit_breaker, CircuitBreakerFastInMemory):
+            report(f"{name} nowait", measure_nowait(circuit_breaker, hosts))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
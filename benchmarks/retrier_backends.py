@@ -0,0 +1,211 @@
+import array
+import asyncio
+import dataclasses
+import enum
+import gc
+import logging
+import statistics
+import sys
+import time
+import tracemalloc
+import typing
+
+import fakeredis
+import tenacity
+
+from circuit_breaker_box import (
+    BaseCircuitBreaker,
+    CircuitBreakerFastInMemory,
+    CircuitBreakerInMemory,
+    CircuitBreakerRedis,
+    CircuitBreakerSlidingWindow,
+    Retrier,
+)
+
+
+CALLS_COUNT = 5_000
+MEMORY_SAMPLES_COUNT = 200
+HOSTS_COUNT = 100
+MAX_RETRIES = 3
+RESET_TIMEOUT_IN_SECONDS = 60
+MAX_FAILURE_COUNT = 5
+FLAP_PERIOD = 50
+BROWN_OUT_FAILURES_SHARE = 3
+BROWN_OUT_PERIOD = 10
+
+
+class FailurePattern(enum.Enum):
+    HEALTHY = "healthy"
+    # every host alternates FLAP_PERIOD answered calls and FLAP_PERIOD failed ones
+    FLAPPING = "flapping"
+    # BROWN_OUT_FAILURES_SHARE of every BROWN_OUT_PERIOD calls fail
+    BROWN_OUT = "brown_out"
+    HARD_DOWN = "hard_down"
+
+
+@dataclasses.dataclass
+class Upstream:
+    """Deterministic upstream, failures are counted per call so every run is reproducible."""
+
+    pattern: FailurePattern
+    calls_count: int = 0
+
+    async def __call__(self) -> None:
+        self.calls_count += 1
+        if self.pattern is FailurePattern.FLAPPING:
+            is_failed = self.calls_count // FLAP_PERIOD % 2 == 1
+        elif self.pattern is FailurePattern.BROWN_OUT:
+            is_failed = self.calls_count % BROWN_OUT_PERIOD < BROWN_OUT_FAILURES_SHARE
+        else:
+            is_failed = self.pattern is FailurePattern.HARD_DOWN
+        if is_failed:
+            raise ZeroDivisionError
+
+
+class CountingRedis(fakeredis.FakeAsyncRedis):
+    """In-process redis stand-in counting round trips, a pipeline is one round trip."""
+
+    round_trips: int = 0
+
+    async def execute_command(self, *args: typing.Any, **options: typing.Any) -> typing.Any:  # noqa: ANN401
+        self.round_trips += 1
+        return await super().execute_command(*args, **options)  # type: ignore[no-untyped-call]
+
+    def pipeline(self, transaction: bool = True, shard_hint: typing.Any = None) -> typing.Any:  # noqa: ANN401
+        pipeline = super().pipeline(transaction, shard_hint)
+        execute = pipeline.execute
+
+        async def execute_counted(raise_on_error: bool = True) -> typing.Any:  # noqa: ANN401
+            self.round_trips += 1
+            return await execute(raise_on_error)
+
+        pipeline.execute = execute_counted  # type: ignore[method-assign]
+        return pipeline
+
+
+def build_circuit_breakers() -> dict[str, typing.Callable[[], BaseCircuitBreaker | None]]:
+    common_options: typing.Final[dict[str, typing.Any]] = {
+        "reset_timeout_in_seconds": RESET_TIMEOUT_IN_SECONDS,
+        "max_failure_count": MAX_FAILURE_COUNT,
+    }
+    return {
+        "none": lambda: None,
+        "in_memory": lambda: CircuitBreakerInMemory(**common_options, max_cache_size=HOSTS_COUNT),
+        "fast_in_memory": lambda: CircuitBreakerFastInMemory(**common_options, max_cache_size=HOSTS_COUNT),
+        "sliding_window": lambda: CircuitBreakerSlidingWindow(
+            **common_options,
+            max_cache_size=HOSTS_COUNT,
+            failure_rate_threshold=0.5,
+            window_size_in_seconds=10,
+            minimum_requests_count=MAX_FAILURE_COUNT,
+        ),
+        "redis": lambda: CircuitBreakerRedis(**common_options, redis_connection=CountingRedis()),
+        "redis_lua_cached": lambda: CircuitBreakerRedis(
+            **common_options, redis_connection=CountingRedis(), use_lua_script=True, local_cache_ttl_in_seconds=1
+        ),
+        "redis_write_behind": lambda: CircuitBreakerRedis(
+            **common_options,
+            redis_connection=CountingRedis(),
+            local_cache_ttl_in_seconds=1,
+            flush_interval_in_seconds=0.1,
+        ),
+    }
+
+
+def build_retrier(circuit_breaker: BaseCircuitBreaker | None) -> Retrier[None]:
+    return Retrier[None](
+        circuit_breaker=circuit_breaker,
+        stop_rule=tenacity.stop.stop_after_attempt(MAX_RETRIES),
+        retry_cause=tenacity.retry_if_exception_type(ZeroDivisionError),
+        # backoff is not part of the per-call overhead, benchmarks.event_loop_latency covers sleeping retries
+        wait_strategy=tenacity.wait_none(),
+    )
+
+
+@dataclasses.dataclass(kw_only=True)
+class Result:
+    calls_per_second: float
+    latencies_in_seconds: list[float]
+    failed_calls_count: int
+    round_trips_count: int
+    transient_bytes: "array.array[int]"
+    retained_blocks_count: int
+
+
+async def call(retrier: Retrier[None], upstream: Upstream, host: str) -> bool:
+    try:
+        await retrier.retry(upstream, host=host)
+    except Exception:  # noqa: BLE001
+        return False
+    return True
+
+
+async def measure(circuit_breaker: BaseCircuitBreaker | None, pattern: FailurePattern) -> Result:
+    retrier: typing.Final = build_retrier(circuit_breaker)
+    upstream: typing.Final = Upstream(pattern)
+    hosts: typing.Final = [f"host-{index}.example.com" for index in range(HOSTS_COUNT)]
+    latencies_in_seconds: typing.Final[list[float]] = []
+    failed_calls_count = 0
+
+    started_at: typing.Final = time.perf_counter()
+    for index in range(CALLS_COUNT):
+        call_started_at = time.perf_counter()
+        if not await call(retrier, upstream, hosts[index % HOSTS_COUNT]):
+            failed_calls_count += 1
+        latencies_in_seconds.append(time.perf_counter() - call_started_at)
+    calls_per_second: typing.Final = CALLS_COUNT / (time.perf_counter() - started_at)
+
+    redis_connection: typing.Final = (
+        circuit_breaker.redis_connection if isinstance(circuit_breaker, CircuitBreakerRedis) else None
+    )
+    round_trips_count: typing.Final = redis_connection.round_trips if isinstance(redis_connection, CountingRedis) else 0
+
+    # transient memory of one call is its traced peak, retained blocks are what calls leave behind,
+    # samples are stored unboxed so they are not counted as retained
+    transient_bytes: typing.Final = array.array("q", [0]) * MEMORY_SAMPLES_COUNT
+    gc.collect()
+    allocated_blocks_count: typing.Final = sys.getallocatedblocks()
+    tracemalloc.start()
+    for index in range(MEMORY_SAMPLES_COUNT):
+        tracemalloc.reset_peak()
+        current_bytes, _ = tracemalloc.get_traced_memory()
+        await call(retrier, upstream, hosts[index % HOSTS_COUNT])
+        transient_bytes[index] = tracemalloc.get_traced_memory()[1] - current_bytes
+    tracemalloc.stop()
+    gc.collect()
+    retained_blocks_count: typing.Final = sys.getallocatedblocks() - allocated_blocks_count
+
+    if isinstance(circuit_breaker, CircuitBreakerRedis) and circuit_breaker.flush_interval_in_seconds:
+        await circuit_breaker.flush_failures()
+    return Result(
+        calls_per_second=calls_per_second,
+        latencies_in_seconds=latencies_in_seconds,
+        failed_calls_count=failed_calls_count,
+        round_trips_count=round_trips_count,
+        transient_bytes=transient_bytes,
+        retained_blocks_count=retained_blocks_count,
+    )
+
+
+def report(name: str, pattern: FailurePattern, result: Result) -> None:
+    latencies_in_us = statistics.quantiles([latency * 1_000_000 for latency in result.latencies_in_seconds], n=100)
+    print(  # noqa: T201
+        f"{name:<20} {pattern.value:<10} {result.calls_per_second:10,.0f} calls/s  "
+        f"p50: {latencies_in_us[49]:8.1f}us  p99: {latencies_in_us[98]:8.1f}us  "
+        f"failed: {result.failed_calls_count / CALLS_COUNT:4.0%}  "
+        f"round trips/call: {result.round_trips_count / CALLS_COUNT:5.2f}  "
+        f"transient: {statistics.mean(result.transient_bytes) / 1024:6.1f}KiB/call  "
+        f"retained: {result.retained_blocks_count / MEMORY_SAMPLES_COUNT:6.2f} blocks/call"
+    )
+
+
+async def main() -> None:
+    """Measure Retrier.retry with every backend against every failure pattern, redis is faked in process."""
+    logging.disable(logging.WARNING)
+    for name, build_circuit_breaker in build_circuit_breakers().items():
+        for pattern in FailurePattern:
+            report(name, pattern, await measure(build_circuit_breaker(), pattern))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
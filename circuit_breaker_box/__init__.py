@@ -1,17 +1,124 @@
-from circuit_breaker_box.circuit_breaker_base import BaseCircuitBreaker
-from circuit_breaker_box.circuit_breaker_in_memory import CircuitBreakerInMemory
-from circuit_breaker_box.circuit_breaker_redis import CircuitBreakerRedis
-from circuit_breaker_box.common_types import ResponseType
-from circuit_breaker_box.errors import BaseCircuitBreakerError, HostUnavailableError
-from circuit_breaker_box.retrier import Retrier
+import importlib
+import typing
+
+
+if typing.TYPE_CHECKING:
+    from circuit_breaker_box.bulkhead import Bulkhead
+    from circuit_breaker_box.circuit_breaker_base import BaseCircuitBreaker
+    from circuit_breaker_box.circuit_breaker_fast_in_memory import CircuitBreakerFastInMemory
+    from circuit_breaker_box.circuit_breaker_in_memory import CircuitBreakerInMemory
+    from circuit_breaker_box.circuit_breaker_redis import CircuitBreakerRedis, RedisFailurePolicy
+    from circuit_breaker_box.circuit_breaker_shared_memory import CircuitBreakerSharedMemory
+    from circuit_breaker_box.circuit_breaker_sliding_window import CircuitBreakerSlidingWindow
+    from circuit_breaker_box.common_types import ResponseType
+    from circuit_breaker_box.deadline import deadline_after, deadline_at, remaining_budget_in_seconds
+    from circuit_breaker_box.errors import (
+        BaseCircuitBreakerError,
+        BulkheadFullError,
+        DeadlineExceededError,
+        HostUnavailableError,
+        TooManyKeysError,
+    )
+    from circuit_breaker_box.hedging import HedgingPolicy
+    from circuit_breaker_box.httpx_transport import RetryingTransport
+    from circuit_breaker_box.instrumentation import BackendOperation, CircuitState, Instrumentation
+    from circuit_breaker_box.instrumentation_opentelemetry import OpenTelemetryInstrumentation
+    from circuit_breaker_box.instrumentation_prometheus import PrometheusInstrumentation
+    from circuit_breaker_box.keys import CircuitBreakerKeys, KeyGranularity, OverflowPolicy
+    from circuit_breaker_box.outcomes import Outcome, OutcomeClassifier
+    from circuit_breaker_box.retrier import Retrier
+    from circuit_breaker_box.retry_budget import BaseRetryBudget, RetryBudgetInMemory
+    from circuit_breaker_box.retry_budget_redis import RetryBudgetRedis
+    from circuit_breaker_box.snapshot import SnapshotFile
+
+
+# public names are imported from their modules on first access, so importing the package stays cheap
+# and redis, httpx, tenacity and the metrics clients are loaded only by the backends that use them
+_MODULES_BY_NAME: typing.Final = {
+    "BackendOperation": "circuit_breaker_box.instrumentation",
+    "BaseCircuitBreaker": "circuit_breaker_box.circuit_breaker_base",
+    "BaseCircuitBreakerError": "circuit_breaker_box.errors",
+    "BaseRetryBudget": "circuit_breaker_box.retry_budget",
+    "Bulkhead": "circuit_breaker_box.bulkhead",
+    "BulkheadFullError": "circuit_breaker_box.errors",
+    "CircuitBreakerFastInMemory": "circuit_breaker_box.circuit_breaker_fast_in_memory",
+    "CircuitBreakerInMemory": "circuit_breaker_box.circuit_breaker_in_memory",
+    "CircuitBreakerKeys": "circuit_breaker_box.keys",
+    "CircuitBreakerRedis": "circuit_breaker_box.circuit_breaker_redis",
+    "CircuitBreakerSharedMemory": "circuit_breaker_box.circuit_breaker_shared_memory",
+    "CircuitBreakerSlidingWindow": "circuit_breaker_box.circuit_breaker_sliding_window",
+    "CircuitState": "circuit_breaker_box.instrumentation",
+    "DeadlineExceededError": "circuit_breaker_box.errors",
+    "HedgingPolicy": "circuit_breaker_box.hedging",
+    "HostUnavailableError": "circuit_breaker_box.errors",
+    "Instrumentation": "circuit_breaker_box.instrumentation",
+    "KeyGranularity": "circuit_breaker_box.keys",
+    "OpenTelemetryInstrumentation": "circuit_breaker_box.instrumentation_opentelemetry",
+    "Outcome": "circuit_breaker_box.outcomes",
+    "OutcomeClassifier": "circuit_breaker_box.outcomes",
+    "OverflowPolicy": "circuit_breaker_box.keys",
+    "PrometheusInstrumentation": "circuit_breaker_box.instrumentation_prometheus",
+    "RedisFailurePolicy": "circuit_breaker_box.circuit_breaker_redis",
+    "ResponseType": "circuit_breaker_box.common_types",
+    "Retrier": "circuit_breaker_box.retrier",
+    "RetryBudgetInMemory": "circuit_breaker_box.retry_budget",
+    "RetryBudgetRedis": "circuit_breaker_box.retry_budget_redis",
+    "RetryingTransport": "circuit_breaker_box.httpx_transport",
+    "SnapshotFile": "circuit_breaker_box.snapshot",
+    "TooManyKeysError": "circuit_breaker_box.errors",
+    "deadline_after": "circuit_breaker_box.deadline",
+    "deadline_at": "circuit_breaker_box.deadline",
+    "remaining_budget_in_seconds": "circuit_breaker_box.deadline",
+}
+
+
+def __getattr__(name: str) -> typing.Any:  # noqa: ANN401
+    module_name: typing.Final = _MODULES_BY_NAME.get(name)
+    if module_name is None:
+        msg = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(msg)
+    value: typing.Final = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
 
 
 __all__ = [
+    "BackendOperation",
     "BaseCircuitBreaker",
     "BaseCircuitBreakerError",
+    "BaseRetryBudget",
+    "Bulkhead",
+    "BulkheadFullError",
+    "CircuitBreakerFastInMemory",
     "CircuitBreakerInMemory",
+    "CircuitBreakerKeys",
     "CircuitBreakerRedis",
+    "CircuitBreakerSharedMemory",
+    "CircuitBreakerSlidingWindow",
+    "CircuitState",
+    "DeadlineExceededError",
+    "HedgingPolicy",
     "HostUnavailableError",
+    "Instrumentation",
+    "KeyGranularity",
+    "OpenTelemetryInstrumentation",
+    "Outcome",
+    "OutcomeClassifier",
+    "OverflowPolicy",
+    "PrometheusInstrumentation",
+    "RedisFailurePolicy",
     "ResponseType",
     "Retrier",
+    "RetryBudgetInMemory",
+    "RetryBudgetRedis",
+    "RetryingTransport",
+    "SnapshotFile",
+    "TooManyKeysError",
+    "deadline_after",
+    "deadline_at",
+    "remaining_budget_in_seconds",
 ]
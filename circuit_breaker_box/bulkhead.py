@@ -0,0 +1,135 @@
+import asyncio
+import collections
+import contextlib
+import dataclasses
+import logging
+import time
+import typing
+
+from circuit_breaker_box import errors
+
+
+logger = logging.getLogger(__name__)
+
+
+class _HostLimit:
+    __slots__ = ("in_flight", "limit", "waiters")
+
+    def __init__(self, limit: float) -> None:
+        self.limit = limit
+        self.in_flight = 0
+        self.waiters: collections.deque[asyncio.Future[None]] = collections.deque()
+
+    @property
+    def is_idle(self) -> bool:
+        return not self.in_flight and not self.waiters
+
+
+def _expire_waiter(waiter: "asyncio.Future[None]") -> None:
+    if not waiter.done():
+        waiter.set_exception(asyncio.TimeoutError())
+
+
+@dataclasses.dataclass(kw_only=True)
+class Bulkhead:
+    """Per-host limit of in-flight calls.
+
+    Calls over the limit wait in a queue of max_queued_calls for queue_timeout_in_seconds,
+    otherwise they fail fast with BulkheadFullError.
+    With latency_threshold_in_seconds set the limit is adaptive (AIMD): it grows additively after calls faster than
+    the threshold, up to max_concurrent_calls, and shrinks by backoff_ratio after slow or failed calls.
+    """
+
+    max_concurrent_calls: int
+    max_queued_calls: int = 0
+    queue_timeout_in_seconds: float = 0
+    latency_threshold_in_seconds: float | None = None
+    min_concurrent_calls: int = 1
+    backoff_ratio: float = 0.9
+    max_cache_size: int = 1024
+    # least recently used first, hosts with calls in flight or queued are never evicted
+    hosts_limits: dict[str, _HostLimit] = dataclasses.field(init=False, default_factory=dict)
+
+    def _get_host_limit(self, host: str) -> _HostLimit:
+        host_limit = self.hosts_limits.pop(host, None)
+        if host_limit is None:
+            if len(self.hosts_limits) >= self.max_cache_size:
+                self._evict_idle_host_limit(host)
+            host_limit = _HostLimit(self.max_concurrent_calls)
+        self.hosts_limits[host] = host_limit
+        return host_limit
+
+    def _evict_idle_host_limit(self, host: str) -> None:
+        for evicted_host, host_limit in self.hosts_limits.items():
+            if host_limit.is_idle:
+                del self.hosts_limits[evicted_host]
+                return
+        msg = f"Bulkhead for host {host} is full, {self.max_cache_size} hosts have calls in flight."
+        raise errors.BulkheadFullError(msg)
+
+    @contextlib.asynccontextmanager
+    async def limit(self, host: str) -> typing.AsyncIterator[None]:
+        host_limit: typing.Final = self._get_host_limit(host)
+        await self._acquire(host, host_limit)
+        started_at: typing.Final = time.monotonic()
+        is_success = is_cancelled = False
+        try:
+            yield
+            is_success = True
+        except asyncio.CancelledError:
+            is_cancelled = True
+            raise
+        finally:
+            if self.latency_threshold_in_seconds is not None:
+                latency_in_seconds = time.monotonic() - started_at
+                # cancelled calls, like losing hedged attempts, tell nothing about the host unless they were slow
+                if not is_cancelled or latency_in_seconds > self.latency_threshold_in_seconds:
+                    self._adjust_limit(host_limit, latency_in_seconds, is_success=is_success)
+            self._release(host_limit)
+
+    async def _acquire(self, host: str, host_limit: _HostLimit) -> None:
+        if host_limit.in_flight < int(host_limit.limit):
+            host_limit.in_flight += 1
+            return
+
+        if len(host_limit.waiters) >= self.max_queued_calls:
+            self.raise_bulkhead_full_error(host, host_limit)
+
+        loop: typing.Final = asyncio.get_running_loop()
+        waiter: typing.Final[asyncio.Future[None]] = loop.create_future()
+        host_limit.waiters.append(waiter)
+        # not asyncio.wait_for: it swallows a cancellation arriving after the slot was handed over
+        timeout_handle: typing.Final = loop.call_later(self.queue_timeout_in_seconds, _expire_waiter, waiter)
+        try:
+            await waiter
+        except asyncio.TimeoutError:
+            self.raise_bulkhead_full_error(host, host_limit)
+        except BaseException:
+            # the slot could be handed over right before the cancellation
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                self._release(host_limit)
+            raise
+        finally:
+            timeout_handle.cancel()
+            with contextlib.suppress(ValueError):
+                host_limit.waiters.remove(waiter)
+
+    def _adjust_limit(self, host_limit: _HostLimit, latency_in_seconds: float, *, is_success: bool) -> None:
+        assert self.latency_threshold_in_seconds is not None
+        if is_success and latency_in_seconds <= self.latency_threshold_in_seconds:
+            host_limit.limit = min(host_limit.limit + 1 / host_limit.limit, self.max_concurrent_calls)
+        else:
+            host_limit.limit = max(host_limit.limit * self.backoff_ratio, self.min_concurrent_calls)
+
+    def _release(self, host_limit: _HostLimit) -> None:
+        """Return the slot without adjusting the limit and hand it over to the next waiter."""
+        host_limit.in_flight -= 1
+        while host_limit.waiters and host_limit.in_flight < int(host_limit.limit):
+            waiter = host_limit.waiters.popleft()
+            if not waiter.done():
+                host_limit.in_flight += 1
+                waiter.set_result(None)
+
+    def raise_bulkhead_full_error(self, host: str, host_limit: _HostLimit) -> typing.NoReturn:
+        msg = f"Bulkhead for host {host} is full, {host_limit.in_flight} calls in flight."
+        raise errors.BulkheadFullError(msg)
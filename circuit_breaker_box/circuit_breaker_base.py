@@ -2,17 +2,76 @@ import abc
 import dataclasses
 import typing
 
+from circuit_breaker_box.instrumentation import NO_INSTRUMENTATION, Instrumentation
+from circuit_breaker_box.keys import CircuitBreakerKeys
+from circuit_breaker_box.outcomes import Outcome, OutcomeClassifier
+
 
 @dataclasses.dataclass(kw_only=True, slots=True)
 class BaseCircuitBreaker(abc.ABC):
     reset_timeout_in_seconds: int
     max_failure_count: int
+    # None keeps the circuit closed as soon as reset_timeout_in_seconds lapses,
+    # otherwise the circuit turns half-open and admits only this many probe requests
+    half_open_max_probes: int | None = None
+    # None keeps failures until reset_timeout_in_seconds lapses, otherwise every success multiplies the failures count
+    # of a closed circuit by this ratio, rounded down, so 0.0 resets it; the sliding window weighs successes by itself
+    success_decay_ratio: float | None = None
+    # caps and interns the keys backends track, hosts are used as they are without it
+    keys: CircuitBreakerKeys | None = None
+    # classifies results and durations of calls through Retrier, unless the Retrier has its own classifier
+    outcome_classifier: OutcomeClassifier | None = None
+    instrumentation: Instrumentation = NO_INSTRUMENTATION
+
+    def intern_key(self, host: str) -> str:
+        return host if self.keys is None else self.keys.intern(host)
 
     @abc.abstractmethod
     async def increment_failures_count(self, host: str) -> None: ...
 
+    async def increment_failures_count_and_check(self, host: str) -> bool:
+        """Record a failure and return whether the host is still available.
+
+        Backends that can do both in one round trip should override this.
+        """
+        await self.increment_failures_count(host)
+        return await self.is_host_available(host)
+
+    async def record_success(self, host: str) -> None:  # noqa: B027
+        """Record a successful request, a successful half-open probe closes the circuit.
+
+        With success_decay_ratio it also decays the failures count of a closed circuit.
+        """
+
+    async def record_slow_call(self, host: str) -> None:
+        """Record a call that succeeded slower than the outcome classifier allows.
+
+        Counting backends count it as a failure, the sliding window tracks the slow-call rate on its own.
+        """
+        await self.increment_failures_count(host)
+
+    async def record_outcome(self, host: str, outcome: Outcome) -> None:
+        if outcome is Outcome.SUCCESS:
+            await self.record_success(host)
+        elif outcome is Outcome.SLOW:
+            await self.record_slow_call(host)
+        else:
+            await self.increment_failures_count(host)
+
+    def decay_failures_count(self, failures_count: int, successes_count: int = 1) -> int:
+        assert self.success_decay_ratio is not None
+        return int(failures_count * self.success_decay_ratio**successes_count)
+
     @abc.abstractmethod
     async def is_host_available(self, host: str) -> bool: ...
 
+    def is_host_available_nowait(self, host: str) -> bool | None:  # noqa: ARG002
+        """Check the host without awaiting when the backend can, None means is_host_available has to be awaited."""
+        return None
+
+    async def are_hosts_available(self, hosts: typing.Iterable[str]) -> dict[str, bool]:
+        """Check a batch of hosts at once, backends override this to serve it in one pass or round trip."""
+        return {host: await self.is_host_available(host) for host in hosts}
+
     @abc.abstractmethod
     async def raise_host_unavailable_error(self, host: str) -> typing.NoReturn: ...
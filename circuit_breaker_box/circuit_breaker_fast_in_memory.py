@@ -0,0 +1,172 @@
+import dataclasses
+import itertools
+import logging
+import time
+import typing
+
+from circuit_breaker_box import BaseCircuitBreaker, errors
+from circuit_breaker_box.instrumentation import CircuitState
+from circuit_breaker_box.snapshot import HostSnapshot, dump_snapshot, load_snapshot
+
+
+logger = logging.getLogger(__name__)
+
+# share of max_cache_size freed at once when the table is full, so the scan is amortized over the next inserts
+_EVICTED_SHARE: typing.Final = 0.1
+
+
+class _HostState:
+    """Failures counter and half-open marker of one host, both expired lazily by their deadlines."""
+
+    __slots__ = ("admitted_probes", "failures_count", "failures_expire_at", "half_open_expire_at")
+
+    def __init__(self) -> None:
+        self.failures_count = 0
+        self.failures_expire_at = 0.0
+        self.half_open_expire_at = 0.0
+        self.admitted_probes = 0
+
+
+@dataclasses.dataclass(kw_only=True)
+class CircuitBreakerFastInMemory(BaseCircuitBreaker):
+    """In-memory backend for hot-path checks, same semantics as CircuitBreakerInMemory.
+
+    Every host is one slotted record in a plain dict, expired by comparing deadlines on access instead of
+    a TTLCache reordering its links on every read. No call awaits, so state changes are atomic for
+    the event loop without locks and is_host_available_nowait lets Retrier check a host without a coroutine.
+    Once max_cache_size hosts are tracked, expired records are dropped, then the oldest ones until a tenth is free.
+    """
+
+    max_cache_size: int
+    timer: typing.Callable[[], float] = time.monotonic
+    hosts_states: dict[str, _HostState] = dataclasses.field(init=False, default_factory=dict)
+
+    async def increment_failures_count(self, host: str) -> None:
+        self._increment_failures_count(host)
+
+    async def increment_failures_count_and_check(self, host: str) -> bool:
+        self._increment_failures_count(host)
+        return self.is_host_available_nowait(host)
+
+    async def record_success(self, host: str) -> None:
+        host = self.intern_key(host)
+        state: typing.Final = self.hosts_states.get(host)
+        if state is None:
+            return
+        now: typing.Final = self.timer()
+        failures_count: typing.Final = self._failures_count(state, now)
+        if failures_count > self.max_failure_count:
+            return
+        if self.half_open_max_probes and now < state.half_open_expire_at:
+            del self.hosts_states[host]
+            self.instrumentation.state_transition(host, CircuitState.CLOSED)
+            logger.debug("Closed circuit for host: '%s'", host)
+        elif self.success_decay_ratio is not None and failures_count:
+            state.failures_count = self.decay_failures_count(failures_count)
+
+    async def is_host_available(self, host: str) -> bool:
+        return self.is_host_available_nowait(host)
+
+    async def are_hosts_available(self, hosts: typing.Iterable[str]) -> dict[str, bool]:
+        return {host: self.is_host_available_nowait(host) for host in hosts}
+
+    def is_host_available_nowait(self, host: str) -> bool:
+        host = self.intern_key(host)
+        state: typing.Final = self.hosts_states.get(host)
+        if state is None:
+            return True
+
+        now: typing.Final = self.timer()
+        if self._failures_count(state, now) > self.max_failure_count:
+            return False
+        if not self.half_open_max_probes or now >= state.half_open_expire_at:
+            return True
+        if state.admitted_probes >= self.half_open_max_probes:
+            return False
+        if not state.admitted_probes:
+            self.instrumentation.state_transition(host, CircuitState.HALF_OPEN)
+        state.admitted_probes += 1
+        return True
+
+    def _increment_failures_count(self, host: str) -> None:
+        host = self.intern_key(host)
+        state = self.hosts_states.get(host)
+        if state is None:
+            state = self._add_state(host)
+        now: typing.Final = self.timer()
+        previous_failures_count: typing.Final = self._failures_count(state, now)
+
+        if self.half_open_max_probes and now < state.half_open_expire_at:
+            state.failures_count = max(previous_failures_count + 1, self.max_failure_count + 1)
+        else:
+            state.failures_count = previous_failures_count + 1
+        state.failures_expire_at = now + self.reset_timeout_in_seconds
+        if previous_failures_count <= self.max_failure_count < state.failures_count:
+            self.instrumentation.state_transition(host, CircuitState.OPEN)
+            logger.debug("Opened circuit for host: '%s'", host)
+
+        if self.half_open_max_probes and state.failures_count > self.max_failure_count:
+            state.half_open_expire_at = now + self.reset_timeout_in_seconds * 2
+            state.admitted_probes = 0
+
+    def _add_state(self, host: str) -> _HostState:
+        if len(self.hosts_states) >= self.max_cache_size:
+            self._evict_states()
+        state = self.hosts_states[host] = _HostState()
+        return state
+
+    def _evict_states(self) -> None:
+        now: typing.Final = self.timer()
+        expired_hosts: typing.Final = [
+            expired_host
+            for expired_host, state in self.hosts_states.items()
+            if now >= state.failures_expire_at and now >= state.half_open_expire_at
+        ]
+        for expired_host in expired_hosts:
+            del self.hosts_states[expired_host]
+        evicted_count: typing.Final = (
+            len(self.hosts_states) - self.max_cache_size + max(int(self.max_cache_size * _EVICTED_SHARE), 1)
+        )
+        for evicted_host in list(itertools.islice(self.hosts_states, max(evicted_count, 0))):
+            del self.hosts_states[evicted_host]
+
+    @staticmethod
+    def _failures_count(state: _HostState, now: float) -> int:
+        return state.failures_count if now < state.failures_expire_at else 0
+
+    def export_snapshot(self) -> bytes:
+        """Serialize unexpired hosts states with their absolute expiry, see SnapshotFile."""
+        now: typing.Final = self.timer()
+        to_unix_time: typing.Final = time.time() - now
+        return dump_snapshot(
+            HostSnapshot(
+                host=host,
+                failures_count=state.failures_count if now < state.failures_expire_at else 0,
+                failures_expire_at=state.failures_expire_at + to_unix_time if now < state.failures_expire_at else 0.0,
+                half_open_expire_at=state.half_open_expire_at + to_unix_time
+                if now < state.half_open_expire_at
+                else 0.0,
+            )
+            for host, state in self.hosts_states.items()
+            if now < state.failures_expire_at or now < state.half_open_expire_at
+        )
+
+    def import_snapshot(self, snapshot: bytes) -> None:
+        """Restore unexpired hosts states from a snapshot, hosts already tracked are kept as they are."""
+        now: typing.Final = self.timer()
+        to_timer_time: typing.Final = now - time.time()
+        for host in load_snapshot(snapshot):
+            failures_expire_at = host.failures_expire_at + to_timer_time
+            half_open_expire_at = host.half_open_expire_at + to_timer_time if self.half_open_max_probes else 0.0
+            key = self.intern_key(host.host)
+            if key in self.hosts_states or (now >= failures_expire_at and now >= half_open_expire_at):
+                continue
+            state = self._add_state(key)
+            state.failures_count = host.failures_count
+            state.failures_expire_at = failures_expire_at
+            # probes admitted by the previous process are not counted again
+            state.half_open_expire_at = half_open_expire_at
+
+    async def raise_host_unavailable_error(self, host: str) -> typing.NoReturn:
+        msg = f"Host {host} banned by circuitbreaker for {(self.reset_timeout_in_seconds / 60):.2f} minutes."
+        raise errors.HostUnavailableError(msg)
@@ -1,45 +1,154 @@
 import dataclasses
 import logging
+import time
 import typing
 
-from cachetools import TTLCache
+from cachetools import TLRUCache
 
 from circuit_breaker_box import BaseCircuitBreaker, errors
+from circuit_breaker_box.instrumentation import CircuitState
+from circuit_breaker_box.snapshot import HostSnapshot, dump_snapshot, load_snapshot
 
 
 logger = logging.getLogger(__name__)
 
 
+def _expire_at(_host: str, entry: tuple[int, float], _now: float) -> float:
+    return entry[1]
+
+
 @dataclasses.dataclass(kw_only=True)
 class CircuitBreakerInMemory(BaseCircuitBreaker):
     max_cache_size: int
-    cache_hosts_with_errors: TTLCache[typing.Any, typing.Any] = dataclasses.field(init=False)
+    # entries keep their absolute monotonic expiry next to the value, so snapshots can save and restore it
+    # host -> (failures count, expire_at), refreshed by reset_timeout_in_seconds on every change
+    cache_hosts_with_errors: TLRUCache[str, tuple[int, float]] = dataclasses.field(init=False)
+    # tripped hosts -> (admitted probes, expire_at), outlives the failures counter by reset_timeout_in_seconds
+    cache_hosts_half_open: TLRUCache[str, tuple[int, float]] = dataclasses.field(init=False)
 
     def __post_init__(self) -> None:
-        self.cache_hosts_with_errors: TTLCache[typing.Any, typing.Any] = TTLCache(
-            maxsize=self.max_cache_size, ttl=self.reset_timeout_in_seconds
-        )
+        self.cache_hosts_with_errors = TLRUCache(maxsize=self.max_cache_size, ttu=_expire_at)
+        self.cache_hosts_half_open = TLRUCache(maxsize=self.max_cache_size, ttu=_expire_at)
+
+    def _failures_count(self, host: str) -> int:
+        entry: typing.Final = self.cache_hosts_with_errors.get(host)
+        return entry[0] if entry else 0
+
+    def _set_failures_count(self, host: str, failures_count: int) -> None:
+        self.cache_hosts_with_errors[host] = (failures_count, time.monotonic() + self.reset_timeout_in_seconds)
+
+    def _set_admitted_probes(self, host: str, admitted_probes: int) -> None:
+        self.cache_hosts_half_open[host] = (admitted_probes, time.monotonic() + self.reset_timeout_in_seconds * 2)
 
     async def increment_failures_count(self, host: str) -> None:
-        if host in self.cache_hosts_with_errors and (await self.is_host_available(host)):
-            self.cache_hosts_with_errors[host] = self.cache_hosts_with_errors[host] + 1
-            logger.debug("Incremented error for host: '%s', errors: %s", host, self.cache_hosts_with_errors[host])
+        host = self.intern_key(host)
+        failures_count: typing.Final = self._failures_count(host)
+        if self.half_open_max_probes and host in self.cache_hosts_half_open:
+            self._set_failures_count(host, max(failures_count + 1, self.max_failure_count + 1))
+            self._set_admitted_probes(host, 0)
+            if failures_count <= self.max_failure_count:
+                self.instrumentation.state_transition(host, CircuitState.OPEN)
+                logger.debug("Reopened circuit for host: '%s'", host)
+            return
+
+        self._set_failures_count(host, failures_count + 1)
+        if failures_count:
+            logger.debug("Incremented error for host: '%s', errors: %s", host, failures_count + 1)
         else:
-            self.cache_hosts_with_errors[host] = 1
-            logger.debug("Added host: %s, errors: %s", host, self.cache_hosts_with_errors[host])
+            logger.debug("Added host: %s, errors: %s", host, failures_count + 1)
+
+        if failures_count == self.max_failure_count:
+            self.instrumentation.state_transition(host, CircuitState.OPEN)
+
+        if self.half_open_max_probes and failures_count >= self.max_failure_count:
+            self._set_admitted_probes(host, 0)
+            logger.debug("Opened circuit for host: '%s'", host)
+
+    async def record_success(self, host: str) -> None:
+        host = self.intern_key(host)
+        failures_count: typing.Final = self._failures_count(host)
+        if (
+            self.half_open_max_probes
+            and host in self.cache_hosts_half_open
+            and failures_count <= self.max_failure_count
+        ):
+            self.cache_hosts_with_errors.pop(host, None)
+            self.cache_hosts_half_open.pop(host, None)
+            self.instrumentation.state_transition(host, CircuitState.CLOSED)
+            logger.debug("Closed circuit for host: '%s'", host)
+            return
+
+        if (
+            self.success_decay_ratio is not None
+            and failures_count
+            and failures_count <= self.max_failure_count
+            and host not in self.cache_hosts_half_open
+        ):
+            decayed_failures_count: typing.Final = self.decay_failures_count(failures_count)
+            if decayed_failures_count:
+                self._set_failures_count(host, decayed_failures_count)
+            else:
+                self.cache_hosts_with_errors.pop(host, None)
 
     async def is_host_available(self, host: str) -> bool:
-        failures_count: typing.Final = int(self.cache_hosts_with_errors.get(host) or 0)
-        is_available: bool = failures_count <= self.max_failure_count
+        host = self.intern_key(host)
+        is_available: typing.Final = self._is_host_available(host)
         logger.debug(
             "host: '%s', failures_count: '%s', self.max_failure_count: '%s', is_available: '%s'",
             host,
-            failures_count,
+            self._failures_count(host),
             self.max_failure_count,
             is_available,
         )
         return is_available
 
+    async def are_hosts_available(self, hosts: typing.Iterable[str]) -> dict[str, bool]:
+        return {host: self._is_host_available(self.intern_key(host)) for host in hosts}
+
+    def _is_host_available(self, host: str) -> bool:
+        is_available: bool = self._failures_count(host) <= self.max_failure_count
+        if is_available and self.half_open_max_probes and (entry := self.cache_hosts_half_open.get(host)):
+            admitted_probes: typing.Final = entry[0]
+            is_available = admitted_probes < self.half_open_max_probes
+            if is_available:
+                self._set_admitted_probes(host, admitted_probes + 1)
+                if not admitted_probes:
+                    self.instrumentation.state_transition(host, CircuitState.HALF_OPEN)
+        return is_available
+
+    def export_snapshot(self) -> bytes:
+        """Serialize failures counts and half-open windows with their absolute expiry, see SnapshotFile."""
+        # cache expiry is on the monotonic clock of this process
+        to_unix_time: typing.Final = time.time() - time.monotonic()
+        failures: typing.Final = dict(self.cache_hosts_with_errors.items())
+        half_open: typing.Final = dict(self.cache_hosts_half_open.items())
+        return dump_snapshot(
+            HostSnapshot(
+                host=host,
+                failures_count=failures[host][0] if host in failures else 0,
+                failures_expire_at=failures[host][1] + to_unix_time if host in failures else 0.0,
+                half_open_expire_at=half_open[host][1] + to_unix_time if host in half_open else 0.0,
+            )
+            for host in half_open.keys() | failures.keys()
+        )
+
+    def import_snapshot(self, snapshot: bytes) -> None:
+        """Restore unexpired hosts states from a snapshot, hosts already tracked are kept as they are."""
+        to_monotonic_time: typing.Final = time.monotonic() - time.time()
+        for host_snapshot in load_snapshot(snapshot):
+            host = self.intern_key(host_snapshot.host)
+            if host in self.cache_hosts_with_errors or host in self.cache_hosts_half_open:
+                continue
+            now = time.monotonic()
+            if host_snapshot.failures_count and host_snapshot.failures_expire_at + to_monotonic_time > now:
+                self.cache_hosts_with_errors[host] = (
+                    host_snapshot.failures_count,
+                    host_snapshot.failures_expire_at + to_monotonic_time,
+                )
+            # probes admitted by the previous process are not counted again
+            if self.half_open_max_probes and host_snapshot.half_open_expire_at + to_monotonic_time > now:
+                self.cache_hosts_half_open[host] = (0, host_snapshot.half_open_expire_at + to_monotonic_time)
+
     async def raise_host_unavailable_error(self, host: str) -> typing.NoReturn:
         msg = f"Host {host} banned by circutbreaker for {(self.reset_timeout_in_seconds / 60):.2f} minutes."
         raise errors.HostUnavailableError(msg)
@@ -1,70 +1,692 @@
+import asyncio
 import contextlib
 import dataclasses
+import enum
 import logging
+import time
 import typing
 
 import tenacity
+from cachetools import TTLCache
 
 from circuit_breaker_box import BaseCircuitBreaker, errors
+from circuit_breaker_box.circuit_breaker_in_memory import CircuitBreakerInMemory
+from circuit_breaker_box.instrumentation import BackendOperation, CircuitState
 
 
 with contextlib.suppress(ImportError):
     from redis import asyncio as aioredis
+    from redis.commands.core import AsyncScript
     from redis.exceptions import ConnectionError as RedisConnectionError
-    from redis.exceptions import WatchError
+    from redis.exceptions import RedisError, WatchError
 
 
 logger = logging.getLogger(__name__)
 
+# KEYS[1] - failures counter, KEYS[2] - optional half-open probes counter,
+# ARGV[1] - ttl in seconds, ARGV[2] - max failure count, ARGV[3] - half-open probes counter ttl in seconds,
+# ARGV[4] - failures to add.
+# Returns {failures_count, is_available}. Scripts are passed as bytes, so the sha is computed without a client encoder.
+INCREMENT_FAILURES_COUNT_SCRIPT: typing.Final = b"""
+local max_failure_count = tonumber(ARGV[2])
+local failures_count = redis.call("INCRBY", KEYS[1], ARGV[4])
+if KEYS[2] and (failures_count > max_failure_count or redis.call("EXISTS", KEYS[2]) == 1) then
+    if failures_count <= max_failure_count then
+        failures_count = max_failure_count + 1
+        redis.call("SET", KEYS[1], failures_count)
+    end
+    redis.call("SET", KEYS[2], 0, "EX", ARGV[3])
+end
+redis.call("EXPIRE", KEYS[1], ARGV[1])
+if failures_count <= max_failure_count then
+    return {failures_count, 1}
+end
+return {failures_count, 0}
+"""
+# KEYS[1] - failures counter, KEYS[2] - half-open probes counter, ARGV[1] - max failure count, ARGV[2] - max probes.
+# Returns 0 if the circuit is open, 1 if closed, 2 if the request is admitted as a half-open probe.
+IS_HOST_AVAILABLE_SCRIPT: typing.Final = b"""
+if tonumber(redis.call("GET", KEYS[1]) or "0") > tonumber(ARGV[1]) then
+    return 0
+end
+local admitted_probes = redis.call("GET", KEYS[2])
+if not admitted_probes then
+    return 1
+end
+if tonumber(admitted_probes) >= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call("INCR", KEYS[2])
+return 2
+"""
+# KEYS[1] - failures counter, KEYS[2] - half-open probes counter, ARGV[1] - max failure count.
+# Closes a half-open circuit, returns 1 if it was closed.
+RECORD_SUCCESS_SCRIPT: typing.Final = b"""
+if tonumber(redis.call("GET", KEYS[1]) or "0") <= tonumber(ARGV[1]) and redis.call("EXISTS", KEYS[2]) == 1 then
+    redis.call("DEL", KEYS[1], KEYS[2])
+    return 1
+end
+return 0
+"""
+# KEYS[1] - failures counter, KEYS[2] - half-open probes counter, ARGV[1] - max failure count,
+# ARGV[2] - success decay ratio, ARGV[3] - successes count.
+# Decays the failures count of a closed circuit once per success keeping its ttl, returns the decayed count.
+DECAY_FAILURES_COUNT_SCRIPT: typing.Final = b"""
+local failures_count = tonumber(redis.call("GET", KEYS[1]) or "0")
+if failures_count == 0 or failures_count > tonumber(ARGV[1]) or redis.call("EXISTS", KEYS[2]) == 1 then
+    return failures_count
+end
+failures_count = math.floor(failures_count * tonumber(ARGV[2]) ^ tonumber(ARGV[3]))
+if failures_count == 0 then
+    redis.call("DEL", KEYS[1])
+else
+    redis.call("SET", KEYS[1], failures_count, "KEEPTTL")
+end
+return failures_count
+"""
+HALF_OPEN_PROBE: typing.Final = 2
+T = typing.TypeVar("T")
+
+
+class RedisFailurePolicy(enum.Enum):
+    # retry failed redis calls and raise the last error
+    RAISE = "raise"
+    # treat hosts as available while redis is unavailable
+    FAIL_OPEN = "fail_open"
+    # treat hosts as unavailable while redis is unavailable
+    FAIL_CLOSED = "fail_closed"
+    # count failures in an embedded CircuitBreakerInMemory while redis is unavailable
+    IN_MEMORY = "in_memory"
+
+
+class _RedisUnavailableError(Exception):
+    """Redis call failed or was refused by the redis circuit, the failure policy applies."""
+
 
 def _log_attempt(retry_state: tenacity.RetryCallState) -> None:
     logger.info("Attempt redis_reconnect: %s", retry_state)
 
 
+def _redis_retrying() -> tenacity.AsyncRetrying:
+    return tenacity.AsyncRetrying(
+        sleep=asyncio.sleep,
+        stop=tenacity.stop_after_attempt(3),
+        wait=tenacity.wait_exponential_jitter(),
+        retry=tenacity.retry_if_exception_type(
+            (WatchError, RedisConnectionError, ConnectionResetError, TimeoutError, asyncio.TimeoutError)
+        ),
+        reraise=True,
+        before=_log_attempt,
+    )
+
+
 @dataclasses.dataclass(kw_only=True)
 class CircuitBreakerRedis(BaseCircuitBreaker):
     redis_connection: "aioredis.Redis[str]"
+    use_lua_script: bool = False
+    local_cache_ttl_in_seconds: float | None = None
+    local_cache_max_size: int = 1024
+    increment_failures_count_script: "AsyncScript | None" = dataclasses.field(init=False, default=None)
+    is_host_available_script: "AsyncScript | None" = dataclasses.field(init=False, default=None)
+    record_success_script: "AsyncScript | None" = dataclasses.field(init=False, default=None)
+    decay_failures_count_script: "AsyncScript | None" = dataclasses.field(init=False, default=None)
+    cache_hosts_availability: TTLCache[str, bool] | None = dataclasses.field(init=False, default=None)
+    redis_keys: dict[str, tuple[str, str]] = dataclasses.field(init=False, default_factory=dict)
+    # hosts this process sent half-open probes to, only their successes are reported to redis
+    cache_probing_hosts: TTLCache[str, bool] = dataclasses.field(init=False)
+    # write-behind mode: failures are coalesced per host and flushed in one pipeline
+    # every flush_interval_in_seconds or once flush_max_pending_failures are pending
+    flush_interval_in_seconds: float | None = None
+    flush_max_pending_failures: int = 100
+    # flushes run only in the background task, one at a time; flush_requested wakes it before the interval lapses
+    pending_failures: dict[str, int] = dataclasses.field(init=False, default_factory=dict)
+    pending_failures_count: int = dataclasses.field(init=False, default=0)
+    flush_task: "asyncio.Task[None] | None" = dataclasses.field(init=False, default=None)
+    flush_requested: asyncio.Event = dataclasses.field(init=False, default_factory=asyncio.Event)
+    flush_lock: asyncio.Lock = dataclasses.field(init=False, default_factory=asyncio.Lock)
+    is_flush_failing: bool = dataclasses.field(init=False, default=False)
+    # with success_decay_ratio successes are coalesced per host and written in one pipeline
+    # every success_flush_interval_in_seconds, a failure of the host drops its pending successes
+    success_flush_interval_in_seconds: float = 1.0
+    pending_successes: dict[str, int] = dataclasses.field(init=False, default_factory=dict)
+    success_flush_task: "asyncio.Task[None] | None" = dataclasses.field(init=False, default=None)
+    # state mirror mode: open and closed transitions are published to state_channel, every process subscribes
+    # and answers checks from its mirror, falling back to direct reads while the subscription is down
+    state_channel: str | None = None
+    state_mirror_resubscribe_interval_in_seconds: float = 1.0
+    # host -> availability and the monotonic time it is trusted until: open circuits for reset_timeout_in_seconds,
+    # closed ones for local_cache_ttl_in_seconds or reset_timeout_in_seconds, so a lost OPEN message is outlived
+    mirrored_hosts: dict[str, tuple[bool, float]] = dataclasses.field(init=False, default_factory=dict)
+    is_mirror_live: bool = dataclasses.field(init=False, default=False)
+    mirror_task: "asyncio.Task[None] | None" = dataclasses.field(init=False, default=None)
+    # every redis call is bounded by operation_timeout_in_seconds; with a failure policy other than RAISE
+    # it is not retried, redis_max_failure_count failed calls in a row stop calling redis
+    # for redis_reset_timeout_in_seconds and failures seen meanwhile are written back once redis answers again
+    failure_policy: RedisFailurePolicy = RedisFailurePolicy.RAISE
+    operation_timeout_in_seconds: float | None = None
+    redis_max_failure_count: int = 3
+    redis_reset_timeout_in_seconds: float = 5.0
+    redis_failures_count: int = dataclasses.field(init=False, default=0)
+    redis_open_until: float = dataclasses.field(init=False, default=0.0)
+    fallback_circuit_breaker: CircuitBreakerInMemory | None = dataclasses.field(init=False, default=None)
+    unreconciled_failures: dict[str, int] = dataclasses.field(init=False, default_factory=dict)
+    reconcile_task: "asyncio.Task[None] | None" = dataclasses.field(init=False, default=None)
+
+    def __post_init__(self) -> None:
+        # half-open state transitions must be atomic, so they are always evaluated by scripts
+        if self.use_lua_script or self.half_open_max_probes:
+            self.increment_failures_count_script = self.redis_connection.register_script(
+                INCREMENT_FAILURES_COUNT_SCRIPT
+            )
+        if self.half_open_max_probes:
+            self.is_host_available_script = self.redis_connection.register_script(IS_HOST_AVAILABLE_SCRIPT)
+            self.record_success_script = self.redis_connection.register_script(RECORD_SUCCESS_SCRIPT)
+        if self.success_decay_ratio is not None:
+            self.decay_failures_count_script = self.redis_connection.register_script(DECAY_FAILURES_COUNT_SCRIPT)
+        if self.local_cache_ttl_in_seconds:
+            self.cache_hosts_availability = TTLCache(
+                maxsize=self.local_cache_max_size, ttl=self.local_cache_ttl_in_seconds
+            )
+        self.cache_probing_hosts = TTLCache(maxsize=self.local_cache_max_size, ttl=self.reset_timeout_in_seconds)
+        if self.failure_policy is RedisFailurePolicy.IN_MEMORY:
+            self.fallback_circuit_breaker = CircuitBreakerInMemory(
+                reset_timeout_in_seconds=self.reset_timeout_in_seconds,
+                max_failure_count=self.max_failure_count,
+                half_open_max_probes=self.half_open_max_probes,
+                success_decay_ratio=self.success_decay_ratio,
+                max_cache_size=self.local_cache_max_size,
+                instrumentation=self.instrumentation,
+            )
 
     async def increment_failures_count(self, host: str) -> None:
-        for attempt in tenacity.Retrying(
-            stop=tenacity.stop_after_attempt(3),
-            wait=tenacity.wait_exponential_jitter(),
-            retry=tenacity.retry_if_exception_type(
-                (WatchError, RedisConnectionError, ConnectionResetError, TimeoutError)
-            ),
-            reraise=True,
-            before=_log_attempt,
-        ):
-            with attempt:
-                redis_key = f"circuit-breaker-{host}"
-                increment_result: int = await self.redis_connection.incr(redis_key)
-                logger.debug("Incremented error for redis_key: %s, increment_result: %s", redis_key, increment_result)
-                is_expire_set: bool = await self.redis_connection.expire(redis_key, self.reset_timeout_in_seconds)
-                logger.debug("Expire set for redis_key: %s, is_expire_set: %s", redis_key, is_expire_set)
+        host = self.intern_key(host)
+        self.pending_successes.pop(host, None)
+        if self.flush_interval_in_seconds:
+            await self._queue_failure(host)
+            return
+
+        if self.increment_failures_count_script:
+            await self.increment_failures_count_and_check(host)
+            return
+
+        redis_key: typing.Final = self._redis_keys(host)[0]
+        try:
+            increment_result: typing.Final = await self._call_redis(
+                BackendOperation.INCREMENT_FAILURES, lambda: self._increment_and_expire(redis_key)
+            )
+        except _RedisUnavailableError:
+            await self._increment_failures_count_locally(host)
+            return
+        await self._observe_failures_count(host, increment_result, added_failures_count=1)
+
+        if self.cache_hosts_availability is not None:
+            self.cache_hosts_availability.pop(host, None)
+
+    async def increment_failures_count_and_check(self, host: str) -> bool:
+        if self.flush_interval_in_seconds or not self.increment_failures_count_script:
+            return await super().increment_failures_count_and_check(host)
+
+        host = self.intern_key(host)
+        self.cache_probing_hosts.pop(host, None)
+        self.pending_successes.pop(host, None)
+        keys: typing.Final = self._increment_script_keys(host)
+        script: typing.Final = self.increment_failures_count_script
+        try:
+            failures_count, is_available = await self._call_redis(
+                BackendOperation.INCREMENT_FAILURES,
+                lambda: script(keys=keys, args=self._increment_script_args(failures_count=1)),
+            )
+        except _RedisUnavailableError:
+            return await self._increment_failures_count_locally(host)
+        logger.debug(
+            "Incremented error for redis_key: %s, failures_count: %s, is_available: %s",
+            keys[0],
+            failures_count,
+            is_available,
+        )
+        await self._observe_failures_count(host, failures_count, added_failures_count=1)
+        if self.cache_hosts_availability is not None:
+            self.cache_hosts_availability[host] = bool(is_available)
+        return bool(is_available)
+
+    async def record_success(self, host: str) -> None:
+        host = self.intern_key(host)
+        if self.fallback_circuit_breaker:
+            await self.fallback_circuit_breaker.record_success(host)
+        script: typing.Final = self.record_success_script
+        if not script or self.cache_probing_hosts.pop(host, None) is None:
+            if self.decay_failures_count_script:
+                self._queue_success(host)
+            return
+
+        try:
+            is_closed: typing.Final = await self._call_redis(
+                BackendOperation.RECORD_SUCCESS,
+                lambda: script(keys=self._redis_keys(host), args=[self.max_failure_count]),
+            )
+        except _RedisUnavailableError:
+            return
+        logger.debug("Recorded half-open probe success for host: '%s', is_closed: %s", host, is_closed)
+        if is_closed:
+            await self._report_transition(host, CircuitState.CLOSED)
+
+    def _queue_success(self, host: str) -> None:
+        if host not in self.pending_successes and len(self.pending_successes) >= self.local_cache_max_size:
+            return
+        self.pending_successes[host] = self.pending_successes.get(host, 0) + 1
+        if self.success_flush_task is None:
+            self.success_flush_task = asyncio.create_task(self._flush_successes_later())
+
+    async def _flush_successes_later(self) -> None:
+        await asyncio.sleep(self.success_flush_interval_in_seconds)
+        try:
+            await self.flush_successes()
+        except Exception:
+            logger.exception("Failed to decay failures counts by successes")
+        finally:
+            self.success_flush_task = None
+
+    async def flush_successes(self) -> None:
+        """Decay failures counts by pending successes in one pipeline, successes failed to write are dropped."""
+        pending_successes, self.pending_successes = self.pending_successes, {}
+        if not pending_successes:
+            return
+        with contextlib.suppress(_RedisUnavailableError):
+            await self._call_redis(
+                BackendOperation.RECORD_SUCCESS, lambda: self._decay_failures_counts(pending_successes)
+            )
+            logger.debug("Decayed failures counts by successes: %s", pending_successes)
+
+    async def _decay_failures_counts(self, pending_successes: dict[str, int]) -> None:
+        script: typing.Final = self.decay_failures_count_script
+        success_decay_ratio: typing.Final = self.success_decay_ratio
+        assert script
+        assert success_decay_ratio is not None
+        async with self.redis_connection.pipeline(transaction=False) as pipeline:
+            for host, successes_count in pending_successes.items():
+                await script(
+                    keys=self._redis_keys(host),
+                    args=[self.max_failure_count, success_decay_ratio, successes_count],
+                    client=pipeline,
+                )
+            await pipeline.execute()
 
     async def is_host_available(self, host: str) -> bool:
-        for attempt in tenacity.Retrying(
-            stop=tenacity.stop_after_attempt(3),
-            wait=tenacity.wait_exponential_jitter(),
-            retry=tenacity.retry_if_exception_type(
-                (WatchError, RedisConnectionError, ConnectionResetError, TimeoutError)
-            ),
-            reraise=True,
-            before=_log_attempt,
-        ):
-            with attempt:
-                failures_count = int(await self.redis_connection.get(f"circuit-breaker-{host}") or 0)
-                is_available: bool = failures_count <= self.max_failure_count
-                logger.warning(
-                    "host: '%s', failures_count: '%s', self.max_failure_count: '%s', is_available: '%s'",
-                    host,
-                    failures_count,
-                    self.max_failure_count,
-                    is_available,
+        host = self.intern_key(host)
+        cached_is_available: typing.Final = self.is_host_available_nowait(host)
+        if cached_is_available is not None:
+            return cached_is_available
+
+        try:
+            if self.is_host_available_script:
+                return await self._check_host_with_half_open_probes(host)
+            redis_key: typing.Final = self._redis_keys(host)[0]
+            failures_count: typing.Final = int(
+                await self._call_redis(BackendOperation.CHECK, lambda: self.redis_connection.get(redis_key)) or 0
+            )
+        except _RedisUnavailableError:
+            return await self._is_host_available_locally(host)
+        is_available: typing.Final = failures_count <= self.max_failure_count
+        self._cache_availability(host, is_available)
+        return is_available
+
+    async def are_hosts_available(self, hosts: typing.Iterable[str]) -> dict[str, bool]:
+        hosts_keys: typing.Final = {host: self.intern_key(host) for host in hosts}
+        keys_availability: typing.Final[dict[str, bool]] = {}
+        missed_keys: typing.Final[list[str]] = []
+        for key in dict.fromkeys(hosts_keys.values()):
+            cached_is_available = self._cached_availability(key)
+            if cached_is_available is not None:
+                keys_availability[key] = cached_is_available
+            else:
+                missed_keys.append(key)
+
+        if missed_keys:
+            try:
+                availabilities: typing.Final = await self._call_redis(
+                    BackendOperation.CHECK_MANY, lambda: self._fetch_hosts_availabilities(missed_keys)
+                )
+            except _RedisUnavailableError:
+                for key in missed_keys:
+                    keys_availability[key] = await self._is_host_available_locally(key)
+            else:
+                for key, availability in zip(missed_keys, availabilities, strict=True):
+                    keys_availability[key] = self._store_availability(key, availability)
+        hosts_availability: typing.Final = {host: keys_availability[key] for host, key in hosts_keys.items()}
+        logger.debug("hosts_availability: %s", hosts_availability)
+        return hosts_availability
+
+    async def _fetch_hosts_availabilities(self, hosts: list[str]) -> list[int]:
+        """Fetch availabilities in one round trip, same encoding as IS_HOST_AVAILABLE_SCRIPT returns."""
+        if self.is_host_available_script:
+            assert self.half_open_max_probes
+            async with self.redis_connection.pipeline(transaction=False) as pipeline:
+                for host in hosts:
+                    await self.is_host_available_script(
+                        keys=self._redis_keys(host),
+                        args=[self.max_failure_count, self.half_open_max_probes],
+                        client=pipeline,
+                    )
+                return [int(availability) for availability in await pipeline.execute()]
+
+        failures_counts: typing.Final = await self.redis_connection.mget([self._redis_keys(host)[0] for host in hosts])
+        return [int(int(failures_count or 0) <= self.max_failure_count) for failures_count in failures_counts]
+
+    async def _check_host_with_half_open_probes(self, host: str) -> bool:
+        script: typing.Final = self.is_host_available_script
+        assert script
+        assert self.half_open_max_probes
+        args: typing.Final = [self.max_failure_count, self.half_open_max_probes]
+        availability: typing.Final = int(
+            await self._call_redis(BackendOperation.CHECK, lambda: script(keys=self._redis_keys(host), args=args))
+        )
+        logger.debug("host: '%s', availability: '%s'", host, availability)
+        return self._store_availability(host, availability)
+
+    async def _increment_and_expire(self, redis_key: str) -> int:
+        increment_result: typing.Final = await self.redis_connection.incr(redis_key)
+        logger.debug("Incremented error for redis_key: %s, increment_result: %s", redis_key, increment_result)
+        is_expire_set: typing.Final = await self.redis_connection.expire(redis_key, self.reset_timeout_in_seconds)
+        logger.debug("Expire set for redis_key: %s, is_expire_set: %s", redis_key, is_expire_set)
+        return increment_result
+
+    def _store_availability(self, host: str, availability: int) -> bool:
+        if availability == HALF_OPEN_PROBE:
+            if host not in self.cache_probing_hosts:
+                self.instrumentation.state_transition(host, CircuitState.HALF_OPEN)
+            # probe admission must not be cached, every probe is counted by redis
+            self.cache_probing_hosts[host] = True
+        else:
+            self._cache_availability(host, bool(availability))
+        return bool(availability)
+
+    def is_host_available_nowait(self, host: str) -> bool | None:
+        host = self.intern_key(host)
+        if self.pending_failures.get(host, 0) > self.max_failure_count:
+            return False
+        return self._cached_availability(host)
+
+    def _cached_availability(self, host: str) -> bool | None:
+        if self.state_channel:
+            mirrored_is_available: typing.Final = self._mirrored_availability(host)
+            if mirrored_is_available is not None:
+                return mirrored_is_available
+        if self.cache_hosts_availability is not None:
+            return self.cache_hosts_availability.get(host)
+        return None
+
+    def _cache_availability(self, host: str, is_available: bool) -> None:
+        if self.cache_hosts_availability is not None:
+            self.cache_hosts_availability[host] = is_available
+        # open circuits are mirrored from published transitions only, their remaining open period is unknown here
+        if is_available and self.is_mirror_live and host not in self.mirrored_hosts:
+            self._mirror_state(host, CircuitState.CLOSED)
+
+    def _mirrored_availability(self, host: str) -> bool | None:
+        if self.mirror_task is None:
+            self.mirror_task = asyncio.create_task(self._mirror_states())
+        if not self.is_mirror_live:
+            return None
+
+        mirrored_state: typing.Final = self.mirrored_hosts.get(host)
+        if mirrored_state is None:
+            return None
+        is_available, valid_until = mirrored_state
+        if time.monotonic() < valid_until:
+            return is_available
+        # open period lapsed, redis admits half-open probes or tells the circuit is closed;
+        # closed circuits are read again in case their opening was never delivered
+        del self.mirrored_hosts[host]
+        return None
+
+    def _mirror_state(self, host: str, state: CircuitState) -> None:
+        if host not in self.mirrored_hosts and len(self.mirrored_hosts) >= self.local_cache_max_size:
+            del self.mirrored_hosts[next(iter(self.mirrored_hosts))]
+        if state is CircuitState.OPEN:
+            self.mirrored_hosts[host] = (False, time.monotonic() + self.reset_timeout_in_seconds)
+        else:
+            closed_ttl_in_seconds = self.local_cache_ttl_in_seconds or self.reset_timeout_in_seconds
+            self.mirrored_hosts[host] = (True, time.monotonic() + closed_ttl_in_seconds)
+
+    async def _mirror_states(self) -> None:
+        assert self.state_channel
+        while True:
+            try:
+                async with self.redis_connection.pubsub() as pubsub:
+                    await pubsub.subscribe(self.state_channel)
+                    # transitions published while unsubscribed are lost, the mirror is rebuilt by direct reads
+                    self.mirrored_hosts.clear()
+                    self.is_mirror_live = True
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self._apply_state_message(message["data"])
+            except Exception:
+                logger.exception(
+                    "State mirror subscription dropped, resubscribing in %s seconds",
+                    self.state_mirror_resubscribe_interval_in_seconds,
+                )
+            finally:
+                self.is_mirror_live = False
+            await asyncio.sleep(self.state_mirror_resubscribe_interval_in_seconds)
+
+    def _apply_state_message(self, data: str | bytes) -> None:
+        state, host = (data.decode() if isinstance(data, bytes) else data).split(" ", 1)
+        self._mirror_state(host, CircuitState(state))
+
+    async def stop_state_mirror(self) -> None:
+        """Unsubscribe from state transitions, call it on shutdown in mirror mode."""
+        if self.mirror_task is None:
+            return
+        self.mirror_task.cancel()
+        await asyncio.wait([self.mirror_task])
+        self.mirror_task = None
+
+    async def _observe_failures_count(self, host: str, failures_count: int, added_failures_count: int) -> None:
+        if failures_count - added_failures_count <= self.max_failure_count < failures_count:
+            await self._report_transition(host, CircuitState.OPEN)
+
+    async def _report_transition(self, host: str, state: CircuitState) -> None:
+        self.instrumentation.state_transition(host, state)
+        if not self.state_channel:
+            return
+
+        # this process does not wait for its own message to reach the mirror
+        self._mirror_state(host, state)
+        state_channel: typing.Final = self.state_channel
+        try:
+            await self._call_redis(
+                BackendOperation.PUBLISH, lambda: self.redis_connection.publish(state_channel, f"{state.value} {host}")
+            )
+        except _RedisUnavailableError:
+            logger.warning("Failed to publish %s circuit of host: '%s'", state.value, host)
+
+    async def _call_redis(self, operation: BackendOperation, call: typing.Callable[[], typing.Awaitable[T]]) -> T:
+        with self._measure(operation):
+            if self.failure_policy is RedisFailurePolicy.RAISE:
+                async for attempt in _redis_retrying():
+                    with attempt:
+                        return await self._with_timeout(call())
+                msg = "Unreachable code"  # pragma: no cover
+                raise RuntimeError(msg)  # pragma: no cover
+
+            if time.monotonic() < self.redis_open_until:
+                raise _RedisUnavailableError
+            try:
+                result: typing.Final = await self._with_timeout(call())
+            except (RedisError, OSError, asyncio.TimeoutError) as exc:
+                self.redis_failures_count += 1
+                if self.redis_failures_count >= self.redis_max_failure_count:
+                    self.redis_open_until = time.monotonic() + self.redis_reset_timeout_in_seconds
+                    logger.warning(
+                        "Redis failed %s calls in a row, applying %s policy for %s seconds",
+                        self.redis_failures_count,
+                        self.failure_policy.value,
+                        self.redis_reset_timeout_in_seconds,
+                    )
+                raise _RedisUnavailableError from exc
+
+        self.redis_failures_count = 0
+        if self.unreconciled_failures and self.reconcile_task is None:
+            self.reconcile_task = asyncio.create_task(self._reconcile_failures())
+        return result
+
+    def _with_timeout(self, awaitable: typing.Awaitable[T]) -> typing.Awaitable[T]:
+        # wait_for wraps the call into a task, so it is skipped without a timeout
+        if self.operation_timeout_in_seconds is None:
+            return awaitable
+        return asyncio.wait_for(awaitable, self.operation_timeout_in_seconds)
+
+    async def _increment_failures_count_locally(self, host: str) -> bool:
+        if host in self.unreconciled_failures or len(self.unreconciled_failures) < self.local_cache_max_size:
+            # counts over the ban threshold do not change the verdict, they are not piled up
+            self.unreconciled_failures[host] = min(
+                self.unreconciled_failures.get(host, 0) + 1, self.max_failure_count + 1
+            )
+        if self.fallback_circuit_breaker:
+            return await self.fallback_circuit_breaker.increment_failures_count_and_check(host)
+        return self.failure_policy is RedisFailurePolicy.FAIL_OPEN
+
+    async def _is_host_available_locally(self, host: str) -> bool:
+        if self.fallback_circuit_breaker:
+            return await self.fallback_circuit_breaker.is_host_available(host)
+        return self.failure_policy is RedisFailurePolicy.FAIL_OPEN
+
+    async def _reconcile_failures(self) -> None:
+        unreconciled_failures, self.unreconciled_failures = self.unreconciled_failures, {}
+        try:
+            results: typing.Final = await self._write_failures(unreconciled_failures)
+        except _RedisUnavailableError:
+            for host, failures_count in unreconciled_failures.items():
+                self.unreconciled_failures[host] = min(
+                    self.unreconciled_failures.get(host, 0) + failures_count, self.max_failure_count + 1
                 )
-                return is_available
-        msg = "Unreachable code"  # pragma: no cover
-        raise RuntimeError(msg)  # pragma: no cover
+            return
+        finally:
+            self.reconcile_task = None
+        logger.info("Wrote back failures counted while redis was unavailable: %s", unreconciled_failures)
+        # bans reached by the write back are published like any other
+        await self._observe_written_failures(unreconciled_failures, results)
+
+    @contextlib.contextmanager
+    def _measure(self, operation: BackendOperation) -> typing.Iterator[None]:
+        started_at: typing.Final = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.instrumentation.backend_latency(operation, time.perf_counter() - started_at)
+
+    def _increment_script_keys(self, host: str) -> tuple[str, ...]:
+        return self._redis_keys(host) if self.half_open_max_probes else self._redis_keys(host)[:1]
+
+    def _redis_keys(self, host: str) -> tuple[str, str]:
+        """Failures counter and half-open probes counter keys, formatted once per host."""
+        redis_keys = self.redis_keys.get(host)
+        if redis_keys is None:
+            if len(self.redis_keys) >= self.local_cache_max_size:
+                del self.redis_keys[next(iter(self.redis_keys))]
+            redis_keys = self.redis_keys[host] = (f"circuit-breaker-{host}", f"circuit-breaker-half-open-{host}")
+        return redis_keys
+
+    def _increment_script_args(self, failures_count: int) -> list[int]:
+        return [
+            self.reset_timeout_in_seconds,
+            self.max_failure_count,
+            self.reset_timeout_in_seconds * 2,
+            failures_count,
+        ]
+
+    async def _queue_failure(self, host: str) -> None:
+        if host not in self.pending_failures and len(self.pending_failures) >= self.local_cache_max_size:
+            logger.debug("Too many hosts with pending failures, dropped a failure of host: '%s'", host)
+            return
+
+        self._add_pending_failures(host, 1)
+        self.cache_probing_hosts.pop(host, None)
+        if self.cache_hosts_availability is not None:
+            self.cache_hosts_availability.pop(host, None)
+
+        # while redis is failing the background task keeps retrying every flush_interval_in_seconds
+        if self.pending_failures_count >= self.flush_max_pending_failures and not self.is_flush_failing:
+            self.flush_requested.set()
+        if self.flush_task is None:
+            self.flush_task = asyncio.create_task(self._flush_failures_later())
+
+    def _add_pending_failures(self, host: str, failures_count: int) -> None:
+        previous_failures_count: typing.Final = self.pending_failures.get(host, 0)
+        failures_count += previous_failures_count
+        if self.is_flush_failing:
+            # counts over the ban threshold do not change the verdict, they are not piled up while redis is failing
+            failures_count = min(failures_count, max(self.max_failure_count + 1, previous_failures_count))
+        self.pending_failures[host] = failures_count
+        self.pending_failures_count += failures_count - previous_failures_count
+
+    async def _flush_failures_later(self) -> None:
+        assert self.flush_interval_in_seconds
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self.flush_requested.wait(), self.flush_interval_in_seconds)
+        self.flush_requested.clear()
+        try:
+            await self.flush_failures()
+        except Exception:
+            logger.exception("Failed to flush pending failures, retrying in %s seconds", self.flush_interval_in_seconds)
+        finally:
+            self.flush_task = None
+        if self.pending_failures:
+            self.flush_task = asyncio.create_task(self._flush_failures_later())
+
+    async def flush_failures(self) -> None:
+        """Write pending failures to redis in one pipeline, call it on shutdown in write-behind mode."""
+        async with self.flush_lock:
+            pending_failures, self.pending_failures = self.pending_failures, {}
+            self.pending_failures_count = 0
+            if not pending_failures:
+                return
+
+            try:
+                results = await self._write_failures(pending_failures)
+            except Exception:
+                self.is_flush_failing = True
+                for host, failures_count in pending_failures.items():
+                    self._add_pending_failures(host, failures_count)
+                raise
+            self.is_flush_failing = False
+
+        await self._observe_written_failures(pending_failures, results)
+        logger.debug("Flushed pending failures: %s", pending_failures)
+
+    async def _observe_written_failures(self, written_failures: dict[str, int], results: list[typing.Any]) -> None:
+        if self.increment_failures_count_script:
+            for (host, added_failures_count), (failures_count, is_available) in zip(
+                written_failures.items(), results, strict=True
+            ):
+                await self._observe_failures_count(host, failures_count, added_failures_count)
+                if self.cache_hosts_availability is not None:
+                    self.cache_hosts_availability[host] = bool(is_available)
+        else:
+            # results alternate INCRBY and EXPIRE replies
+            for (host, added_failures_count), failures_count in zip(
+                written_failures.items(), results[::2], strict=True
+            ):
+                await self._observe_failures_count(host, failures_count, added_failures_count)
+
+    async def _write_failures(self, pending_failures: dict[str, int]) -> list[typing.Any]:
+        return await self._call_redis(BackendOperation.FLUSH, lambda: self._write_failures_pipeline(pending_failures))
+
+    async def _write_failures_pipeline(self, pending_failures: dict[str, int]) -> list[typing.Any]:
+        # without scripts INCRBY and EXPIRE are wrapped into MULTI, so a counter never stays without ttl
+        async with self.redis_connection.pipeline(transaction=not self.increment_failures_count_script) as pipeline:
+            for host, failures_count in pending_failures.items():
+                if self.increment_failures_count_script:
+                    await self.increment_failures_count_script(
+                        keys=self._increment_script_keys(host),
+                        args=self._increment_script_args(failures_count),
+                        client=pipeline,
+                    )
+                else:
+                    redis_key = self._redis_keys(host)[0]
+                    pipeline.incrby(redis_key, failures_count).expire(redis_key, self.reset_timeout_in_seconds)
+            results: list[typing.Any] = await pipeline.execute()
+            return results
 
     async def raise_host_unavailable_error(self, host: str) -> typing.NoReturn:
         msg = f"Host {host} banned by circuitbreaker for {(self.reset_timeout_in_seconds / 60):.2f} minutes."
@@ -0,0 +1,280 @@
+import contextlib
+import dataclasses
+import hashlib
+import logging
+import os
+import pathlib
+import struct
+import sys
+import tempfile
+import time
+import typing
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+from circuit_breaker_box import BaseCircuitBreaker, errors
+from circuit_breaker_box.instrumentation import CircuitState
+
+
+with contextlib.suppress(ImportError):
+    import fcntl
+
+
+logger = logging.getLogger(__name__)
+
+# header: slots count, so workers configured with another max_cache_size are rejected
+_HEADER: typing.Final = struct.Struct("=Q")
+# slot: sequence, key hash, failures count, failures expire at, half-open expire at, admitted probes;
+# the sequence is odd while the slot is written, readers retry until they see the same even sequence twice
+_SEQUENCE: typing.Final = struct.Struct("=Q")
+_FIELDS: typing.Final = struct.Struct("=Qqddq")
+_SLOT_SIZE: typing.Final = _SEQUENCE.size + _FIELDS.size
+_EMPTY_KEY_HASH: typing.Final = 0
+# a host is looked up in at most this many slots after its home slot
+MAX_PROBES: typing.Final = 16
+# a sequence staying odd means a writer died mid-write, the next write repairs the slot
+_MAX_READ_ATTEMPTS: typing.Final = 1000
+
+
+class _Slot(typing.NamedTuple):
+    key_hash: int
+    failures_count: int
+    failures_expire_at: float
+    half_open_expire_at: float
+    admitted_probes: int
+
+
+@dataclasses.dataclass(kw_only=True)
+class CircuitBreakerSharedMemory(BaseCircuitBreaker):
+    """Node-local backend on a fixed-size hash table in shared memory, same semantics as CircuitBreakerFastInMemory.
+
+    Every process opening the same name shares one table, so a ban recorded by one worker applies to all of them
+    right away. Checks read the table without a system call or lock, writes are serialized with flock
+    on lock_path. Hosts are stored by a 64-bit hash and expired slots are reused, once the probed slots of a host
+    are all live the one expiring first is taken over. POSIX only; the table outlives the processes
+    (and so keeps bans over restarts), call unlink() to remove it.
+    """
+
+    max_cache_size: int
+    name: str = "circuit-breaker-box"
+    lock_path: pathlib.Path | None = None
+    # time.monotonic is system-wide, so deadlines written by one process are valid in another
+    timer: typing.Callable[[], float] = time.monotonic
+    shared_memory: SharedMemory = dataclasses.field(init=False)
+    buffer: memoryview = dataclasses.field(init=False)
+    slots_mask: int = dataclasses.field(init=False)
+    lock_fd: int = dataclasses.field(init=False)
+    keys_hashes: dict[str, int] = dataclasses.field(init=False, default_factory=dict)
+
+    def __post_init__(self) -> None:
+        lock_path: typing.Final = self.lock_path or pathlib.Path(tempfile.gettempdir()) / f"{self.name}.lock"
+        self.lock_fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        # open addressing needs spare slots, the table is at most half full
+        slots_count: typing.Final = 1 << max(self.max_cache_size * 2 - 1, 1).bit_length()
+        # the header is written under the lock, so workers attaching meanwhile never read a blank one
+        with self._locked():
+            try:
+                self.shared_memory = self._open_shared_memory(create=True, size=_HEADER.size + slots_count * _SLOT_SIZE)
+                assert self.shared_memory.buf is not None
+                _HEADER.pack_into(self.shared_memory.buf, 0, slots_count)
+            except FileExistsError:
+                self.shared_memory = self._open_shared_memory(create=False, size=0)
+        assert self.shared_memory.buf is not None
+        self.buffer = self.shared_memory.buf
+        (table_slots_count,) = _HEADER.unpack_from(self.buffer, 0)
+        if table_slots_count != slots_count:
+            self.close()
+            msg = (
+                f"Shared memory '{self.name}' holds {table_slots_count} slots instead of {slots_count}, "
+                "max_cache_size must match"
+            )
+            raise ValueError(msg)
+        self.slots_mask = slots_count - 1
+
+    def _open_shared_memory(self, *, create: bool, size: int) -> SharedMemory:
+        # no worker owns the table, the resource tracker of the first one to exit must not remove it
+        if sys.version_info >= (3, 13):
+            return SharedMemory(name=self.name, create=create, size=size, track=False)  # pragma: no cover
+        opened_shared_memory: typing.Final = SharedMemory(name=self.name, create=create, size=size)
+        resource_tracker.unregister(opened_shared_memory._name, "shared_memory")  # type: ignore[attr-defined] # noqa: SLF001
+        return opened_shared_memory
+
+    def close(self) -> None:
+        """Detach this process from the table, other processes keep using it."""
+        self.buffer.release()
+        self.shared_memory.close()
+        os.close(self.lock_fd)
+
+    def unlink(self) -> None:
+        """Remove the table, processes attached to it keep their mapping until they close it."""
+        if sys.version_info < (3, 13):
+            # unlink() unregisters the table from the resource tracker, which fails for untracked tables
+            resource_tracker.register(self.shared_memory._name, "shared_memory")  # type: ignore[attr-defined] # noqa: SLF001
+        self.shared_memory.unlink()
+
+    async def increment_failures_count(self, host: str) -> None:
+        self._increment_failures_count(host)
+
+    async def increment_failures_count_and_check(self, host: str) -> bool:
+        self._increment_failures_count(host)
+        return self.is_host_available_nowait(host)
+
+    async def record_success(self, host: str) -> None:
+        host = self.intern_key(host)
+        key_hash: typing.Final = self._key_hash(host)
+        now: typing.Final = self.timer()
+        # successes of healthy hosts only read the table
+        found: typing.Final = self._find(key_hash)
+        if found is None or not self._is_success_recorded(found[1], now):
+            return
+
+        with self._locked():
+            found_locked: typing.Final = self._find(key_hash)
+            if found_locked is None or not self._is_success_recorded(found_locked[1], now):
+                return
+            index, slot = found_locked
+            if self.half_open_max_probes and now < slot.half_open_expire_at:
+                self._write(index, _Slot(key_hash, 0, 0.0, 0.0, 0))
+            else:
+                self._write(index, slot._replace(failures_count=self.decay_failures_count(slot.failures_count)))
+                return
+        self.instrumentation.state_transition(host, CircuitState.CLOSED)
+        logger.debug("Closed circuit for host: '%s'", host)
+
+    def _is_success_recorded(self, slot: _Slot, now: float) -> bool:
+        failures_count: typing.Final = self._failures_count(slot, now)
+        if failures_count > self.max_failure_count:
+            return False
+        if self.half_open_max_probes and now < slot.half_open_expire_at:
+            return True
+        return self.success_decay_ratio is not None and failures_count > 0
+
+    async def is_host_available(self, host: str) -> bool:
+        return self.is_host_available_nowait(host)
+
+    async def are_hosts_available(self, hosts: typing.Iterable[str]) -> dict[str, bool]:
+        return {host: self.is_host_available_nowait(host) for host in hosts}
+
+    def is_host_available_nowait(self, host: str) -> bool:
+        host = self.intern_key(host)
+        key_hash: typing.Final = self._key_hash(host)
+        found: typing.Final = self._find(key_hash)
+        if found is None:
+            return True
+
+        now: typing.Final = self.timer()
+        if self._failures_count(found[1], now) > self.max_failure_count:
+            return False
+        if not self.half_open_max_probes or now >= found[1].half_open_expire_at:
+            return True
+        return self._admit_probe(host, key_hash, now)
+
+    def _admit_probe(self, host: str, key_hash: int, now: float) -> bool:
+        # probes are admitted one at a time across processes
+        with self._locked():
+            found_locked: typing.Final = self._find(key_hash)
+            # another process may have closed or reopened the circuit meanwhile
+            if found_locked is None or not self.half_open_max_probes or now >= found_locked[1].half_open_expire_at:
+                return True
+            index, slot = found_locked
+            if self._failures_count(slot, now) > self.max_failure_count or (
+                slot.admitted_probes >= self.half_open_max_probes
+            ):
+                return False
+            self._write(index, slot._replace(admitted_probes=slot.admitted_probes + 1))
+        if not slot.admitted_probes:
+            self.instrumentation.state_transition(host, CircuitState.HALF_OPEN)
+        return True
+
+    def _increment_failures_count(self, host: str) -> None:
+        host = self.intern_key(host)
+        key_hash: typing.Final = self._key_hash(host)
+        now: typing.Final = self.timer()
+        with self._locked():
+            index, slot = self._find_or_take_slot(key_hash, now)
+            previous_failures_count: typing.Final = self._failures_count(slot, now)
+            if self.half_open_max_probes and now < slot.half_open_expire_at:
+                failures_count = max(previous_failures_count + 1, self.max_failure_count + 1)
+            else:
+                failures_count = previous_failures_count + 1
+            slot = slot._replace(failures_count=failures_count, failures_expire_at=now + self.reset_timeout_in_seconds)
+            if self.half_open_max_probes and failures_count > self.max_failure_count:
+                slot = slot._replace(half_open_expire_at=now + self.reset_timeout_in_seconds * 2, admitted_probes=0)
+            self._write(index, slot)
+
+        if previous_failures_count <= self.max_failure_count < failures_count:
+            self.instrumentation.state_transition(host, CircuitState.OPEN)
+            logger.debug("Opened circuit for host: '%s'", host)
+
+    def _find(self, key_hash: int) -> tuple[int, _Slot] | None:
+        for probe in range(MAX_PROBES):
+            index = (key_hash + probe) & self.slots_mask
+            slot = self._read(index)
+            if slot.key_hash == key_hash:
+                return index, slot
+            if slot.key_hash == _EMPTY_KEY_HASH:
+                return None
+        return None
+
+    def _find_or_take_slot(self, key_hash: int, now: float) -> tuple[int, _Slot]:
+        """Find the slot of a host or take an empty, expired or the soonest expiring one, call it locked."""
+        taken_index: int | None = None
+        taken_expire_at = float("inf")
+        for probe in range(MAX_PROBES):
+            index = (key_hash + probe) & self.slots_mask
+            slot = self._read(index)
+            if slot.key_hash == key_hash:
+                return index, slot
+            expire_at = max(slot.failures_expire_at, slot.half_open_expire_at)
+            if expire_at < taken_expire_at:
+                taken_index, taken_expire_at = index, expire_at
+            if slot.key_hash == _EMPTY_KEY_HASH:
+                break
+        assert taken_index is not None
+        if taken_expire_at > now:
+            logger.debug("Shared memory table is crowded, took over a live slot for key hash: %s", key_hash)
+        return taken_index, _Slot(key_hash, 0, 0.0, 0.0, 0)
+
+    def _read(self, index: int) -> _Slot:
+        offset: typing.Final = _HEADER.size + index * _SLOT_SIZE
+        for _ in range(_MAX_READ_ATTEMPTS):
+            (sequence,) = _SEQUENCE.unpack_from(self.buffer, offset)
+            slot = _Slot._make(_FIELDS.unpack_from(self.buffer, offset + _SEQUENCE.size))
+            if not sequence % 2 and _SEQUENCE.unpack_from(self.buffer, offset)[0] == sequence:
+                return slot
+        logger.warning("Shared memory slot %s stays written, reading it as is", index)
+        return slot
+
+    def _write(self, index: int, slot: _Slot) -> None:
+        offset: typing.Final = _HEADER.size + index * _SLOT_SIZE
+        (sequence,) = _SEQUENCE.unpack_from(self.buffer, offset)
+        writing_sequence: typing.Final = sequence | 1
+        _SEQUENCE.pack_into(self.buffer, offset, writing_sequence)
+        _FIELDS.pack_into(self.buffer, offset + _SEQUENCE.size, *slot)
+        _SEQUENCE.pack_into(self.buffer, offset, writing_sequence + 1)
+
+    @contextlib.contextmanager
+    def _locked(self) -> typing.Iterator[None]:
+        # nothing awaits while the lock is held, so coroutines of one process never contend for it
+        fcntl.flock(self.lock_fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self.lock_fd, fcntl.LOCK_UN)
+
+    def _key_hash(self, host: str) -> int:
+        key_hash = self.keys_hashes.get(host)
+        if key_hash is None:
+            if len(self.keys_hashes) >= self.max_cache_size:
+                del self.keys_hashes[next(iter(self.keys_hashes))]
+            digest = hashlib.blake2b(host.encode(), digest_size=8).digest()
+            key_hash = self.keys_hashes[host] = int.from_bytes(digest, "little") or 1
+        return key_hash
+
+    @staticmethod
+    def _failures_count(slot: _Slot, now: float) -> int:
+        return slot.failures_count if now < slot.failures_expire_at else 0
+
+    async def raise_host_unavailable_error(self, host: str) -> typing.NoReturn:
+        msg = f"Host {host} banned by circuitbreaker for {(self.reset_timeout_in_seconds / 60):.2f} minutes."
+        raise errors.HostUnavailableError(msg)
@@ -0,0 +1,178 @@
+import array
+import dataclasses
+import logging
+import time
+import typing
+
+from cachetools import LRUCache
+
+from circuit_breaker_box import BaseCircuitBreaker, errors
+from circuit_breaker_box.instrumentation import CircuitState
+
+
+logger = logging.getLogger(__name__)
+
+
+class _HostWindow:
+    """Ring buffer of fixed-size time buckets, preallocated once per host."""
+
+    __slots__ = ("admitted_probes", "failures", "opened_until", "requests", "slots", "slow_calls")
+
+    def __init__(self, buckets_count: int) -> None:
+        self.slots = array.array("q", [-1] * buckets_count)
+        self.requests = array.array("L", [0] * buckets_count)
+        self.failures = array.array("L", [0] * buckets_count)
+        self.slow_calls = array.array("L", [0] * buckets_count)
+        self.opened_until = 0.0
+        self.admitted_probes = 0
+
+    def record(self, slot: int, *, is_failure: bool, is_slow: bool = False) -> None:
+        index = slot % len(self.slots)
+        if self.slots[index] != slot:
+            self.slots[index] = slot
+            self.requests[index] = 0
+            self.failures[index] = 0
+            self.slow_calls[index] = 0
+        self.requests[index] += 1
+        if is_failure:
+            self.failures[index] += 1
+        if is_slow:
+            self.slow_calls[index] += 1
+
+    def totals(self, slot: int) -> tuple[int, int, int]:
+        buckets_count = len(self.slots)
+        requests_count = failures_count = slow_calls_count = 0
+        for index in range(buckets_count):
+            if slot - self.slots[index] < buckets_count:
+                requests_count += self.requests[index]
+                failures_count += self.failures[index]
+                slow_calls_count += self.slow_calls[index]
+        return requests_count, failures_count, slow_calls_count
+
+    def reset(self) -> None:
+        for index in range(len(self.slots)):
+            self.slots[index] = -1
+            self.requests[index] = 0
+            self.failures[index] = 0
+            self.slow_calls[index] = 0
+        self.opened_until = 0.0
+        self.admitted_probes = 0
+
+
+@dataclasses.dataclass(kw_only=True)
+class CircuitBreakerSlidingWindow(BaseCircuitBreaker):
+    """Trips on the failure ratio over the last window_size_in_seconds.
+
+    The circuit opens for reset_timeout_in_seconds when the window holds at least minimum_requests_count requests,
+    more than max_failure_count failures and the failure ratio reaches failure_rate_threshold, or, with
+    slow_call_rate_threshold set, when the ratio of slow calls reported by the outcome classifier reaches it.
+    A slow half-open probe reopens the circuit like a failed one.
+    """
+
+    max_cache_size: int
+    failure_rate_threshold: float
+    window_size_in_seconds: float
+    buckets_count: int = 10
+    minimum_requests_count: int = 100
+    # None records slow calls as successes
+    slow_call_rate_threshold: float | None = None
+    timer: typing.Callable[[], float] = time.monotonic
+    hosts_windows: LRUCache[str, _HostWindow] = dataclasses.field(init=False)
+    bucket_width_in_seconds: float = dataclasses.field(init=False)
+
+    def __post_init__(self) -> None:
+        self.hosts_windows = LRUCache(maxsize=self.max_cache_size)
+        self.bucket_width_in_seconds = self.window_size_in_seconds / self.buckets_count
+
+    def _get_window(self, host: str) -> _HostWindow:
+        window = self.hosts_windows.get(host)
+        if window is None:
+            window = self.hosts_windows[host] = _HostWindow(self.buckets_count)
+        return window
+
+    def _is_open_lapsed(self, window: _HostWindow, now: float) -> bool:
+        """Whether the circuit has to close: no half-open state or the half-open window lapsed without a verdict."""
+        return now >= window.opened_until and (
+            not self.half_open_max_probes or now >= window.opened_until + self.reset_timeout_in_seconds
+        )
+
+    async def increment_failures_count(self, host: str) -> None:
+        self._record_unhealthy_call(host, is_failure=True)
+
+    async def record_slow_call(self, host: str) -> None:
+        if self.slow_call_rate_threshold is None:
+            await self.record_success(host)
+        else:
+            self._record_unhealthy_call(host, is_failure=False)
+
+    def _record_unhealthy_call(self, host: str, *, is_failure: bool) -> None:
+        """Record a failed or a slow call, either one reopens a half-open circuit."""
+        host = self.intern_key(host)
+        now = self.timer()
+        window = self._get_window(host)
+        if window.opened_until and self._is_open_lapsed(window, now):
+            window.reset()
+
+        if window.opened_until:
+            if now >= window.opened_until:
+                window.opened_until = now + self.reset_timeout_in_seconds
+                window.admitted_probes = 0
+                self.instrumentation.state_transition(host, CircuitState.OPEN)
+                logger.debug("Reopened circuit for host: '%s'", host)
+            return
+
+        slot = int(now / self.bucket_width_in_seconds)
+        window.record(slot, is_failure=is_failure, is_slow=not is_failure)
+        requests_count, failures_count, slow_calls_count = window.totals(slot)
+        if requests_count >= self.minimum_requests_count and (
+            (failures_count > self.max_failure_count and failures_count >= requests_count * self.failure_rate_threshold)
+            or (
+                self.slow_call_rate_threshold is not None
+                and slow_calls_count >= requests_count * self.slow_call_rate_threshold
+            )
+        ):
+            window.reset()
+            window.opened_until = now + self.reset_timeout_in_seconds
+            self.instrumentation.state_transition(host, CircuitState.OPEN)
+            logger.debug(
+                "Opened circuit for host: '%s', requests_count: %s, failures_count: %s, slow_calls_count: %s",
+                host,
+                requests_count,
+                failures_count,
+                slow_calls_count,
+            )
+
+    async def record_success(self, host: str) -> None:
+        host = self.intern_key(host)
+        now = self.timer()
+        window = self._get_window(host)
+        if window.opened_until:
+            if now < window.opened_until:
+                return
+            window.reset()
+            self.instrumentation.state_transition(host, CircuitState.CLOSED)
+            logger.debug("Closed circuit for host: '%s'", host)
+        window.record(int(now / self.bucket_width_in_seconds), is_failure=False)
+
+    async def is_host_available(self, host: str) -> bool:
+        host = self.intern_key(host)
+        window = self.hosts_windows.get(host)
+        if window is None or not window.opened_until:
+            return True
+
+        now = self.timer()
+        if now < window.opened_until:
+            return False
+        if self._is_open_lapsed(window, now):
+            window.reset()
+            return True
+        if window.admitted_probes >= typing.cast("int", self.half_open_max_probes):
+            return False
+        if not window.admitted_probes:
+            self.instrumentation.state_transition(host, CircuitState.HALF_OPEN)
+        window.admitted_probes += 1
+        return True
+
+    async def raise_host_unavailable_error(self, host: str) -> typing.NoReturn:
+        msg = f"Host {host} banned by circuitbreaker for {(self.reset_timeout_in_seconds / 60):.2f} minutes."
+        raise errors.HostUnavailableError(msg)
@@ -0,0 +1,35 @@
+import contextlib
+import contextvars
+import time
+import typing
+
+
+# absolute time.monotonic() deadline of the current request, None without one
+current_deadline: typing.Final[contextvars.ContextVar[float | None]] = contextvars.ContextVar(
+    "circuit_breaker_box_deadline", default=None
+)
+
+
+@contextlib.contextmanager
+def deadline_at(deadline: float) -> typing.Iterator[None]:
+    """Bound Retrier calls within the block by an absolute time.monotonic() deadline, an earlier outer one wins."""
+    outer_deadline: typing.Final = current_deadline.get()
+    token: typing.Final = current_deadline.set(deadline if outer_deadline is None else min(outer_deadline, deadline))
+    try:
+        yield
+    finally:
+        current_deadline.reset(token)
+
+
+def deadline_after(timeout_in_seconds: float) -> typing.ContextManager[None]:
+    """Bound Retrier calls within the block by timeout_in_seconds from now."""
+    return deadline_at(time.monotonic() + timeout_in_seconds)
+
+
+def remaining_budget_in_seconds() -> float | None:
+    """Return the time left until the current deadline, None without one.
+
+    Within an attempt it is bounded by the attempt timeout, so coroutines can pass it on as their own timeout.
+    """
+    deadline: typing.Final = current_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
@@ -8,3 +8,15 @@ class BaseCircuitBreakerError(Exception):
 
 class HostUnavailableError(BaseCircuitBreakerError):
     pass
+
+
+class BulkheadFullError(BaseCircuitBreakerError):
+    pass
+
+
+class TooManyKeysError(BaseCircuitBreakerError):
+    pass
+
+
+class DeadlineExceededError(BaseCircuitBreakerError):
+    pass
@@ -0,0 +1,47 @@
+import collections
+import dataclasses
+import math
+
+
+@dataclasses.dataclass(kw_only=True)
+class HedgingPolicy:
+    """When Retrier sends a hedged attempt and how many hedges may be in flight.
+
+    The hedging delay is delay_in_seconds or, with delay_percentile set, that percentile of observed latencies.
+    Share one instance between Retrier instances to share the budget of max_concurrent_hedges.
+    """
+
+    delay_in_seconds: float
+    delay_percentile: float | None = None
+    max_hedged_attempts: int = 1
+    max_concurrent_hedges: int = 100
+    latency_window_size: int = 1000
+    recalculate_delay_every: int = 100
+    in_flight_hedges: int = dataclasses.field(init=False, default=0)
+    current_delay_in_seconds: float = dataclasses.field(init=False)
+    observed_latencies: collections.deque[float] = dataclasses.field(init=False)
+    observed_latencies_count: int = dataclasses.field(init=False, default=0)
+
+    def __post_init__(self) -> None:
+        self.current_delay_in_seconds = self.delay_in_seconds
+        self.observed_latencies = collections.deque(maxlen=self.latency_window_size)
+
+    def observe_latency(self, latency_in_seconds: float) -> None:
+        if self.delay_percentile is None:
+            return
+
+        self.observed_latencies.append(latency_in_seconds)
+        self.observed_latencies_count += 1
+        if self.observed_latencies_count % self.recalculate_delay_every == 0:
+            sorted_latencies = sorted(self.observed_latencies)
+            percentile_index = math.ceil(len(sorted_latencies) * self.delay_percentile / 100) - 1
+            self.current_delay_in_seconds = sorted_latencies[max(percentile_index, 0)]
+
+    def acquire_hedge(self) -> bool:
+        if self.in_flight_hedges >= self.max_concurrent_hedges:
+            return False
+        self.in_flight_hedges += 1
+        return True
+
+    def release_hedge(self) -> None:
+        self.in_flight_hedges -= 1
@@ -0,0 +1,32 @@
+import dataclasses
+import typing
+
+import httpx
+
+from circuit_breaker_box.keys import CircuitBreakerKeys
+from circuit_breaker_box.retrier import Retrier
+
+
+@dataclasses.dataclass(kw_only=True)
+class RetryingTransport(httpx.AsyncBaseTransport):
+    """Sends every request of an httpx.AsyncClient through retrier, keyed by the request host.
+
+    All attempts go through one wrapped transport, so they share its connection pool. Pass keys to isolate
+    circuits per host and method. Request bodies are buffered so they can be sent again.
+    Attempts are retried on exceptions matching retry_cause, like httpx.TransportError, responses are returned as is;
+    an outcome classifier of the retrier records failed responses and slow ones with the circuit breaker.
+    """
+
+    retrier: Retrier[httpx.Response]
+    transport: httpx.AsyncBaseTransport = dataclasses.field(default_factory=httpx.AsyncHTTPTransport)
+    keys: CircuitBreakerKeys | None = None
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host: typing.Final = (
+            self.keys.derive(request.url.host, method=request.method) if self.keys else request.url.host
+        )
+        await request.aread()
+        return await self.retrier.retry(self.transport.handle_async_request, host, request)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
@@ -0,0 +1,46 @@
+import enum
+import typing
+
+
+class CircuitState(enum.Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class BackendOperation(enum.Enum):
+    INCREMENT_FAILURES = "increment_failures"
+    CHECK = "check"
+    CHECK_MANY = "check_many"
+    RECORD_SUCCESS = "record_success"
+    FLUSH = "flush"
+    PUBLISH = "publish"
+
+
+class Instrumentation:
+    """Metrics hooks of Retrier and circuit breakers, this base class does nothing.
+
+    Hooks are called on the hot path with hosts, enum members and floats only, so adapters map them
+    to metric labels without formatting strings. Circuits closed by their reset timeout lapsing are not reported,
+    backends only notice it on the next check.
+    """
+
+    __slots__ = ()
+
+    def attempt(self, host: str | None) -> None:
+        """Count an attempt, the first one included."""
+
+    def retry(self, host: str | None, backoff_in_seconds: float) -> None:
+        """Count a failed attempt retried after sleeping backoff_in_seconds."""
+
+    def short_circuit(self, host: str) -> None:
+        """Count a call refused without reaching the host."""
+
+    def state_transition(self, host: str, state: CircuitState) -> None:
+        """Report the circuit of the host turning to state."""
+
+    def backend_latency(self, operation: BackendOperation, latency_in_seconds: float) -> None:
+        """Observe a call to a remote backend, retries included."""
+
+
+NO_INSTRUMENTATION: typing.Final = Instrumentation()
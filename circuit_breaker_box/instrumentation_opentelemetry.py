@@ -0,0 +1,72 @@
+import contextlib
+import dataclasses
+import typing
+
+from circuit_breaker_box.instrumentation import BackendOperation, CircuitState, Instrumentation
+
+
+with contextlib.suppress(ImportError):
+    from opentelemetry import metrics
+
+
+@dataclasses.dataclass(kw_only=True)
+class OpenTelemetryInstrumentation(Instrumentation):
+    """Exports hooks as OpenTelemetry counters and histograms of meter, the global one by default.
+
+    Hosts become the `host` attribute only with label_hosts, cap their cardinality with CircuitBreakerKeys then.
+    """
+
+    meter: "metrics.Meter | None" = None
+    prefix: str = "circuit_breaker_box"
+    label_hosts: bool = False
+    attempts: "metrics.Counter" = dataclasses.field(init=False)
+    retries: "metrics.Counter" = dataclasses.field(init=False)
+    backoff: "metrics.Histogram" = dataclasses.field(init=False)
+    short_circuits: "metrics.Counter" = dataclasses.field(init=False)
+    state_transitions: "metrics.Counter" = dataclasses.field(init=False)
+    backend_latency_histogram: "metrics.Histogram" = dataclasses.field(init=False)
+    # attributes are built once per enum member, not per call
+    states_attributes: dict[CircuitState, dict[str, str]] = dataclasses.field(init=False)
+    operations_attributes: dict[BackendOperation, dict[str, str]] = dataclasses.field(init=False)
+
+    def __post_init__(self) -> None:
+        meter: typing.Final = self.meter or metrics.get_meter("circuit_breaker_box")
+        self.attempts = meter.create_counter(f"{self.prefix}.attempts", description="Attempts, the first ones included")
+        self.retries = meter.create_counter(f"{self.prefix}.retries", description="Retried attempts")
+        self.backoff = meter.create_histogram(
+            f"{self.prefix}.backoff", unit="s", description="Time slept before retries"
+        )
+        self.short_circuits = meter.create_counter(
+            f"{self.prefix}.short_circuits", description="Calls refused without reaching the host"
+        )
+        self.state_transitions = meter.create_counter(
+            f"{self.prefix}.state_transitions", description="Circuit state transitions"
+        )
+        self.backend_latency_histogram = meter.create_histogram(
+            f"{self.prefix}.backend_latency", unit="s", description="Latency of remote breaker backend calls"
+        )
+        self.states_attributes = {state: {"state": state.value} for state in CircuitState}
+        self.operations_attributes = {operation: {"operation": operation.value} for operation in BackendOperation}
+
+    def _host_attributes(self, host: str | None) -> dict[str, str] | None:
+        return {"host": host or ""} if self.label_hosts else None
+
+    def attempt(self, host: str | None) -> None:
+        self.attempts.add(1, self._host_attributes(host))
+
+    def retry(self, host: str | None, backoff_in_seconds: float) -> None:
+        attributes: typing.Final = self._host_attributes(host)
+        self.retries.add(1, attributes)
+        self.backoff.record(backoff_in_seconds, attributes)
+
+    def short_circuit(self, host: str) -> None:
+        self.short_circuits.add(1, self._host_attributes(host))
+
+    def state_transition(self, host: str, state: CircuitState) -> None:
+        attributes = self.states_attributes[state]
+        if self.label_hosts:
+            attributes = {**attributes, "host": host}
+        self.state_transitions.add(1, attributes)
+
+    def backend_latency(self, operation: BackendOperation, latency_in_seconds: float) -> None:
+        self.backend_latency_histogram.record(latency_in_seconds, self.operations_attributes[operation])
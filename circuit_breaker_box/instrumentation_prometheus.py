@@ -0,0 +1,84 @@
+import contextlib
+import dataclasses
+import typing
+
+from circuit_breaker_box.instrumentation import BackendOperation, CircuitState, Instrumentation
+
+
+with contextlib.suppress(ImportError):
+    import prometheus_client
+
+
+@dataclasses.dataclass(kw_only=True)
+class PrometheusInstrumentation(Instrumentation):
+    """Exports hooks as prometheus_client counters and histograms.
+
+    Hosts become a label only with label_hosts, cap their cardinality with CircuitBreakerKeys then.
+    """
+
+    registry: "prometheus_client.CollectorRegistry | None" = None
+    namespace: str = "circuit_breaker_box"
+    label_hosts: bool = False
+    attempts: "prometheus_client.Counter" = dataclasses.field(init=False)
+    retries: "prometheus_client.Counter" = dataclasses.field(init=False)
+    backoff_seconds: "prometheus_client.Histogram" = dataclasses.field(init=False)
+    short_circuits: "prometheus_client.Counter" = dataclasses.field(init=False)
+    state_transitions: "prometheus_client.Counter" = dataclasses.field(init=False)
+    backend_latency_seconds: "prometheus_client.Histogram" = dataclasses.field(init=False)
+
+    def __post_init__(self) -> None:
+        registry: typing.Final = self.registry or prometheus_client.REGISTRY
+        host_labels: typing.Final = ("host",) if self.label_hosts else ()
+        self.attempts = prometheus_client.Counter(
+            "attempts", "Attempts, the first ones included", host_labels, namespace=self.namespace, registry=registry
+        )
+        self.retries = prometheus_client.Counter(
+            "retries", "Retried attempts", host_labels, namespace=self.namespace, registry=registry
+        )
+        self.backoff_seconds = prometheus_client.Histogram(
+            "backoff_seconds", "Time slept before retries", host_labels, namespace=self.namespace, registry=registry
+        )
+        self.short_circuits = prometheus_client.Counter(
+            "short_circuits",
+            "Calls refused without reaching the host",
+            host_labels,
+            namespace=self.namespace,
+            registry=registry,
+        )
+        self.state_transitions = prometheus_client.Counter(
+            "state_transitions",
+            "Circuit state transitions",
+            (*host_labels, "state"),
+            namespace=self.namespace,
+            registry=registry,
+        )
+        self.backend_latency_seconds = prometheus_client.Histogram(
+            "backend_latency_seconds",
+            "Latency of remote breaker backend calls",
+            ("operation",),
+            namespace=self.namespace,
+            registry=registry,
+        )
+
+    def attempt(self, host: str | None) -> None:
+        (self.attempts.labels(host or "") if self.label_hosts else self.attempts).inc()
+
+    def retry(self, host: str | None, backoff_in_seconds: float) -> None:
+        if self.label_hosts:
+            self.retries.labels(host or "").inc()
+            self.backoff_seconds.labels(host or "").observe(backoff_in_seconds)
+        else:
+            self.retries.inc()
+            self.backoff_seconds.observe(backoff_in_seconds)
+
+    def short_circuit(self, host: str) -> None:
+        (self.short_circuits.labels(host) if self.label_hosts else self.short_circuits).inc()
+
+    def state_transition(self, host: str, state: CircuitState) -> None:
+        if self.label_hosts:
+            self.state_transitions.labels(host, state.value).inc()
+        else:
+            self.state_transitions.labels(state.value).inc()
+
+    def backend_latency(self, operation: BackendOperation, latency_in_seconds: float) -> None:
+        self.backend_latency_seconds.labels(operation.value).observe(latency_in_seconds)
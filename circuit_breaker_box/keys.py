@@ -0,0 +1,70 @@
+import dataclasses
+import enum
+import sys
+import typing
+
+from circuit_breaker_box import errors
+
+
+OVERFLOW_KEY: typing.Final = "__overflow__"
+
+
+class KeyGranularity(enum.Enum):
+    HOST = "host"
+    HOST_AND_METHOD = "host_and_method"
+    HOST_AND_PATH_TEMPLATE = "host_and_path_template"
+
+
+class OverflowPolicy(enum.Enum):
+    # keys over the cap share one circuit
+    SHARE = "share"
+    # keys over the cap raise TooManyKeysError
+    REJECT = "reject"
+
+
+@dataclasses.dataclass(kw_only=True)
+class CircuitBreakerKeys:
+    """Derives and interns circuit breaker keys with a hard cardinality cap.
+
+    derive() isolates circuits per host, host+method or host+path template, each distinct key is formatted once
+    and the same interned str is returned afterwards. Pass the instance to a backend as `keys` to apply the cap
+    to every host it sees: at most max_keys_count keys are tracked, the rest are handled by overflow_policy.
+    Size max_keys_count for the expected endpoints, keys are never forgotten.
+    """
+
+    granularity: KeyGranularity = KeyGranularity.HOST
+    max_keys_count: int = 10_000
+    overflow_policy: OverflowPolicy = OverflowPolicy.SHARE
+    interned_keys: dict[str, str] = dataclasses.field(init=False, default_factory=dict)
+    derived_keys: dict[tuple[str, str], str] = dataclasses.field(init=False, default_factory=dict)
+
+    def derive(self, host: str, *, method: str = "", path_template: str = "") -> str:
+        if self.granularity is KeyGranularity.HOST_AND_METHOD:
+            endpoint = method
+        elif self.granularity is KeyGranularity.HOST_AND_PATH_TEMPLATE:
+            endpoint = path_template
+        else:
+            endpoint = ""
+        if not endpoint:
+            return self.intern(host)
+
+        key = self.derived_keys.get((host, endpoint))
+        if key is None:
+            key = self.intern(f"{host} {endpoint}")
+            if key is not OVERFLOW_KEY:
+                self.derived_keys[host, endpoint] = key
+        return key
+
+    def intern(self, key: str) -> str:
+        interned_key = self.interned_keys.get(key)
+        if interned_key is not None:
+            return interned_key
+
+        if len(self.interned_keys) >= self.max_keys_count:
+            if self.overflow_policy is OverflowPolicy.REJECT:
+                msg = f"Circuit breaker tracks {self.max_keys_count} keys already, key {key} is rejected."
+                raise errors.TooManyKeysError(msg)
+            return OVERFLOW_KEY
+
+        interned_key = self.interned_keys[key] = sys.intern(key)
+        return interned_key
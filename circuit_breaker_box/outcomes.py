@@ -0,0 +1,28 @@
+import dataclasses
+import enum
+import typing
+
+
+class Outcome(enum.Enum):
+    SUCCESS = "success"
+    FAILURE = "failure"
+    SLOW = "slow"
+
+
+@dataclasses.dataclass(kw_only=True, frozen=True, slots=True)
+class OutcomeClassifier:
+    """Classifies a call that returned by its result and duration, calls that raised are classified by retry_cause.
+
+    Failed results, like HTTP 503 responses, are recorded as failures and returned as they are.
+    Calls lasting at least slow_call_duration_in_seconds are slow.
+    """
+
+    slow_call_duration_in_seconds: float | None = None
+    is_failed_result: typing.Callable[[typing.Any], bool] | None = None
+
+    def __call__(self, result: object, duration_in_seconds: float) -> Outcome:
+        if self.is_failed_result is not None and self.is_failed_result(result):
+            return Outcome.FAILURE
+        if self.slow_call_duration_in_seconds is not None and duration_in_seconds >= self.slow_call_duration_in_seconds:
+            return Outcome.SLOW
+        return Outcome.SUCCESS
@@ -1,12 +1,22 @@
 import abc
+import asyncio
+import contextlib
 import dataclasses
+import functools
 import logging
+import time
 import typing
 
 import tenacity
 
-from circuit_breaker_box import BaseCircuitBreaker, ResponseType
+from circuit_breaker_box import BaseCircuitBreaker, ResponseType, errors
+from circuit_breaker_box.bulkhead import Bulkhead
 from circuit_breaker_box.common_types import retry_clause_types, stop_types, wait_types
+from circuit_breaker_box.deadline import deadline_after, remaining_budget_in_seconds
+from circuit_breaker_box.hedging import HedgingPolicy
+from circuit_breaker_box.instrumentation import NO_INSTRUMENTATION, Instrumentation
+from circuit_breaker_box.outcomes import OutcomeClassifier
+from circuit_breaker_box.retry_budget import BaseRetryBudget
 
 
 logger = logging.getLogger(__name__)
@@ -21,6 +31,17 @@ class Retrier(abc.ABC, typing.Generic[ResponseType]):
     stop_rule: stop_types
     retry_cause: retry_clause_types
     circuit_breaker: BaseCircuitBreaker | None = None
+    hedging_policy: HedgingPolicy | None = None
+    retry_budget: BaseRetryBudget | None = None
+    bulkhead: Bulkhead | None = None
+    instrumentation: Instrumentation = NO_INSTRUMENTATION
+    # attempts are bounded by attempt_timeout_in_seconds and by the deadline set with deadline_at or deadline_after,
+    # backoffs are clamped to the deadline and attempts are not started with less than min_attempt_duration_in_seconds
+    attempt_timeout_in_seconds: float | None = None
+    min_attempt_duration_in_seconds: float = 0.0
+    # records returned calls by their result and duration, falls back to the classifier of the circuit breaker;
+    # without either every returned call is a success
+    outcome_classifier: OutcomeClassifier | None = None
 
     async def retry(
         self,
@@ -34,25 +55,324 @@ class Retrier(abc.ABC, typing.Generic[ResponseType]):
             msg = "'host' argument should be defined"
             raise ValueError(msg)
 
-        for attempt in tenacity.Retrying(
-            stop=self.stop_rule,
-            wait=self.wait_strategy,
+        return await self._retry(functools.partial(coroutine, *args, **kwargs), host)
+
+    def decorate(
+        self, host: str | None = None
+    ) -> typing.Callable[
+        [typing.Callable[P, typing.Awaitable[ResponseType]]], typing.Callable[P, typing.Awaitable[ResponseType]]
+    ]:
+        """Retry every call of the decorated coroutine function against host.
+
+        Like retry, every call reads the current settings of this Retrier, later changes apply to decorated functions.
+        """
+        if not host and self.circuit_breaker:
+            msg = "'host' argument should be defined"
+            raise ValueError(msg)
+
+        def decorator(
+            coroutine: typing.Callable[P, typing.Awaitable[ResponseType]],
+        ) -> typing.Callable[P, typing.Awaitable[ResponseType]]:
+            @functools.wraps(coroutine)
+            async def retried_coroutine(*args: P.args, **kwargs: P.kwargs) -> ResponseType:
+                return await self._retry(functools.partial(coroutine, *args, **kwargs), host)
+
+            return retried_coroutine
+
+        return decorator
+
+    async def retry_many(
+        self,
+        calls: typing.Sequence[tuple[str, typing.Callable[[], typing.Awaitable[ResponseType]]]],
+    ) -> list[ResponseType | BaseException]:
+        """Retry a fan-out of (host, coroutine function) calls concurrently.
+
+        Hosts availability is checked once for the whole batch, results are returned in order,
+        exceptions are returned in place of results like asyncio.gather(return_exceptions=True) does.
+        """
+        if not self.circuit_breaker:
+            return await asyncio.gather(*(self._retry(call, host) for host, call in calls), return_exceptions=True)
+
+        if not all(host for host, _ in calls):
+            msg = "'host' argument should be defined"
+            raise ValueError(msg)
+
+        hosts_availability: typing.Final = await self.circuit_breaker.are_hosts_available(
+            dict.fromkeys(host for host, _ in calls)
+        )
+        # one verdict per host may stand for a single admitted half-open probe,
+        # so only the first call to a host skips the check and the rest are checked per attempt
+        unchecked_hosts: typing.Final = {host for host, is_available in hosts_availability.items() if is_available}
+
+        def retry_call(
+            host: str, call: typing.Callable[[], typing.Awaitable[ResponseType]]
+        ) -> typing.Awaitable[ResponseType]:
+            assert self.circuit_breaker
+            if not hosts_availability[host]:
+                self.instrumentation.short_circuit(host)
+                return self.circuit_breaker.raise_host_unavailable_error(host)
+            is_host_checked = host in unchecked_hosts
+            unchecked_hosts.discard(host)
+            return self._retry(call, host, is_host_checked=is_host_checked)
+
+        return await asyncio.gather(*(retry_call(host, call) for host, call in calls), return_exceptions=True)
+
+    async def _retry(
+        self,
+        coroutine: typing.Callable[[], typing.Awaitable[ResponseType]],
+        host: str | None = None,
+        *,
+        is_host_checked: bool = False,
+    ) -> ResponseType:
+        retry_state: tenacity.RetryCallState | None = None
+        # tenacity clears the outcome of the previous attempt before the next one starts
+        previous_exception: BaseException | None = None
+        try:
+            async for attempt in self._build_retrying(host):
+                retry_state = attempt.retry_state
+                with attempt:
+                    # checked before the circuit breaker, a skipped attempt must not take up a half-open probe
+                    attempt_timeout_in_seconds = self._attempt_timeout_in_seconds(attempt.retry_state)
+                    if self.circuit_breaker and host:
+                        if previous_exception is not None and self._is_retry_cause(
+                            attempt.retry_state, previous_exception
+                        ):
+                            is_host_available = await self.circuit_breaker.increment_failures_count_and_check(host)
+                        elif is_host_checked and attempt.retry_state.attempt_number == 1:
+                            is_host_available = True
+                        else:
+                            is_host_available_nowait = self.circuit_breaker.is_host_available_nowait(host)
+                            is_host_available = (
+                                await self.circuit_breaker.is_host_available(host)
+                                if is_host_available_nowait is None
+                                else is_host_available_nowait
+                            )
+
+                        if not is_host_available:
+                            self.instrumentation.short_circuit(host)
+                            await self.circuit_breaker.raise_host_unavailable_error(host)
+
+                    self.instrumentation.attempt(host)
+                    started_at = time.monotonic()
+                    response = await (
+                        self._call(coroutine, host, attempt.retry_state)
+                        if attempt_timeout_in_seconds is None
+                        else self._call_with_timeout(coroutine, host, attempt.retry_state, attempt_timeout_in_seconds)
+                    )
+                    if self.circuit_breaker and host:
+                        await self._record_response(host, response, time.monotonic() - started_at)
+                    if self.retry_budget:
+                        await self.retry_budget.deposit(host)
+                    return response
+                previous_outcome = attempt.retry_state.outcome
+                previous_exception = previous_outcome.exception() if previous_outcome else None
+        except Exception:
+            # earlier failures are recorded before the next attempt, the last one has no next attempt
+            outcome: typing.Final = retry_state.outcome if retry_state else None
+            if (
+                self.circuit_breaker
+                and host
+                and retry_state
+                and outcome
+                and outcome.failed
+                and self._is_retry_cause(retry_state, typing.cast("BaseException", outcome.exception()))
+            ):
+                await self.circuit_breaker.increment_failures_count(host)
+            raise
+        msg = "Unreachable code"  # pragma: no cover
+        raise RuntimeError(msg)  # pragma: no cover
+
+    async def _record_response(self, host: str, response: ResponseType, duration_in_seconds: float) -> None:
+        assert self.circuit_breaker
+        outcome_classifier: typing.Final = self.outcome_classifier or self.circuit_breaker.outcome_classifier
+        if outcome_classifier is None:
+            await self.circuit_breaker.record_success(host)
+            return
+        outcome: typing.Final = outcome_classifier(response, duration_in_seconds)
+        logger.debug("Outcome: host: '%s', outcome: %s, duration: %.3f", host, outcome.value, duration_in_seconds)
+        await self.circuit_breaker.record_outcome(host, outcome)
+
+    def _build_retrying(self, host: str | None) -> tenacity.AsyncRetrying:
+        return tenacity.AsyncRetrying(
+            sleep=asyncio.sleep,
+            # AsyncRetrying awaits coroutine stop rules since tenacity 8.4, its annotations only declare sync ones
+            stop=functools.partial(self._stop_on_exhausted_budget, host)  # type: ignore[arg-type]
+            if self.retry_budget
+            else self._stop_on_rule_or_deadline,
+            wait=self._wait_within_deadline,
             retry=self.retry_cause,
             reraise=self.reraise,
             before=self.do_before_attempts,
             after=self.do_after_attempts,
-        ):
-            with attempt:
-                if self.circuit_breaker and host:
-                    if not await self.circuit_breaker.is_host_available(host):
-                        await self.circuit_breaker.raise_host_unavailable_error(host)
+            before_sleep=functools.partial(self._observe_retry, host),
+        )
 
-                    if attempt.retry_state.attempt_number > 1:
-                        await self.circuit_breaker.increment_failures_count(host)
+    async def _call(
+        self,
+        coroutine: typing.Callable[[], typing.Awaitable[ResponseType]],
+        host: str | None,
+        retry_state: tenacity.RetryCallState,
+    ) -> ResponseType:
+        if self.hedging_policy:
+            # every hedged attempt takes its own bulkhead slot
+            return await self._hedge(coroutine, host, retry_state)
+        if not self.bulkhead:
+            return await coroutine()
 
-                return await coroutine(*args, **kwargs)
-        msg = "Unreachable code"  # pragma: no cover
-        raise RuntimeError(msg)  # pragma: no cover
+        async with self.bulkhead.limit(host or ""):
+            return await coroutine()
+
+    async def _call_with_timeout(
+        self,
+        coroutine: typing.Callable[[], typing.Awaitable[ResponseType]],
+        host: str | None,
+        retry_state: tenacity.RetryCallState,
+        timeout_in_seconds: float,
+    ) -> ResponseType:
+        # the attempt deadline is what remaining_budget_in_seconds reports to the coroutine
+        with deadline_after(timeout_in_seconds):
+            return await asyncio.wait_for(self._call(coroutine, host, retry_state), timeout_in_seconds)
+
+    def _attempt_timeout_in_seconds(self, retry_state: tenacity.RetryCallState) -> float | None:
+        remaining_in_seconds: typing.Final = remaining_budget_in_seconds()
+        if remaining_in_seconds is None:
+            return self.attempt_timeout_in_seconds
+        # retries are admitted by the stop rule before their backoff, which may overshoot by a scheduling delay
+        if retry_state.attempt_number == 1 and not self._is_attempt_affordable(remaining_in_seconds):
+            msg = f"Deadline exceeded, {remaining_in_seconds:.3f} seconds left"
+            raise errors.DeadlineExceededError(msg)
+        if self.attempt_timeout_in_seconds is None:
+            return remaining_in_seconds
+        return min(self.attempt_timeout_in_seconds, remaining_in_seconds)
+
+    def _is_attempt_affordable(self, remaining_in_seconds: float) -> bool:
+        return remaining_in_seconds > 0 and remaining_in_seconds >= self.min_attempt_duration_in_seconds
+
+    def _wait_within_deadline(self, retry_state: tenacity.RetryCallState) -> float:
+        backoff_in_seconds: typing.Final = self.wait_strategy(retry_state)
+        remaining_in_seconds: typing.Final = remaining_budget_in_seconds()
+        if remaining_in_seconds is None:
+            return backoff_in_seconds
+        return max(min(backoff_in_seconds, remaining_in_seconds - self.min_attempt_duration_in_seconds), 0.0)
+
+    def _stop_on_rule_or_deadline(self, retry_state: tenacity.RetryCallState) -> bool:
+        """Stop on stop_rule or when no attempt fits in the deadline, upcoming_sleep is already clamped by then."""
+        if self.stop_rule(retry_state):
+            return True
+        remaining_in_seconds: typing.Final = remaining_budget_in_seconds()
+        return remaining_in_seconds is not None and (
+            not self._is_attempt_affordable(remaining_in_seconds)
+            or remaining_in_seconds - retry_state.upcoming_sleep <= 0
+        )
+
+    def _observe_retry(self, host: str | None, retry_state: tenacity.RetryCallState) -> None:
+        self.instrumentation.retry(host, retry_state.upcoming_sleep)
+
+    async def _stop_on_exhausted_budget(self, host: str | None, retry_state: tenacity.RetryCallState) -> bool:
+        """Stop rule refusing retries without sleeping once the retry budget is exhausted."""
+        if self._stop_on_rule_or_deadline(retry_state):
+            return True
+        assert self.retry_budget
+        if not await self.retry_budget.withdraw(host):
+            logger.warning("Retry budget exhausted, host: '%s'", host)
+            return True
+        return False
+
+    async def _hedge(
+        self,
+        coroutine: typing.Callable[[], typing.Awaitable[ResponseType]],
+        host: str | None,
+        retry_state: tenacity.RetryCallState,
+    ) -> ResponseType:
+        """Run one attempt, racing it with hedged attempts while it is slower than the hedging delay.
+
+        The first successful attempt wins and the rest are cancelled. Losers failed with a retry_cause are recorded
+        as failures and extra successes as their outcome classifies them, the failure of the last attempt is left
+        to the retry loop.
+        """
+        hedging_policy: typing.Final = self.hedging_policy
+        assert hedging_policy
+        pending_attempts: set[asyncio.Task[tuple[ResponseType, float]]] = {
+            asyncio.create_task(self._timed(coroutine, host))
+        }
+        hedged_attempts_count = 0
+        try:
+            while True:
+                can_hedge = hedged_attempts_count < hedging_policy.max_hedged_attempts
+                done_attempts, pending_attempts = await asyncio.wait(
+                    pending_attempts,
+                    timeout=hedging_policy.current_delay_in_seconds if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                failed_attempts = [attempt for attempt in done_attempts if attempt.exception()]
+                succeeded_attempts = [attempt for attempt in done_attempts if not attempt.exception()]
+                if not succeeded_attempts and not pending_attempts:
+                    last_failed_attempt = failed_attempts.pop()
+                await self._record_hedged_outcomes(host, retry_state, failed_attempts, succeeded_attempts[1:])
+                if succeeded_attempts:
+                    return succeeded_attempts[0].result()[0]
+                if not pending_attempts:
+                    return last_failed_attempt.result()[0]
+
+                if not done_attempts:
+                    hedged_attempts_count += 1
+                    if await self._can_send_hedge(host):
+                        hedged_attempt = asyncio.create_task(self._timed(coroutine, host))
+                        hedged_attempt.add_done_callback(lambda _: hedging_policy.release_hedge())
+                        pending_attempts.add(hedged_attempt)
+        finally:
+            for attempt in pending_attempts:
+                attempt.cancel()
+            if pending_attempts:
+                await asyncio.gather(*pending_attempts, return_exceptions=True)
+
+    async def _timed(
+        self, coroutine: typing.Callable[[], typing.Awaitable[ResponseType]], host: str | None
+    ) -> tuple[ResponseType, float]:
+        """Run one hedged attempt, return its response along with its duration."""
+        assert self.hedging_policy
+        async with self.bulkhead.limit(host or "") if self.bulkhead else contextlib.nullcontext():
+            started_at: typing.Final = time.monotonic()
+            response: typing.Final = await coroutine()
+            duration_in_seconds: typing.Final = time.monotonic() - started_at
+            self.hedging_policy.observe_latency(duration_in_seconds)
+        return response, duration_in_seconds
+
+    async def _can_send_hedge(self, host: str | None) -> bool:
+        assert self.hedging_policy
+        # the budget goes first, in half-open state is_host_available takes up a probe
+        if not self.hedging_policy.acquire_hedge():
+            return False
+        if self.circuit_breaker and host and not await self.circuit_breaker.is_host_available(host):
+            self.hedging_policy.release_hedge()
+            return False
+        return True
+
+    async def _record_hedged_outcomes(
+        self,
+        host: str | None,
+        retry_state: tenacity.RetryCallState,
+        failed_attempts: list[asyncio.Task[tuple[ResponseType, float]]],
+        succeeded_attempts: list[asyncio.Task[tuple[ResponseType, float]]],
+    ) -> None:
+        if not self.circuit_breaker or not host:
+            return
+        for failed_attempt in failed_attempts:
+            if self._is_retry_cause(retry_state, typing.cast("BaseException", failed_attempt.exception())):
+                await self.circuit_breaker.increment_failures_count(host)
+        for succeeded_attempt in succeeded_attempts:
+            await self._record_response(host, *succeeded_attempt.result())
+
+    def _is_retry_cause(self, retry_state: tenacity.RetryCallState, exception: BaseException) -> bool:
+        """Classify an exception raised outside of the retry loop the same way retry_cause does."""
+        if isinstance(exception, errors.BaseCircuitBreakerError):
+            # refused by our own circuit breaker or bulkhead, not failed by the host
+            return False
+        attempt_state: typing.Final = tenacity.RetryCallState(
+            retry_state.retry_object, retry_state.fn, retry_state.args, retry_state.kwargs
+        )
+        attempt_state.set_exception((type(exception), exception, exception.__traceback__))
+        return self.retry_cause(attempt_state)
 
     @staticmethod
     def do_before_attempts(retry_state: tenacity.RetryCallState) -> None:
@@ -0,0 +1,54 @@
+import abc
+import dataclasses
+import logging
+
+from cachetools import LRUCache
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass(kw_only=True, slots=True)
+class BaseRetryBudget(abc.ABC):
+    """Token bucket limiting retries to a share of successful requests.
+
+    Every successful request deposits token_ratio tokens up to max_tokens, every retry withdraws one token.
+    Share one instance between Retrier instances to bound retry amplification of the whole process.
+    """
+
+    max_tokens: float = 100
+    token_ratio: float = 0.1
+    per_host: bool = False
+
+    def get_budget_key(self, host: str | None) -> str:
+        return host if self.per_host and host else ""
+
+    @abc.abstractmethod
+    async def deposit(self, host: str | None) -> None: ...
+
+    @abc.abstractmethod
+    async def withdraw(self, host: str | None) -> bool: ...
+
+
+@dataclasses.dataclass(kw_only=True)
+class RetryBudgetInMemory(BaseRetryBudget):
+    max_cache_size: int = 1024
+    budgets_tokens: LRUCache[str, float] = dataclasses.field(init=False)
+
+    def __post_init__(self) -> None:
+        self.budgets_tokens = LRUCache(maxsize=self.max_cache_size)
+
+    async def deposit(self, host: str | None) -> None:
+        budget_key = self.get_budget_key(host)
+        tokens = self.budgets_tokens.get(budget_key, self.max_tokens)
+        if tokens < self.max_tokens:
+            self.budgets_tokens[budget_key] = min(tokens + self.token_ratio, self.max_tokens)
+
+    async def withdraw(self, host: str | None) -> bool:
+        budget_key = self.get_budget_key(host)
+        tokens = self.budgets_tokens.get(budget_key, self.max_tokens)
+        if tokens < 1:
+            logger.debug("Retry budget exhausted for budget_key: '%s'", budget_key)
+            return False
+        self.budgets_tokens[budget_key] = tokens - 1
+        return True
@@ -0,0 +1,74 @@
+import contextlib
+import dataclasses
+import logging
+import typing
+
+from cachetools import LRUCache
+
+from circuit_breaker_box.retry_budget import BaseRetryBudget
+
+
+with contextlib.suppress(ImportError):
+    from redis import asyncio as aioredis
+    from redis.commands.core import AsyncScript
+    from redis.exceptions import RedisError
+
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] - tokens, ARGV[1] - max tokens, ARGV[2] - ttl in seconds, ARGV[3] - tokens to add, negative to withdraw.
+# Returns 1 if tokens were changed, 0 if there are not enough tokens to withdraw.
+CHANGE_TOKENS_SCRIPT: typing.Final = b"""
+local tokens = tonumber(redis.call("GET", KEYS[1]) or ARGV[1]) + tonumber(ARGV[3])
+if tokens < 0 then
+    return 0
+end
+redis.call("SET", KEYS[1], tostring(math.min(tokens, tonumber(ARGV[1]))), "EX", ARGV[2])
+return 1
+"""
+
+
+@dataclasses.dataclass(kw_only=True)
+class RetryBudgetRedis(BaseRetryBudget):
+    """Retry budget shared by the whole fleet.
+
+    Deposits are accumulated locally and written once they add up to a whole token.
+    Budget errors never fail requests: while redis is unavailable retries are allowed.
+    """
+
+    redis_connection: "aioredis.Redis[str]"
+    key_ttl_in_seconds: int = 3600
+    max_cache_size: int = 1024
+    change_tokens_script: "AsyncScript" = dataclasses.field(init=False)
+    pending_deposits: LRUCache[str, float] = dataclasses.field(init=False)
+
+    def __post_init__(self) -> None:
+        self.change_tokens_script = self.redis_connection.register_script(CHANGE_TOKENS_SCRIPT)
+        self.pending_deposits = LRUCache(maxsize=self.max_cache_size)
+
+    async def deposit(self, host: str | None) -> None:
+        budget_key = self.get_budget_key(host)
+        tokens = self.pending_deposits.get(budget_key, 0) + self.token_ratio
+        if tokens < 1:
+            self.pending_deposits[budget_key] = tokens
+            return
+
+        self.pending_deposits.pop(budget_key, None)
+        await self._change_tokens(budget_key, tokens)
+
+    async def withdraw(self, host: str | None) -> bool:
+        return await self._change_tokens(self.get_budget_key(host), -1)
+
+    async def _change_tokens(self, budget_key: str, tokens: float) -> bool:
+        try:
+            is_changed = bool(
+                await self.change_tokens_script(
+                    keys=[f"retry-budget-{budget_key}"], args=[self.max_tokens, self.key_ttl_in_seconds, tokens]
+                )
+            )
+        except (RedisError, OSError):
+            logger.warning("Failed to change retry budget for budget_key: '%s'", budget_key, exc_info=True)
+            return True
+        if not is_changed:
+            logger.debug("Retry budget exhausted for budget_key: '%s'", budget_key)
+        return is_changed
@@ -0,0 +1,114 @@
+import asyncio
+import dataclasses
+import json
+import logging
+import os
+import pathlib
+import typing
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION: typing.Final = 1
+
+
+@dataclasses.dataclass(kw_only=True, frozen=True, slots=True)
+class HostSnapshot:
+    host: str
+    failures_count: int
+    # unix timestamps, monotonic clocks do not survive a restart; 0.0 when the host has no half-open window
+    failures_expire_at: float
+    half_open_expire_at: float = 0.0
+
+
+def dump_snapshot(hosts: typing.Iterable[HostSnapshot]) -> bytes:
+    """Serialize hosts states into compact JSON, one [host, failures_count, expire_at, half_open_expire_at] per host."""
+    return json.dumps(
+        {
+            "version": SNAPSHOT_VERSION,
+            "hosts": [
+                [host.host, host.failures_count, round(host.failures_expire_at, 3), round(host.half_open_expire_at, 3)]
+                for host in hosts
+            ],
+        },
+        separators=(",", ":"),
+    ).encode()
+
+
+def load_snapshot(snapshot: bytes) -> list[HostSnapshot]:
+    """Deserialize hosts states, raises ValueError for unreadable snapshots and other versions."""
+    try:
+        data: typing.Final = json.loads(snapshot)
+        if data["version"] != SNAPSHOT_VERSION:
+            msg = f"Unsupported circuit breaker snapshot version: {data['version']}"
+            raise ValueError(msg)
+        return [
+            HostSnapshot(
+                host=str(host),
+                failures_count=int(failures_count),
+                failures_expire_at=float(failures_expire_at),
+                half_open_expire_at=float(half_open_expire_at),
+            )
+            for host, failures_count, failures_expire_at, half_open_expire_at in data["hosts"]
+        ]
+    except (KeyError, TypeError, json.JSONDecodeError) as exc:
+        msg = "Malformed circuit breaker snapshot"
+        raise ValueError(msg) from exc
+
+
+class SupportsSnapshot(typing.Protocol):
+    def export_snapshot(self) -> bytes: ...
+
+    def import_snapshot(self, snapshot: bytes) -> None: ...
+
+
+@dataclasses.dataclass(kw_only=True)
+class SnapshotFile:
+    """Keeps the state of an in-memory circuit breaker in a file, so restarted processes start with known bans.
+
+    Call load() at startup before serving, start() to save every interval_in_seconds and stop() on shutdown.
+    Files are replaced atomically with the state of a single process, give every worker its own path.
+    """
+
+    circuit_breaker: SupportsSnapshot
+    path: pathlib.Path
+    interval_in_seconds: float = 10.0
+    save_task: "asyncio.Task[None] | None" = dataclasses.field(init=False, default=None)
+
+    def load(self) -> bool:
+        try:
+            self.circuit_breaker.import_snapshot(self.path.read_bytes())
+        except FileNotFoundError:
+            return False
+        except ValueError:
+            logger.warning("Ignored unreadable circuit breaker snapshot: '%s'", self.path, exc_info=True)
+            return False
+        return True
+
+    async def save(self) -> None:
+        await asyncio.to_thread(self._write, self.circuit_breaker.export_snapshot())
+
+    def _write(self, snapshot: bytes) -> None:
+        temporary_path: typing.Final = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        temporary_path.write_bytes(snapshot)
+        temporary_path.replace(self.path)
+
+    def start(self) -> None:
+        if self.save_task is None:
+            self.save_task = asyncio.create_task(self._save_periodically())
+
+    async def _save_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_in_seconds)
+            try:
+                await self.save()
+            except OSError:
+                logger.exception("Failed to save circuit breaker snapshot: '%s'", self.path)
+
+    async def stop(self) -> None:
+        """Stop saving periodically and save the final snapshot."""
+        if self.save_task is not None:
+            self.save_task.cancel()
+            await asyncio.wait([self.save_task])
+            self.save_task = None
+        await self.save()
@@ -2,12 +2,18 @@ import dataclasses
 import logging
 import typing
 
+import fakeredis
 import httpx
 import pytest
 import tenacity
 from redis import asyncio as aioredis
 
-from circuit_breaker_box import CircuitBreakerInMemory, Retrier
+from circuit_breaker_box import (
+    CircuitBreakerFastInMemory,
+    CircuitBreakerInMemory,
+    CircuitBreakerSlidingWindow,
+    Retrier,
+)
 from circuit_breaker_box.circuit_breaker_redis import CircuitBreakerRedis
 from examples.example_retry_circuit_breaker import CustomCircuitBreakerInMemory
 
@@ -18,11 +24,19 @@ MAX_RETRIES = 4
 MAX_CACHE_SIZE = 256
 CIRCUIT_BREAKER_MAX_FAILURE_COUNT = 1
 RESET_TIMEOUT_IN_SECONDS = 10
+HALF_OPEN_MAX_PROBES = 2
+FAILURE_RATE_THRESHOLD = 0.5
+WINDOW_SIZE_IN_SECONDS = 10
+MINIMUM_REQUESTS_COUNT = 10
+FLUSH_INTERVAL_IN_SECONDS = 0.01
 SOME_HOST = "http://example.com/"
+OTHER_HOST = "http://example.org/"
 
 
 @dataclasses.dataclass
 class TestRedisConnection(aioredis.Redis):  # type: ignore[type-arg]
+    __test__ = False
+
     errors: int = 0
 
     async def incr(self, host: str | bytes, amount: int = 1) -> int:
@@ -38,6 +52,18 @@ class TestRedisConnection(aioredis.Redis):  # type: ignore[type-arg]
         logger.debug("host: %s, errors: %s", host, self.errors)
         return self.errors
 
+    async def mget(self, keys: typing.Any, *args: typing.Any) -> list[typing.Any]:  # noqa: ANN401, ARG002
+        logger.debug("keys: %s, errors: %s", keys, self.errors)
+        return [self.errors for _ in keys]
+
+
+@dataclasses.dataclass
+class FakeTimer:
+    now: float = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
 
 @pytest.fixture(name="test_circuit_breaker_in_memory")
 def fixture_circuit_breaker_in_memory() -> CircuitBreakerInMemory:
@@ -48,6 +74,17 @@ def fixture_circuit_breaker_in_memory() -> CircuitBreakerInMemory:
     )
 
 
+@pytest.fixture(name="test_circuit_breaker_fast_in_memory")
+def fixture_circuit_breaker_fast_in_memory() -> CircuitBreakerFastInMemory:
+    return CircuitBreakerFastInMemory(
+        reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+        max_failure_count=CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+        max_cache_size=MAX_CACHE_SIZE,
+        half_open_max_probes=HALF_OPEN_MAX_PROBES,
+        timer=FakeTimer(),
+    )
+
+
 @pytest.fixture(name="test_circuit_breaker_redis")
 def fixture_circuit_breaker_redis() -> CircuitBreakerRedis:
     return CircuitBreakerRedis(
@@ -57,6 +94,75 @@ def fixture_circuit_breaker_redis() -> CircuitBreakerRedis:
     )
 
 
+@pytest.fixture(name="test_circuit_breaker_redis_lua_script")
+def fixture_circuit_breaker_redis_lua_script() -> CircuitBreakerRedis:
+    return CircuitBreakerRedis(
+        reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+        max_failure_count=CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+        redis_connection=fakeredis.FakeAsyncRedis(),
+        use_lua_script=True,
+        local_cache_ttl_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+    )
+
+
+@pytest.fixture(name="test_circuit_breaker_redis_local_cache")
+def fixture_circuit_breaker_redis_local_cache() -> CircuitBreakerRedis:
+    return CircuitBreakerRedis(
+        reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+        max_failure_count=CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+        redis_connection=TestRedisConnection(),
+        local_cache_ttl_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+    )
+
+
+@pytest.fixture(name="test_circuit_breaker_in_memory_half_open")
+def fixture_circuit_breaker_in_memory_half_open() -> CircuitBreakerInMemory:
+    return CircuitBreakerInMemory(
+        reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+        max_failure_count=CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+        max_cache_size=MAX_CACHE_SIZE,
+        half_open_max_probes=HALF_OPEN_MAX_PROBES,
+    )
+
+
+@pytest.fixture(name="test_circuit_breaker_redis_half_open")
+def fixture_circuit_breaker_redis_half_open() -> CircuitBreakerRedis:
+    return CircuitBreakerRedis(
+        reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+        max_failure_count=CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+        redis_connection=fakeredis.FakeAsyncRedis(),
+        half_open_max_probes=HALF_OPEN_MAX_PROBES,
+        local_cache_ttl_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+    )
+
+
+@pytest.fixture(name="test_circuit_breaker_sliding_window")
+def fixture_circuit_breaker_sliding_window() -> CircuitBreakerSlidingWindow:
+    return CircuitBreakerSlidingWindow(
+        reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+        max_failure_count=CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+        max_cache_size=MAX_CACHE_SIZE,
+        half_open_max_probes=HALF_OPEN_MAX_PROBES,
+        failure_rate_threshold=FAILURE_RATE_THRESHOLD,
+        window_size_in_seconds=WINDOW_SIZE_IN_SECONDS,
+        minimum_requests_count=MINIMUM_REQUESTS_COUNT,
+        timer=FakeTimer(),
+    )
+
+
+@pytest.fixture(name="test_circuit_breaker_redis_write_behind", params=[False, True], ids=["multi", "lua_script"])
+def fixture_circuit_breaker_redis_write_behind(request: pytest.FixtureRequest) -> CircuitBreakerRedis:
+    return CircuitBreakerRedis(
+        reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+        max_failure_count=CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+        redis_connection=fakeredis.FakeAsyncRedis(decode_responses=True),
+        use_lua_script=request.param,
+        local_cache_ttl_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+        flush_interval_in_seconds=FLUSH_INTERVAL_IN_SECONDS,
+        flush_max_pending_failures=MAX_RETRIES,
+    )
+
+
 @pytest.fixture(name="test_custom_circuit_breaker_in_memory")
 def fixture_custom_circuit_breaker_in_memory() -> CustomCircuitBreakerInMemory:
     return CustomCircuitBreakerInMemory(
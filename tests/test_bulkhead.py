@@ -0,0 +1,197 @@
+import asyncio
+
+import httpx
+import pytest
+import tenacity
+
+from circuit_breaker_box import Bulkhead, BulkheadFullError, CircuitBreakerInMemory, HedgingPolicy, Retrier
+from tests.conftest import MAX_CACHE_SIZE, MAX_RETRIES, OTHER_HOST, RESET_TIMEOUT_IN_SECONDS, SOME_HOST
+
+
+QUEUE_TIMEOUT_IN_SECONDS = 0.05
+
+
+async def hold(bulkhead: Bulkhead, release_event: asyncio.Event) -> None:
+    async with bulkhead.limit(SOME_HOST):
+        await release_event.wait()
+
+
+async def test_bulkhead_fixed_limit() -> None:
+    bulkhead = Bulkhead(max_concurrent_calls=1, max_queued_calls=1, queue_timeout_in_seconds=QUEUE_TIMEOUT_IN_SECONDS)
+    release_event = asyncio.Event()
+    holding_call = asyncio.create_task(hold(bulkhead, release_event))
+    await asyncio.sleep(0)
+
+    # one call waits in the queue, the next one fails fast
+    queued_call = asyncio.create_task(hold(bulkhead, asyncio.Event()))
+    await asyncio.sleep(0)
+    with pytest.raises(BulkheadFullError, match="1 calls in flight"):
+        await hold(bulkhead, release_event)
+
+    # released slot is handed over to the queued call
+    release_event.set()
+    await holding_call
+    await asyncio.sleep(0)
+    assert bulkhead.hosts_limits[SOME_HOST].in_flight == 1
+    assert not bulkhead.hosts_limits[SOME_HOST].waiters
+
+    # queued call times out while the slot is held
+    with pytest.raises(BulkheadFullError):
+        await hold(bulkhead, release_event)
+
+    queued_call.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await queued_call
+    assert bulkhead.hosts_limits[SOME_HOST].in_flight == 0
+
+
+async def test_bulkhead_cancelled_waiter_returns_handed_over_slot() -> None:
+    bulkhead = Bulkhead(
+        max_concurrent_calls=1,
+        max_queued_calls=1,
+        queue_timeout_in_seconds=QUEUE_TIMEOUT_IN_SECONDS,
+        latency_threshold_in_seconds=QUEUE_TIMEOUT_IN_SECONDS,
+    )
+    async with bulkhead.limit(SOME_HOST):
+        queued_call = asyncio.create_task(hold(bulkhead, asyncio.Event()))
+        await asyncio.sleep(0)
+    bulkhead.hosts_limits[SOME_HOST].limit = 0.5
+
+    # the slot is handed over and the waiter is cancelled before it resumes
+    queued_call.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await queued_call
+    assert bulkhead.hosts_limits[SOME_HOST].in_flight == 0
+    assert bulkhead.hosts_limits[SOME_HOST].limit == 0.5  # noqa: PLR2004
+
+
+async def test_bulkhead_never_evicts_busy_hosts() -> None:
+    bulkhead = Bulkhead(max_concurrent_calls=1, max_cache_size=2)
+    release_event = asyncio.Event()
+    holding_call = asyncio.create_task(hold(bulkhead, release_event))
+    await asyncio.sleep(0)
+
+    async with bulkhead.limit(OTHER_HOST):
+        pass
+    async with bulkhead.limit("third-host"):
+        pass
+    assert list(bulkhead.hosts_limits) == [SOME_HOST, "third-host"]
+    with pytest.raises(BulkheadFullError, match="1 calls in flight"):
+        await hold(bulkhead, release_event)
+
+    async with bulkhead.limit(OTHER_HOST):
+        with pytest.raises(BulkheadFullError, match="2 hosts have calls in flight"):
+            await bulkhead.limit("fourth-host").__aenter__()
+
+    release_event.set()
+    await holding_call
+
+
+async def test_bulkhead_adaptive_limit() -> None:
+    max_concurrent_calls = 4
+    bulkhead = Bulkhead(max_concurrent_calls=max_concurrent_calls, latency_threshold_in_seconds=0.01, backoff_ratio=0.5)
+
+    async with bulkhead.limit(SOME_HOST):
+        await asyncio.sleep(0.02)
+    assert bulkhead.hosts_limits[SOME_HOST].limit == max_concurrent_calls / 2
+
+    with pytest.raises(ZeroDivisionError):
+        async with bulkhead.limit(SOME_HOST):
+            raise ZeroDivisionError
+    assert bulkhead.hosts_limits[SOME_HOST].limit == 1
+
+    for _ in range(10):
+        async with bulkhead.limit(SOME_HOST):
+            pass
+    assert bulkhead.hosts_limits[SOME_HOST].limit == max_concurrent_calls
+
+    # cancelled calls only shrink the limit when they were slow
+    for delay_in_seconds in (0.0, 0.02):
+        call = asyncio.create_task(hold(bulkhead, asyncio.Event()))
+        await asyncio.sleep(delay_in_seconds)
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+    assert bulkhead.hosts_limits[SOME_HOST].limit == max_concurrent_calls / 2
+
+
+async def test_retrier_with_bulkhead() -> None:
+    retrier = Retrier[httpx.Response](
+        stop_rule=tenacity.stop.stop_after_attempt(MAX_RETRIES),
+        retry_cause=tenacity.retry_if_exception_type(ZeroDivisionError),
+        wait_strategy=tenacity.wait_none(),
+        bulkhead=Bulkhead(max_concurrent_calls=1),
+    )
+    release_event = asyncio.Event()
+
+    async def bar() -> httpx.Response:
+        await release_event.wait()
+        return httpx.Response(status_code=httpx.codes.OK)
+
+    holding_call = asyncio.create_task(retrier.retry(bar, SOME_HOST))
+    await asyncio.sleep(0)
+    with pytest.raises(BulkheadFullError):
+        await retrier.retry(bar, SOME_HOST)
+
+    release_event.set()
+    assert (await holding_call).status_code == httpx.codes.OK
+
+    # fan-out calls are limited per host
+    release_event.clear()
+    fan_out = asyncio.create_task(retrier.retry_many([(SOME_HOST, bar), (OTHER_HOST, bar)]))
+    await asyncio.sleep(0)
+    release_event.set()
+    assert [response.status_code for response in await fan_out] == [httpx.codes.OK] * 2  # type: ignore[union-attr]
+    assert list(retrier.bulkhead.hosts_limits) == [SOME_HOST, OTHER_HOST]  # type: ignore[union-attr]
+
+
+async def test_retrier_does_not_blame_host_for_full_bulkhead() -> None:
+    circuit_breaker = CircuitBreakerInMemory(
+        reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+        max_failure_count=1,
+        max_cache_size=MAX_CACHE_SIZE,
+    )
+    retrier = Retrier[httpx.Response](
+        stop_rule=tenacity.stop.stop_after_attempt(MAX_RETRIES),
+        retry_cause=tenacity.retry_if_exception_type(Exception),
+        wait_strategy=tenacity.wait_none(),
+        circuit_breaker=circuit_breaker,
+        bulkhead=Bulkhead(max_concurrent_calls=1),
+    )
+    release_event = asyncio.Event()
+
+    async def bar() -> httpx.Response:
+        await release_event.wait()
+        return httpx.Response(status_code=httpx.codes.OK)
+
+    holding_call = asyncio.create_task(retrier.retry(bar, SOME_HOST))
+    await asyncio.sleep(0)
+    with pytest.raises(BulkheadFullError):
+        await retrier.retry(bar, SOME_HOST)
+    assert SOME_HOST not in circuit_breaker.cache_hosts_with_errors
+
+    release_event.set()
+    assert (await holding_call).status_code == httpx.codes.OK
+
+
+async def test_retrier_with_bulkhead_limits_hedged_attempts() -> None:
+    bulkhead = Bulkhead(max_concurrent_calls=1)
+    retrier = Retrier[httpx.Response](
+        stop_rule=tenacity.stop.stop_after_attempt(MAX_RETRIES),
+        retry_cause=tenacity.retry_if_exception_type(ZeroDivisionError),
+        wait_strategy=tenacity.wait_none(),
+        hedging_policy=HedgingPolicy(delay_in_seconds=0.01),
+        bulkhead=bulkhead,
+    )
+    max_in_flight = 0
+
+    async def bar() -> httpx.Response:
+        nonlocal max_in_flight
+        max_in_flight = max(max_in_flight, bulkhead.hosts_limits[SOME_HOST].in_flight)
+        await asyncio.sleep(0.03)
+        return httpx.Response(status_code=httpx.codes.OK)
+
+    # the hedged attempt does not get a slot of its own, the slow attempt still wins
+    assert (await retrier.retry(bar, SOME_HOST)).status_code == httpx.codes.OK
+    assert max_in_flight == 1
+    assert bulkhead.hosts_limits[SOME_HOST].in_flight == 0
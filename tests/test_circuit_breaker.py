@@ -1,10 +1,36 @@
+import asyncio
+import dataclasses
+import typing
+from unittest import mock
+
+import fakeredis
 import fastapi
 import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
 
-from circuit_breaker_box import CircuitBreakerInMemory, errors
-from circuit_breaker_box.circuit_breaker_redis import CircuitBreakerRedis
+from circuit_breaker_box import (
+    CircuitBreakerFastInMemory,
+    CircuitBreakerInMemory,
+    CircuitBreakerSlidingWindow,
+    errors,
+)
+from circuit_breaker_box.circuit_breaker_redis import CircuitBreakerRedis, RedisFailurePolicy
 from examples.example_retry_circuit_breaker import CustomCircuitBreakerInMemory
-from tests.conftest import MAX_RETRIES, SOME_HOST
+from tests.conftest import (
+    CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+    FAILURE_RATE_THRESHOLD,
+    FLUSH_INTERVAL_IN_SECONDS,
+    HALF_OPEN_MAX_PROBES,
+    MAX_CACHE_SIZE,
+    MAX_RETRIES,
+    MINIMUM_REQUESTS_COUNT,
+    OTHER_HOST,
+    RESET_TIMEOUT_IN_SECONDS,
+    SOME_HOST,
+    WINDOW_SIZE_IN_SECONDS,
+    FakeTimer,
+    TestRedisConnection,
+)
 
 
 async def test_circuit_breaker_in_memory_cash(test_circuit_breaker_in_memory: CircuitBreakerInMemory) -> None:
@@ -14,6 +40,10 @@ async def test_circuit_breaker_in_memory_cash(test_circuit_breaker_in_memory: Ci
         await test_circuit_breaker_in_memory.increment_failures_count(host=SOME_HOST)
 
     assert await test_circuit_breaker_in_memory.is_host_available(host=SOME_HOST) is False
+    assert await test_circuit_breaker_in_memory.are_hosts_available([SOME_HOST, OTHER_HOST]) == {
+        SOME_HOST: False,
+        OTHER_HOST: True,
+    }
 
     with pytest.raises(errors.HostUnavailableError):
         await test_circuit_breaker_in_memory.raise_host_unavailable_error(host=SOME_HOST)
@@ -26,11 +56,567 @@ async def test_circuit_breaker_with_redis(test_circuit_breaker_redis: CircuitBre
         await test_circuit_breaker_redis.increment_failures_count(host=SOME_HOST)
 
     assert await test_circuit_breaker_redis.is_host_available(host=SOME_HOST) is False
+    assert await test_circuit_breaker_redis.increment_failures_count_and_check(host=SOME_HOST) is False
+    assert await test_circuit_breaker_redis.are_hosts_available([SOME_HOST, OTHER_HOST]) == {
+        SOME_HOST: False,
+        OTHER_HOST: False,
+    }
 
     with pytest.raises(errors.HostUnavailableError):
         await test_circuit_breaker_redis.raise_host_unavailable_error(host=SOME_HOST)
 
 
+async def test_circuit_breaker_with_redis_lua_script(
+    test_circuit_breaker_redis_lua_script: CircuitBreakerRedis,
+) -> None:
+    assert await test_circuit_breaker_redis_lua_script.is_host_available(host=SOME_HOST)
+
+    assert await test_circuit_breaker_redis_lua_script.increment_failures_count_and_check(host=SOME_HOST) is True
+    await test_circuit_breaker_redis_lua_script.increment_failures_count(host=SOME_HOST)
+    assert await test_circuit_breaker_redis_lua_script.increment_failures_count_and_check(host=SOME_HOST) is False
+
+    assert await test_circuit_breaker_redis_lua_script.is_host_available(host=SOME_HOST) is False
+    assert await test_circuit_breaker_redis_lua_script.are_hosts_available([SOME_HOST, OTHER_HOST]) == {
+        SOME_HOST: False,
+        OTHER_HOST: True,
+    }
+
+
+async def test_circuit_breaker_with_redis_local_cache(
+    test_circuit_breaker_redis_local_cache: CircuitBreakerRedis,
+) -> None:
+    redis_connection = typing.cast("TestRedisConnection", test_circuit_breaker_redis_local_cache.redis_connection)
+    assert await test_circuit_breaker_redis_local_cache.is_host_available(host=SOME_HOST)
+
+    # cached verdict is served while other processes record failures
+    redis_connection.errors = MAX_RETRIES
+    assert await test_circuit_breaker_redis_local_cache.is_host_available(host=SOME_HOST)
+
+    # failure recorded by this process invalidates the cached verdict
+    await test_circuit_breaker_redis_local_cache.increment_failures_count(host=SOME_HOST)
+    assert await test_circuit_breaker_redis_local_cache.is_host_available(host=SOME_HOST) is False
+
+
+async def test_circuit_breaker_redis_write_behind(
+    test_circuit_breaker_redis_write_behind: CircuitBreakerRedis,
+) -> None:
+    redis_connection = test_circuit_breaker_redis_write_behind.redis_connection
+
+    # failures are short-circuited locally before they reach redis
+    assert await test_circuit_breaker_redis_write_behind.increment_failures_count_and_check(host=SOME_HOST)
+    assert await test_circuit_breaker_redis_write_behind.increment_failures_count_and_check(host=SOME_HOST) is False
+    assert await redis_connection.get(f"circuit-breaker-{SOME_HOST}") is None
+
+    # coalesced failures are flushed after FLUSH_INTERVAL_IN_SECONDS
+    await asyncio.sleep(FLUSH_INTERVAL_IN_SECONDS * 5)
+    assert await redis_connection.get(f"circuit-breaker-{SOME_HOST}") == "2"
+    assert await redis_connection.ttl(f"circuit-breaker-{SOME_HOST}") > 0
+    assert await test_circuit_breaker_redis_write_behind.is_host_available(host=SOME_HOST) is False
+
+    # or once MAX_RETRIES failures are pending
+    for _ in range(MAX_RETRIES):
+        await test_circuit_breaker_redis_write_behind.increment_failures_count(host=OTHER_HOST)
+    assert test_circuit_breaker_redis_write_behind.flush_task
+    await test_circuit_breaker_redis_write_behind.flush_task
+    assert await redis_connection.get(f"circuit-breaker-{OTHER_HOST}") == str(MAX_RETRIES)
+
+    # failed flush keeps failures pending, capped at the ban threshold, and never runs on the request path
+    with mock.patch.object(redis_connection, "pipeline", side_effect=RuntimeError) as pipeline:
+        for _ in range(MAX_RETRIES):
+            await test_circuit_breaker_redis_write_behind.increment_failures_count(host=SOME_HOST)
+        assert test_circuit_breaker_redis_write_behind.flush_task
+        await test_circuit_breaker_redis_write_behind.flush_task
+        for _ in range(MAX_RETRIES * 2):
+            await test_circuit_breaker_redis_write_behind.increment_failures_count(host=SOME_HOST)
+        assert pipeline.call_count == 1
+    assert test_circuit_breaker_redis_write_behind.pending_failures == {
+        SOME_HOST: CIRCUIT_BREAKER_MAX_FAILURE_COUNT + 1
+    }
+    assert test_circuit_breaker_redis_write_behind.pending_failures_count == CIRCUIT_BREAKER_MAX_FAILURE_COUNT + 1
+
+    # pending failures of new hosts are dropped once local_cache_max_size hosts are pending
+    test_circuit_breaker_redis_write_behind.local_cache_max_size = 1
+    await test_circuit_breaker_redis_write_behind.increment_failures_count(host=OTHER_HOST)
+    assert OTHER_HOST not in test_circuit_breaker_redis_write_behind.pending_failures
+
+    await asyncio.sleep(FLUSH_INTERVAL_IN_SECONDS * 5)
+    assert await redis_connection.get(f"circuit-breaker-{SOME_HOST}") == str(2 + CIRCUIT_BREAKER_MAX_FAILURE_COUNT + 1)
+    assert not test_circuit_breaker_redis_write_behind.is_flush_failing
+    await test_circuit_breaker_redis_write_behind.flush_failures()
+
+
+async def test_circuit_breaker_in_memory_half_open(
+    test_circuit_breaker_in_memory_half_open: CircuitBreakerInMemory,
+) -> None:
+    for _ in range(MAX_RETRIES):
+        await test_circuit_breaker_in_memory_half_open.increment_failures_count(host=SOME_HOST)
+    assert await test_circuit_breaker_in_memory_half_open.is_host_available(host=SOME_HOST) is False
+
+    # open period lapses, only HALF_OPEN_MAX_PROBES requests are admitted
+    test_circuit_breaker_in_memory_half_open.cache_hosts_with_errors.pop(SOME_HOST)
+    assert [
+        await test_circuit_breaker_in_memory_half_open.is_host_available(host=SOME_HOST)
+        for _ in range(HALF_OPEN_MAX_PROBES + 1)
+    ] == [True] * HALF_OPEN_MAX_PROBES + [False]
+
+    # failed probe reopens the circuit
+    await test_circuit_breaker_in_memory_half_open.increment_failures_count(host=SOME_HOST)
+    assert await test_circuit_breaker_in_memory_half_open.is_host_available(host=SOME_HOST) is False
+
+    # successful probe closes the circuit
+    test_circuit_breaker_in_memory_half_open.cache_hosts_with_errors.pop(SOME_HOST)
+    assert await test_circuit_breaker_in_memory_half_open.is_host_available(host=SOME_HOST)
+    await test_circuit_breaker_in_memory_half_open.record_success(host=SOME_HOST)
+    assert [
+        await test_circuit_breaker_in_memory_half_open.is_host_available(host=SOME_HOST)
+        for _ in range(HALF_OPEN_MAX_PROBES + 1)
+    ] == [True] * (HALF_OPEN_MAX_PROBES + 1)
+
+
+async def test_circuit_breaker_redis_half_open(test_circuit_breaker_redis_half_open: CircuitBreakerRedis) -> None:
+    redis_connection = test_circuit_breaker_redis_half_open.redis_connection
+    assert test_circuit_breaker_redis_half_open.cache_hosts_availability is not None
+    await test_circuit_breaker_redis_half_open.record_success(host=SOME_HOST)
+    for _ in range(MAX_RETRIES):
+        await test_circuit_breaker_redis_half_open.increment_failures_count(host=SOME_HOST)
+    assert await test_circuit_breaker_redis_half_open.is_host_available(host=SOME_HOST) is False
+
+    # open period lapses, only HALF_OPEN_MAX_PROBES requests are admitted
+    await redis_connection.delete(f"circuit-breaker-{SOME_HOST}")
+    test_circuit_breaker_redis_half_open.cache_hosts_availability.clear()
+    assert await test_circuit_breaker_redis_half_open.are_hosts_available([SOME_HOST, OTHER_HOST]) == {
+        SOME_HOST: True,
+        OTHER_HOST: True,
+    }
+    assert [
+        await test_circuit_breaker_redis_half_open.is_host_available(host=SOME_HOST)
+        for _ in range(HALF_OPEN_MAX_PROBES)
+    ] == [True] * (HALF_OPEN_MAX_PROBES - 1) + [False]
+    # availability of closed hosts is served from the local cache
+    assert await test_circuit_breaker_redis_half_open.are_hosts_available([OTHER_HOST]) == {OTHER_HOST: True}
+
+    # failed probe reopens the circuit
+    await test_circuit_breaker_redis_half_open.increment_failures_count(host=SOME_HOST)
+    assert await test_circuit_breaker_redis_half_open.is_host_available(host=SOME_HOST) is False
+
+    # successful probe closes the circuit
+    await redis_connection.delete(f"circuit-breaker-{SOME_HOST}")
+    test_circuit_breaker_redis_half_open.cache_hosts_availability.clear()
+    assert await test_circuit_breaker_redis_half_open.is_host_available(host=SOME_HOST)
+    await test_circuit_breaker_redis_half_open.record_success(host=SOME_HOST)
+    assert [
+        await test_circuit_breaker_redis_half_open.is_host_available(host=SOME_HOST)
+        for _ in range(HALF_OPEN_MAX_PROBES + 1)
+    ] == [True] * (HALF_OPEN_MAX_PROBES + 1)
+    assert await redis_connection.exists(f"circuit-breaker-half-open-{SOME_HOST}") == 0
+
+
+async def _wait_for(predicate: typing.Callable[[], bool]) -> None:
+    for _ in range(100):
+        if predicate():
+            return
+        await asyncio.sleep(FLUSH_INTERVAL_IN_SECONDS)
+    msg = "Condition was not met"  # pragma: no cover
+    raise AssertionError(msg)  # pragma: no cover
+
+
+async def test_circuit_breaker_redis_state_mirror() -> None:
+    server = fakeredis.FakeServer()
+    publisher, replica = (
+        CircuitBreakerRedis(
+            reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+            max_failure_count=CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+            redis_connection=fakeredis.FakeAsyncRedis(server=server, decode_responses=decode_responses),
+            half_open_max_probes=HALF_OPEN_MAX_PROBES,
+            local_cache_max_size=1,
+            state_channel="circuit-breaker-states",
+            state_mirror_resubscribe_interval_in_seconds=FLUSH_INTERVAL_IN_SECONDS,
+        )
+        for decode_responses in (False, True)
+    )
+    # the first check subscribes, availability is read from redis until the mirror is live
+    assert replica.is_host_available_nowait(SOME_HOST) is None
+    assert await replica.are_hosts_available([SOME_HOST]) == {SOME_HOST: True}
+    await _wait_for(lambda: replica.is_mirror_live)
+    assert await replica.is_host_available(SOME_HOST)
+    with mock.patch.object(replica.redis_connection, "evalsha", side_effect=AssertionError):
+        assert await replica.is_host_available(SOME_HOST)
+
+    # a ban is pushed to every replica
+    assert publisher.is_host_available_nowait(SOME_HOST) is None
+    for _ in range(MAX_RETRIES):
+        await publisher.increment_failures_count(SOME_HOST)
+    await _wait_for(lambda: replica.is_host_available_nowait(SOME_HOST) is False)
+    assert publisher.mirrored_hosts.keys() == {SOME_HOST}
+
+    # open period lapses, redis admits half-open probes and the closed circuit is pushed back
+    await replica.redis_connection.delete(f"circuit-breaker-{SOME_HOST}")
+    replica.mirrored_hosts[SOME_HOST] = (False, 0.1)
+    assert await replica.is_host_available(SOME_HOST)
+    assert replica.is_host_available_nowait(SOME_HOST) is None
+    await replica.record_success(SOME_HOST)
+    await _wait_for(lambda: publisher.is_host_available_nowait(SOME_HOST) is True)
+
+    # a dropped subscription falls back to direct reads until the mirror is rebuilt
+    with mock.patch.object(replica, "_apply_state_message", side_effect=RuntimeError):
+        await publisher.increment_failures_count(OTHER_HOST)
+        await publisher.increment_failures_count(OTHER_HOST)
+        await _wait_for(lambda: not replica.is_mirror_live)
+    assert replica.is_host_available_nowait(OTHER_HOST) is None
+    await _wait_for(lambda: replica.is_mirror_live)
+    assert not replica.mirrored_hosts
+    assert await replica.is_host_available(OTHER_HOST) is False
+    assert publisher.mirrored_hosts.keys() == {OTHER_HOST}
+
+    # closed circuits are trusted for a while only, in case the message of their opening was lost
+    publisher.mirrored_hosts[OTHER_HOST] = (True, 0.1)
+    assert publisher.is_host_available_nowait(OTHER_HOST) is None
+
+    # stopping twice is a no-op
+    for circuit_breaker in (publisher, replica, replica):
+        await circuit_breaker.stop_state_mirror()
+    assert replica.mirror_task is None
+
+
+async def test_circuit_breaker_redis_in_memory_fallback() -> None:
+    server = fakeredis.FakeServer()
+    circuit_breaker = CircuitBreakerRedis(
+        reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+        max_failure_count=CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+        redis_connection=fakeredis.FakeAsyncRedis(server=server, decode_responses=True),
+        failure_policy=RedisFailurePolicy.IN_MEMORY,
+        operation_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+        redis_max_failure_count=2,
+    )
+    redis_connection = circuit_breaker.redis_connection
+
+    # failures are counted in memory, redis is not called once its own circuit opens
+    server.connected = False
+    assert await circuit_breaker.is_host_available(SOME_HOST)
+    for _ in range(MAX_RETRIES):
+        await circuit_breaker.increment_failures_count(SOME_HOST)
+    assert circuit_breaker.redis_failures_count == circuit_breaker.redis_max_failure_count
+    assert await circuit_breaker.are_hosts_available([SOME_HOST, OTHER_HOST]) == {SOME_HOST: False, OTHER_HOST: True}
+    await circuit_breaker.record_success(SOME_HOST)
+    assert circuit_breaker.unreconciled_failures == {SOME_HOST: CIRCUIT_BREAKER_MAX_FAILURE_COUNT + 1}
+
+    # failures are written back once redis answers again, a failed write back is retried on the next call
+    server.connected = True
+    circuit_breaker.redis_open_until = 0.0
+    with mock.patch.object(redis_connection, "pipeline", side_effect=RedisConnectionError):
+        assert await circuit_breaker.is_host_available(OTHER_HOST)
+        assert circuit_breaker.reconcile_task
+        await circuit_breaker.reconcile_task
+    assert circuit_breaker.unreconciled_failures == {SOME_HOST: CIRCUIT_BREAKER_MAX_FAILURE_COUNT + 1}
+    assert await circuit_breaker.is_host_available(OTHER_HOST)
+    assert circuit_breaker.reconcile_task
+    # a ban reached by the write back is published
+    circuit_breaker.state_channel = "circuit-breaker-states"
+    await circuit_breaker.reconcile_task
+    assert not circuit_breaker.unreconciled_failures
+    assert await redis_connection.get(f"circuit-breaker-{SOME_HOST}") == str(CIRCUIT_BREAKER_MAX_FAILURE_COUNT + 1)
+    assert circuit_breaker.mirrored_hosts[SOME_HOST][0] is False
+
+
+@pytest.mark.parametrize("failure_policy", [RedisFailurePolicy.FAIL_OPEN, RedisFailurePolicy.FAIL_CLOSED])
+async def test_circuit_breaker_redis_failure_policy(failure_policy: RedisFailurePolicy) -> None:
+    server = fakeredis.FakeServer()
+    circuit_breaker = CircuitBreakerRedis(
+        reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+        max_failure_count=CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+        redis_connection=fakeredis.FakeAsyncRedis(server=server, decode_responses=True),
+        half_open_max_probes=HALF_OPEN_MAX_PROBES,
+        failure_policy=failure_policy,
+    )
+    is_available = failure_policy is RedisFailurePolicy.FAIL_OPEN
+
+    server.connected = False
+    assert await circuit_breaker.is_host_available(SOME_HOST) is is_available
+    assert await circuit_breaker.increment_failures_count_and_check(SOME_HOST) is is_available
+    assert await circuit_breaker.are_hosts_available([SOME_HOST]) == {SOME_HOST: is_available}
+    circuit_breaker.cache_probing_hosts[SOME_HOST] = True
+    await circuit_breaker.record_success(SOME_HOST)
+    assert circuit_breaker.unreconciled_failures == {SOME_HOST: 1}
+
+    # a failed publish does not fail the call, the opened circuit is still mirrored locally
+    server.connected = True
+    circuit_breaker.redis_open_until = 0.0
+    circuit_breaker.state_channel = "circuit-breaker-states"
+    with mock.patch.object(circuit_breaker.redis_connection, "publish", side_effect=RedisConnectionError):
+        for _ in range(MAX_RETRIES):
+            await circuit_breaker.increment_failures_count(OTHER_HOST)
+    assert circuit_breaker.mirrored_hosts.keys() == {OTHER_HOST}
+    assert circuit_breaker.reconcile_task
+    await circuit_breaker.reconcile_task
+    assert await circuit_breaker.redis_connection.get(f"circuit-breaker-{SOME_HOST}") == "1"
+
+
+async def test_circuit_breakers_decay_failures_on_success() -> None:
+    circuit_breakers: typing.Final = [
+        CircuitBreakerInMemory(
+            reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+            max_failure_count=MAX_RETRIES,
+            max_cache_size=MAX_CACHE_SIZE,
+            success_decay_ratio=0.5,
+        ),
+        CircuitBreakerFastInMemory(
+            reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+            max_failure_count=MAX_RETRIES,
+            max_cache_size=MAX_CACHE_SIZE,
+            success_decay_ratio=0.5,
+            timer=FakeTimer(),
+        ),
+        CircuitBreakerRedis(
+            reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+            max_failure_count=MAX_RETRIES,
+            redis_connection=fakeredis.FakeAsyncRedis(),
+            success_decay_ratio=0.5,
+        ),
+    ]
+    for circuit_breaker in circuit_breakers:
+        # every success halves the failures count of a closed circuit, 4 -> 2 -> 1
+        for _ in range(MAX_RETRIES):
+            await circuit_breaker.increment_failures_count(SOME_HOST)
+        await circuit_breaker.record_success(SOME_HOST)
+        await circuit_breaker.record_success(SOME_HOST)
+        await circuit_breaker.record_success(OTHER_HOST)
+        if isinstance(circuit_breaker, CircuitBreakerRedis):
+            await circuit_breaker.flush_successes()
+        for _ in range(MAX_RETRIES - 1):
+            await circuit_breaker.increment_failures_count(SOME_HOST)
+        assert await circuit_breaker.is_host_available(SOME_HOST)
+
+        # open circuits are not decayed
+        await circuit_breaker.increment_failures_count(SOME_HOST)
+        await circuit_breaker.record_success(SOME_HOST)
+        if isinstance(circuit_breaker, CircuitBreakerRedis):
+            await circuit_breaker.flush_successes()
+        assert not await circuit_breaker.is_host_available(SOME_HOST)
+
+        # a failures count rounded down to zero is forgotten
+        await circuit_breaker.increment_failures_count(OTHER_HOST)
+        await circuit_breaker.record_success(OTHER_HOST)
+        if isinstance(circuit_breaker, CircuitBreakerRedis):
+            await circuit_breaker.flush_successes()
+            assert await circuit_breaker.redis_connection.get(f"circuit-breaker-{OTHER_HOST}") is None
+        elif isinstance(circuit_breaker, CircuitBreakerInMemory):
+            assert OTHER_HOST not in circuit_breaker.cache_hosts_with_errors
+        elif isinstance(circuit_breaker, CircuitBreakerFastInMemory):
+            assert not circuit_breaker.hosts_states[OTHER_HOST].failures_count
+
+
+async def test_circuit_breaker_redis_batches_successes() -> None:
+    server = fakeredis.FakeServer()
+    circuit_breaker = CircuitBreakerRedis(
+        reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+        max_failure_count=MAX_RETRIES,
+        redis_connection=fakeredis.FakeAsyncRedis(server=server, decode_responses=True),
+        success_decay_ratio=0.0,
+        success_flush_interval_in_seconds=FLUSH_INTERVAL_IN_SECONDS,
+        local_cache_max_size=1,
+        failure_policy=RedisFailurePolicy.FAIL_OPEN,
+    )
+    redis_key = f"circuit-breaker-{SOME_HOST}"
+
+    # successes are coalesced per host and written in the background, hosts over local_cache_max_size are dropped
+    await circuit_breaker.increment_failures_count(SOME_HOST)
+    for _ in range(MAX_RETRIES):
+        await circuit_breaker.record_success(SOME_HOST)
+    await circuit_breaker.record_success(OTHER_HOST)
+    assert circuit_breaker.pending_successes == {SOME_HOST: MAX_RETRIES}
+    redis_connection = circuit_breaker.redis_connection
+    with mock.patch.object(redis_connection, "pipeline", wraps=redis_connection.pipeline) as pipeline:
+        await _wait_for(lambda: circuit_breaker.success_flush_task is None)
+    pipeline.assert_called_once()
+    assert await redis_connection.get(redis_key) is None
+
+    # a failure drops pending successes of its host
+    await circuit_breaker.increment_failures_count(SOME_HOST)
+    await circuit_breaker.record_success(SOME_HOST)
+    await circuit_breaker.increment_failures_count_and_check(SOME_HOST)
+    assert not circuit_breaker.pending_successes
+    await _wait_for(lambda: circuit_breaker.success_flush_task is None)
+    assert await circuit_breaker.redis_connection.get(redis_key) == "2"
+
+    # successes failed to write are dropped
+    await circuit_breaker.record_success(SOME_HOST)
+    server.connected = False
+    await _wait_for(lambda: circuit_breaker.success_flush_task is None)
+    assert not circuit_breaker.pending_successes
+    server.connected = True
+    await circuit_breaker.record_success(SOME_HOST)
+    with mock.patch.object(circuit_breaker, "flush_successes", side_effect=RuntimeError):
+        await _wait_for(lambda: circuit_breaker.success_flush_task is None)
+    assert await circuit_breaker.redis_connection.get(redis_key) == "2"
+
+
+async def test_circuit_breaker_sliding_window(
+    test_circuit_breaker_sliding_window: CircuitBreakerSlidingWindow,
+) -> None:
+    timer = typing.cast("FakeTimer", test_circuit_breaker_sliding_window.timer)
+    busy_host, idle_host = "busy.example.com", "idle.example.com"
+
+    # a couple of failures among many successes keep the circuit closed
+    for _ in range(MINIMUM_REQUESTS_COUNT * 10):
+        await test_circuit_breaker_sliding_window.record_success(host=busy_host)
+    for _ in range(MAX_RETRIES):
+        await test_circuit_breaker_sliding_window.increment_failures_count(host=busy_host)
+    assert await test_circuit_breaker_sliding_window.is_host_available(host=busy_host)
+
+    # failures below the minimum requests floor, then sliding out of the window, keep the circuit closed
+    for _ in range(MINIMUM_REQUESTS_COUNT - 1):
+        await test_circuit_breaker_sliding_window.increment_failures_count(host=idle_host)
+    timer.now += WINDOW_SIZE_IN_SECONDS
+    await test_circuit_breaker_sliding_window.increment_failures_count(host=idle_host)
+    assert await test_circuit_breaker_sliding_window.is_host_available(host=idle_host)
+
+    # failure ratio over the window trips the circuit
+    for _ in range(MINIMUM_REQUESTS_COUNT):
+        await test_circuit_breaker_sliding_window.increment_failures_count(host=idle_host)
+    assert await test_circuit_breaker_sliding_window.are_hosts_available([busy_host, idle_host]) == {
+        busy_host: True,
+        idle_host: False,
+    }
+    await test_circuit_breaker_sliding_window.record_success(host=idle_host)
+    await test_circuit_breaker_sliding_window.increment_failures_count(host=idle_host)
+    assert await test_circuit_breaker_sliding_window.is_host_available(host=idle_host) is False
+
+    # half-open admits HALF_OPEN_MAX_PROBES, a failed probe reopens the circuit
+    timer.now += RESET_TIMEOUT_IN_SECONDS
+    assert [
+        await test_circuit_breaker_sliding_window.is_host_available(host=idle_host)
+        for _ in range(HALF_OPEN_MAX_PROBES + 1)
+    ] == [True] * HALF_OPEN_MAX_PROBES + [False]
+    await test_circuit_breaker_sliding_window.increment_failures_count(host=idle_host)
+    assert await test_circuit_breaker_sliding_window.is_host_available(host=idle_host) is False
+
+    # successful probe closes the circuit
+    timer.now += RESET_TIMEOUT_IN_SECONDS
+    assert await test_circuit_breaker_sliding_window.is_host_available(host=idle_host)
+    await test_circuit_breaker_sliding_window.record_success(host=idle_host)
+    assert await test_circuit_breaker_sliding_window.is_host_available(host=idle_host)
+
+    # half-open window lapsing without a verdict closes the circuit
+    for _ in range(2):
+        for _ in range(MINIMUM_REQUESTS_COUNT):
+            await test_circuit_breaker_sliding_window.increment_failures_count(host=idle_host)
+        timer.now += RESET_TIMEOUT_IN_SECONDS * 2
+    assert await test_circuit_breaker_sliding_window.is_host_available(host=idle_host)
+
+    with pytest.raises(errors.HostUnavailableError):
+        await test_circuit_breaker_sliding_window.raise_host_unavailable_error(host=idle_host)
+
+
+async def test_circuit_breaker_sliding_window_slow_calls(
+    test_circuit_breaker_sliding_window: CircuitBreakerSlidingWindow,
+) -> None:
+    timer = typing.cast("FakeTimer", test_circuit_breaker_sliding_window.timer)
+    circuit_breaker = dataclasses.replace(test_circuit_breaker_sliding_window, slow_call_rate_threshold=0.5)
+
+    # without a threshold slow calls are successes
+    for _ in range(MINIMUM_REQUESTS_COUNT):
+        await test_circuit_breaker_sliding_window.record_slow_call(host=SOME_HOST)
+    assert await test_circuit_breaker_sliding_window.is_host_available(host=SOME_HOST)
+
+    # the slow-call rate over the window trips the circuit
+    for _ in range(MINIMUM_REQUESTS_COUNT // 2):
+        await circuit_breaker.record_success(host=SOME_HOST)
+    for _ in range(MINIMUM_REQUESTS_COUNT // 2 - 1):
+        await circuit_breaker.record_slow_call(host=SOME_HOST)
+    assert await circuit_breaker.is_host_available(host=SOME_HOST)
+    await circuit_breaker.record_slow_call(host=SOME_HOST)
+    assert not await circuit_breaker.is_host_available(host=SOME_HOST)
+
+    # a slow probe reopens the circuit
+    timer.now += RESET_TIMEOUT_IN_SECONDS
+    assert await circuit_breaker.is_host_available(host=SOME_HOST)
+    await circuit_breaker.record_slow_call(host=SOME_HOST)
+    assert not await circuit_breaker.is_host_available(host=SOME_HOST)
+
+
+async def test_circuit_breaker_sliding_window_forgets_counts_on_close() -> None:
+    timer = FakeTimer()
+    circuit_breaker = CircuitBreakerSlidingWindow(
+        reset_timeout_in_seconds=1,
+        max_failure_count=CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+        max_cache_size=MAX_CACHE_SIZE,
+        failure_rate_threshold=FAILURE_RATE_THRESHOLD,
+        window_size_in_seconds=WINDOW_SIZE_IN_SECONDS,
+        minimum_requests_count=MINIMUM_REQUESTS_COUNT,
+        timer=timer,
+    )
+    for _ in range(MINIMUM_REQUESTS_COUNT):
+        await circuit_breaker.increment_failures_count(host=SOME_HOST)
+    assert await circuit_breaker.is_host_available(host=SOME_HOST) is False
+
+    # counts from before the circuit opened do not come back while the clock is still within the first window
+    timer.now += 1
+    assert await circuit_breaker.is_host_available(host=SOME_HOST)
+    await circuit_breaker.increment_failures_count(host=SOME_HOST)
+    assert await circuit_breaker.is_host_available(host=SOME_HOST)
+
+
+async def test_circuit_breaker_fast_in_memory(
+    test_circuit_breaker_fast_in_memory: CircuitBreakerFastInMemory,
+) -> None:
+    timer = typing.cast("FakeTimer", test_circuit_breaker_fast_in_memory.timer)
+    assert test_circuit_breaker_fast_in_memory.is_host_available_nowait(host=SOME_HOST)
+    await test_circuit_breaker_fast_in_memory.record_success(host=SOME_HOST)
+    assert await test_circuit_breaker_fast_in_memory.increment_failures_count_and_check(host=SOME_HOST)
+    for _ in range(MAX_RETRIES - 1):
+        await test_circuit_breaker_fast_in_memory.increment_failures_count(host=SOME_HOST)
+    assert await test_circuit_breaker_fast_in_memory.are_hosts_available([SOME_HOST, OTHER_HOST]) == {
+        SOME_HOST: False,
+        OTHER_HOST: True,
+    }
+
+    # open period lapses, only HALF_OPEN_MAX_PROBES requests are admitted, a failed probe reopens the circuit
+    timer.now += RESET_TIMEOUT_IN_SECONDS
+    assert [
+        await test_circuit_breaker_fast_in_memory.is_host_available(host=SOME_HOST)
+        for _ in range(HALF_OPEN_MAX_PROBES + 1)
+    ] == [True] * HALF_OPEN_MAX_PROBES + [False]
+    assert await test_circuit_breaker_fast_in_memory.increment_failures_count_and_check(host=SOME_HOST) is False
+
+    # successful probe closes the circuit
+    timer.now += RESET_TIMEOUT_IN_SECONDS
+    assert await test_circuit_breaker_fast_in_memory.is_host_available(host=SOME_HOST)
+    await test_circuit_breaker_fast_in_memory.record_success(host=SOME_HOST)
+    assert SOME_HOST not in test_circuit_breaker_fast_in_memory.hosts_states
+    assert [
+        await test_circuit_breaker_fast_in_memory.is_host_available(host=SOME_HOST)
+        for _ in range(HALF_OPEN_MAX_PROBES + 1)
+    ] == [True] * (HALF_OPEN_MAX_PROBES + 1)
+
+    # half-open window lapsing without a verdict closes the circuit
+    for _ in range(MAX_RETRIES):
+        await test_circuit_breaker_fast_in_memory.increment_failures_count(host=SOME_HOST)
+    timer.now += RESET_TIMEOUT_IN_SECONDS * 2
+    assert [
+        await test_circuit_breaker_fast_in_memory.is_host_available(host=SOME_HOST)
+        for _ in range(HALF_OPEN_MAX_PROBES + 1)
+    ] == [True] * (HALF_OPEN_MAX_PROBES + 1)
+
+    # expired hosts are dropped first once max_cache_size hosts are tracked, then the oldest one
+    test_circuit_breaker_fast_in_memory.max_cache_size = 2
+    await test_circuit_breaker_fast_in_memory.increment_failures_count(host=OTHER_HOST)
+    await test_circuit_breaker_fast_in_memory.increment_failures_count(host="third-host")
+    assert list(test_circuit_breaker_fast_in_memory.hosts_states) == [OTHER_HOST, "third-host"]
+    await test_circuit_breaker_fast_in_memory.increment_failures_count(host=SOME_HOST)
+    assert list(test_circuit_breaker_fast_in_memory.hosts_states) == ["third-host", SOME_HOST]
+
+    # a full table of unexpired hosts frees a tenth at once, new hosts do not rescan it one by one
+    test_circuit_breaker_fast_in_memory.max_cache_size = 20
+    test_circuit_breaker_fast_in_memory.hosts_states.clear()
+    hosts: typing.Final = [f"host-{index}" for index in range(test_circuit_breaker_fast_in_memory.max_cache_size + 2)]
+    for host in hosts:
+        await test_circuit_breaker_fast_in_memory.increment_failures_count(host=host)
+    assert list(test_circuit_breaker_fast_in_memory.hosts_states) == hosts[2:]
+
+    with pytest.raises(errors.HostUnavailableError):
+        await test_circuit_breaker_fast_in_memory.raise_host_unavailable_error(host=SOME_HOST)
+
+
 async def test_custom_circuit_breaker_in_memory_cash(
     test_custom_circuit_breaker_in_memory: CustomCircuitBreakerInMemory,
 ) -> None:
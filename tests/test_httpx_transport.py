@@ -0,0 +1,74 @@
+import dataclasses
+import typing
+
+import httpx
+import pytest
+import tenacity
+
+from circuit_breaker_box import (
+    CircuitBreakerInMemory,
+    CircuitBreakerKeys,
+    KeyGranularity,
+    Retrier,
+    RetryingTransport,
+    errors,
+)
+from tests.conftest import CIRCUIT_BREAKER_MAX_FAILURE_COUNT, MAX_CACHE_SIZE, MAX_RETRIES, RESET_TIMEOUT_IN_SECONDS
+
+
+SOME_URL = "http://example.com/users/1"
+
+
+@dataclasses.dataclass
+class Upstream:
+    outcomes: list[int | Exception]
+    request_bodies: list[bytes] = dataclasses.field(default_factory=list)
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.request_bodies.append(request.read())
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return httpx.Response(outcome)
+
+
+def build_retrier() -> Retrier[httpx.Response]:
+    return Retrier[httpx.Response](
+        circuit_breaker=CircuitBreakerInMemory(
+            reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+            max_failure_count=CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+            max_cache_size=MAX_CACHE_SIZE,
+        ),
+        stop_rule=tenacity.stop.stop_after_attempt(MAX_RETRIES),
+        retry_cause=tenacity.retry_if_exception_type(httpx.TransportError),
+        wait_strategy=tenacity.wait_none(),
+    )
+
+
+async def test_retrying_transport() -> None:
+    async def stream_body() -> typing.AsyncIterator[bytes]:
+        yield b"body"
+
+    upstream = Upstream([httpx.ConnectError("Connection refused"), httpx.codes.OK])
+    transport = RetryingTransport(retrier=build_retrier(), transport=httpx.MockTransport(upstream))
+    async with httpx.AsyncClient(transport=transport) as client:
+        response = await client.post(SOME_URL, content=stream_body())
+
+    # streamed bodies are buffered and sent again
+    assert response.status_code == httpx.codes.OK
+    assert upstream.request_bodies == [b"body", b"body"]
+
+
+async def test_retrying_transport_circuit_breaker_keys() -> None:
+    retrier = build_retrier()
+    assert isinstance(retrier.circuit_breaker, CircuitBreakerInMemory)
+    upstream = Upstream([httpx.ConnectError("Connection refused")] * MAX_RETRIES)
+    transport = RetryingTransport(
+        retrier=retrier,
+        transport=httpx.MockTransport(upstream),
+        keys=CircuitBreakerKeys(granularity=KeyGranularity.HOST_AND_METHOD),
+    )
+    async with httpx.AsyncClient(transport=transport) as client:
+        with pytest.raises(errors.HostUnavailableError):
+            await client.get(SOME_URL)
+    assert list(retrier.circuit_breaker.cache_hosts_with_errors) == ["example.com GET"]
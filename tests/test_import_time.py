@@ -0,0 +1,30 @@
+import typing
+
+import pytest
+
+import circuit_breaker_box
+from benchmarks.import_time import measure_imports
+
+
+HEAVY_MODULES = frozenset({"redis", "httpx", "tenacity", "cachetools", "opentelemetry", "prometheus_client"})
+
+
+@pytest.mark.parametrize(
+    ("statement", "expected_heavy_modules"),
+    [
+        ("import circuit_breaker_box", set()),
+        ("from circuit_breaker_box import CircuitBreakerFastInMemory, SnapshotFile", set()),
+        ("from circuit_breaker_box import CircuitBreakerInMemory, Retrier", {"cachetools", "tenacity"}),
+        ("from circuit_breaker_box import RetryingTransport", {"cachetools", "httpx", "tenacity"}),
+    ],
+)
+def test_import_pulls_in_only_used_dependencies(statement: str, expected_heavy_modules: set[str]) -> None:
+    imported_modules: typing.Final = {import_time.module_name for import_time in measure_imports(statement)}
+    assert HEAVY_MODULES.intersection(imported_modules) == expected_heavy_modules
+
+
+def test_lazy_attributes() -> None:
+    assert circuit_breaker_box.Retrier.__module__ == "circuit_breaker_box.retrier"
+    assert set(circuit_breaker_box.__all__) <= set(dir(circuit_breaker_box))
+    with pytest.raises(AttributeError, match="no attribute 'Missing'"):
+        _ = circuit_breaker_box.Missing
@@ -0,0 +1,223 @@
+import dataclasses
+import typing
+
+import fakeredis
+import httpx
+import prometheus_client
+import pytest
+import tenacity
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+
+from circuit_breaker_box import (
+    BackendOperation,
+    CircuitBreakerFastInMemory,
+    CircuitBreakerInMemory,
+    CircuitBreakerRedis,
+    CircuitState,
+    Instrumentation,
+    OpenTelemetryInstrumentation,
+    PrometheusInstrumentation,
+    Retrier,
+    errors,
+)
+from tests.conftest import (
+    CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+    FLUSH_INTERVAL_IN_SECONDS,
+    HALF_OPEN_MAX_PROBES,
+    MAX_CACHE_SIZE,
+    MAX_RETRIES,
+    RESET_TIMEOUT_IN_SECONDS,
+    SOME_HOST,
+    FakeTimer,
+)
+
+
+BACKOFF_IN_SECONDS = 0.001
+
+
+@dataclasses.dataclass
+class RecordingInstrumentation(Instrumentation):
+    events: list[tuple[typing.Any, ...]] = dataclasses.field(default_factory=list)
+    backend_operations: list[BackendOperation] = dataclasses.field(default_factory=list)
+
+    def attempt(self, host: str | None) -> None:
+        self.events.append(("attempt", host))
+
+    def retry(self, host: str | None, backoff_in_seconds: float) -> None:
+        self.events.append(("retry", host, backoff_in_seconds))
+
+    def short_circuit(self, host: str) -> None:
+        self.events.append(("short_circuit", host))
+
+    def state_transition(self, host: str, state: CircuitState) -> None:
+        self.events.append(("state_transition", host, state))
+
+    def backend_latency(self, operation: BackendOperation, latency_in_seconds: float) -> None:
+        assert latency_in_seconds >= 0
+        self.backend_operations.append(operation)
+
+
+async def test_retrier_instrumentation() -> None:
+    instrumentation = RecordingInstrumentation()
+    retrier = Retrier[httpx.Response](
+        circuit_breaker=CircuitBreakerInMemory(
+            reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+            max_failure_count=CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+            max_cache_size=MAX_CACHE_SIZE,
+            instrumentation=instrumentation,
+        ),
+        stop_rule=tenacity.stop.stop_after_attempt(MAX_RETRIES),
+        retry_cause=tenacity.retry_if_exception_type(ZeroDivisionError),
+        wait_strategy=tenacity.wait_fixed(BACKOFF_IN_SECONDS),
+        instrumentation=instrumentation,
+    )
+
+    async def foo() -> typing.NoReturn:
+        raise ZeroDivisionError
+
+    with pytest.raises(errors.HostUnavailableError):
+        await retrier.retry(foo, host=SOME_HOST)
+    assert instrumentation.events == [
+        ("attempt", SOME_HOST),
+        ("retry", SOME_HOST, BACKOFF_IN_SECONDS),
+        ("attempt", SOME_HOST),
+        ("retry", SOME_HOST, BACKOFF_IN_SECONDS),
+        ("state_transition", SOME_HOST, CircuitState.OPEN),
+        ("short_circuit", SOME_HOST),
+    ]
+
+    instrumentation.events.clear()
+    (result,) = await retrier.retry_many([(SOME_HOST, foo)])
+    assert isinstance(result, errors.HostUnavailableError)
+    assert instrumentation.events == [("short_circuit", SOME_HOST)]
+
+
+async def test_circuit_breakers_report_state_transitions() -> None:
+    timer = FakeTimer()
+    circuit_breakers: typing.Final = [
+        CircuitBreakerInMemory(
+            reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+            max_failure_count=CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+            max_cache_size=MAX_CACHE_SIZE,
+            half_open_max_probes=HALF_OPEN_MAX_PROBES,
+            instrumentation=RecordingInstrumentation(),
+        ),
+        CircuitBreakerFastInMemory(
+            reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+            max_failure_count=CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+            max_cache_size=MAX_CACHE_SIZE,
+            half_open_max_probes=HALF_OPEN_MAX_PROBES,
+            timer=timer,
+            instrumentation=RecordingInstrumentation(),
+        ),
+        CircuitBreakerRedis(
+            reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+            max_failure_count=CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+            redis_connection=fakeredis.FakeAsyncRedis(),
+            half_open_max_probes=HALF_OPEN_MAX_PROBES,
+            instrumentation=RecordingInstrumentation(),
+        ),
+    ]
+    for circuit_breaker in circuit_breakers:
+        for _ in range(MAX_RETRIES):
+            await circuit_breaker.increment_failures_count(SOME_HOST)
+        # open period lapses
+        timer.now += RESET_TIMEOUT_IN_SECONDS
+        if isinstance(circuit_breaker, CircuitBreakerInMemory):
+            circuit_breaker.cache_hosts_with_errors.pop(SOME_HOST)
+        elif isinstance(circuit_breaker, CircuitBreakerRedis):
+            await circuit_breaker.redis_connection.delete(f"circuit-breaker-{SOME_HOST}")
+        for _ in range(HALF_OPEN_MAX_PROBES):
+            assert await circuit_breaker.is_host_available(SOME_HOST)
+        await circuit_breaker.record_success(SOME_HOST)
+
+        assert typing.cast("RecordingInstrumentation", circuit_breaker.instrumentation).events == [
+            ("state_transition", SOME_HOST, CircuitState.OPEN),
+            ("state_transition", SOME_HOST, CircuitState.HALF_OPEN),
+            ("state_transition", SOME_HOST, CircuitState.CLOSED),
+        ]
+
+
+@pytest.mark.parametrize("use_lua_script", [False, True])
+async def test_circuit_breaker_redis_reports_backend_latency(use_lua_script: bool) -> None:
+    instrumentation = RecordingInstrumentation()
+    circuit_breaker = CircuitBreakerRedis(
+        reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+        max_failure_count=CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+        redis_connection=fakeredis.FakeAsyncRedis(),
+        use_lua_script=use_lua_script,
+        flush_interval_in_seconds=FLUSH_INTERVAL_IN_SECONDS,
+        instrumentation=instrumentation,
+    )
+    await circuit_breaker.increment_failures_count(SOME_HOST)
+    await circuit_breaker.increment_failures_count(SOME_HOST)
+    await circuit_breaker.flush_failures()
+    assert not await circuit_breaker.is_host_available(SOME_HOST)
+    assert await circuit_breaker.are_hosts_available([SOME_HOST]) == {SOME_HOST: False}
+
+    assert instrumentation.events == [("state_transition", SOME_HOST, CircuitState.OPEN)]
+    assert instrumentation.backend_operations == [
+        BackendOperation.FLUSH,
+        BackendOperation.CHECK,
+        BackendOperation.CHECK_MANY,
+    ]
+
+    instrumentation.backend_operations.clear()
+    circuit_breaker.flush_interval_in_seconds = None
+    await circuit_breaker.increment_failures_count(SOME_HOST)
+    assert instrumentation.backend_operations == [BackendOperation.INCREMENT_FAILURES]
+
+
+@pytest.mark.parametrize("label_hosts", [False, True])
+def test_prometheus_instrumentation(label_hosts: bool) -> None:
+    registry = prometheus_client.CollectorRegistry()
+    instrumentation = PrometheusInstrumentation(registry=registry, label_hosts=label_hosts)
+    instrumentation.attempt(SOME_HOST)
+    instrumentation.retry(SOME_HOST, BACKOFF_IN_SECONDS)
+    instrumentation.short_circuit(SOME_HOST)
+    instrumentation.state_transition(SOME_HOST, CircuitState.OPEN)
+    instrumentation.backend_latency(BackendOperation.CHECK, BACKOFF_IN_SECONDS)
+
+    host_labels: typing.Final = {"host": SOME_HOST} if label_hosts else {}
+    for name in ("attempts", "retries", "short_circuits", "backoff_seconds_count"):
+        assert registry.get_sample_value(
+            f"circuit_breaker_box_{name}{'' if 'count' in name else '_total'}", host_labels
+        )
+    assert registry.get_sample_value(
+        "circuit_breaker_box_state_transitions_total", {**host_labels, "state": CircuitState.OPEN.value}
+    )
+    assert registry.get_sample_value(
+        "circuit_breaker_box_backend_latency_seconds_count", {"operation": BackendOperation.CHECK.value}
+    )
+
+
+@pytest.mark.parametrize("label_hosts", [False, True])
+def test_opentelemetry_instrumentation(label_hosts: bool) -> None:
+    reader = InMemoryMetricReader()
+    instrumentation = OpenTelemetryInstrumentation(
+        meter=MeterProvider(metric_readers=[reader]).get_meter("test"), label_hosts=label_hosts
+    )
+    instrumentation.attempt(SOME_HOST)
+    instrumentation.retry(SOME_HOST, BACKOFF_IN_SECONDS)
+    instrumentation.short_circuit(SOME_HOST)
+    instrumentation.state_transition(SOME_HOST, CircuitState.OPEN)
+    instrumentation.backend_latency(BackendOperation.CHECK, BACKOFF_IN_SECONDS)
+
+    metrics_data = reader.get_metrics_data()
+    assert metrics_data
+    metrics_attributes: typing.Final = {
+        metric.name: dict(metric.data.data_points[0].attributes or {})
+        for resource_metrics in metrics_data.resource_metrics
+        for scope_metrics in resource_metrics.scope_metrics
+        for metric in scope_metrics.metrics
+    }
+    host_attributes: typing.Final = {"host": SOME_HOST} if label_hosts else {}
+    assert metrics_attributes == {
+        "circuit_breaker_box.attempts": host_attributes,
+        "circuit_breaker_box.retries": host_attributes,
+        "circuit_breaker_box.backoff": host_attributes,
+        "circuit_breaker_box.short_circuits": host_attributes,
+        "circuit_breaker_box.state_transitions": {**host_attributes, "state": CircuitState.OPEN.value},
+        "circuit_breaker_box.backend_latency": {"operation": BackendOperation.CHECK.value},
+    }
@@ -0,0 +1,82 @@
+import fakeredis
+import pytest
+
+from circuit_breaker_box import (
+    CircuitBreakerFastInMemory,
+    CircuitBreakerInMemory,
+    CircuitBreakerKeys,
+    CircuitBreakerRedis,
+    KeyGranularity,
+    OverflowPolicy,
+    errors,
+)
+from circuit_breaker_box.keys import OVERFLOW_KEY
+from tests.conftest import (
+    CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+    MAX_CACHE_SIZE,
+    MAX_RETRIES,
+    OTHER_HOST,
+    RESET_TIMEOUT_IN_SECONDS,
+    SOME_HOST,
+)
+
+
+def test_keys_derive() -> None:
+    host_keys = CircuitBreakerKeys()
+    assert host_keys.derive(SOME_HOST, method="GET", path_template="/users/{id}") == SOME_HOST
+
+    method_keys = CircuitBreakerKeys(granularity=KeyGranularity.HOST_AND_METHOD)
+    key = method_keys.derive(SOME_HOST, method="GET")
+    assert key == f"{SOME_HOST} GET"
+    assert method_keys.derive(SOME_HOST, method="GET") is key
+    # derived keys passed to a backend are interned as they are
+    assert method_keys.intern(f"{SOME_HOST} GET") is key
+    assert method_keys.derive(SOME_HOST) == SOME_HOST
+
+    path_template_keys = CircuitBreakerKeys(granularity=KeyGranularity.HOST_AND_PATH_TEMPLATE)
+    assert path_template_keys.derive(SOME_HOST, path_template="/users/{id}") == f"{SOME_HOST} /users/{{id}}"
+
+
+def test_keys_overflow() -> None:
+    keys = CircuitBreakerKeys(granularity=KeyGranularity.HOST_AND_METHOD, max_keys_count=1)
+    assert keys.derive(SOME_HOST) == SOME_HOST
+    assert keys.derive(OTHER_HOST) == OVERFLOW_KEY
+    assert keys.derive(SOME_HOST, method="GET") == OVERFLOW_KEY
+    assert not keys.derived_keys
+
+    keys.overflow_policy = OverflowPolicy.REJECT
+    with pytest.raises(errors.TooManyKeysError, match="tracks 1 keys already"):
+        keys.derive(OTHER_HOST)
+
+
+async def test_backends_share_overflow_circuit() -> None:
+    for circuit_breaker in (
+        CircuitBreakerInMemory(
+            reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+            max_failure_count=CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+            max_cache_size=MAX_CACHE_SIZE,
+            keys=CircuitBreakerKeys(max_keys_count=1),
+        ),
+        CircuitBreakerFastInMemory(
+            reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+            max_failure_count=CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+            max_cache_size=MAX_CACHE_SIZE,
+            keys=CircuitBreakerKeys(max_keys_count=1),
+        ),
+        CircuitBreakerRedis(
+            reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+            max_failure_count=CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+            redis_connection=fakeredis.FakeAsyncRedis(),
+            local_cache_max_size=1,
+            keys=CircuitBreakerKeys(max_keys_count=1),
+        ),
+    ):
+        await circuit_breaker.record_success(SOME_HOST)
+        for _ in range(MAX_RETRIES):
+            await circuit_breaker.increment_failures_count(OTHER_HOST)
+        assert await circuit_breaker.are_hosts_available([SOME_HOST, OTHER_HOST, "third-host"]) == {
+            SOME_HOST: True,
+            OTHER_HOST: False,
+            "third-host": False,
+        }
+        assert await circuit_breaker.is_host_available("third-host") is False
@@ -1,11 +1,34 @@
+import asyncio
+import http
+import time
 import typing
+from unittest import mock
 
 import fastapi.exceptions
 import httpx
 import pytest
+import tenacity
 
-from circuit_breaker_box import Retrier
-from tests.conftest import SOME_HOST
+from circuit_breaker_box import (
+    CircuitBreakerFastInMemory,
+    CircuitBreakerInMemory,
+    HedgingPolicy,
+    Outcome,
+    OutcomeClassifier,
+    Retrier,
+    deadline_after,
+    deadline_at,
+    errors,
+    remaining_budget_in_seconds,
+)
+from tests.conftest import (
+    HALF_OPEN_MAX_PROBES,
+    MAX_CACHE_SIZE,
+    MAX_RETRIES,
+    OTHER_HOST,
+    RESET_TIMEOUT_IN_SECONDS,
+    SOME_HOST,
+)
 
 
 async def test_retry(
@@ -49,3 +72,406 @@ async def test_retry_custom_circuit_breaker(
             request=test_request,
             host="",
         )
+
+
+async def test_retry_backoff_does_not_block_event_loop() -> None:
+    retrier = Retrier[httpx.Response](
+        stop_rule=tenacity.stop.stop_after_attempt(MAX_RETRIES),
+        retry_cause=tenacity.retry_if_exception_type(ZeroDivisionError),
+        wait_strategy=tenacity.wait_fixed(1),
+    )
+    attempts = 0
+
+    async def foo() -> typing.NoReturn:
+        nonlocal attempts
+        attempts += 1
+        raise ZeroDivisionError
+
+    retry_task = asyncio.create_task(retrier.retry(foo))
+    await asyncio.sleep(0.01)
+
+    assert attempts == 1
+    assert not retry_task.done()
+
+    retry_task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await retry_task
+    assert attempts == 1
+
+
+async def test_retry_checks_host_without_awaiting(
+    test_circuit_breaker_fast_in_memory: CircuitBreakerFastInMemory,
+) -> None:
+    retrier = Retrier[httpx.Response](
+        stop_rule=tenacity.stop.stop_after_attempt(MAX_RETRIES),
+        retry_cause=tenacity.retry_if_exception_type(ZeroDivisionError),
+        wait_strategy=tenacity.wait_none(),
+        circuit_breaker=test_circuit_breaker_fast_in_memory,
+    )
+
+    async def bar() -> httpx.Response:
+        return httpx.Response(status_code=httpx.codes.OK)
+
+    with mock.patch.object(test_circuit_breaker_fast_in_memory, "is_host_available") as is_host_available:
+        assert (await retrier.retry(bar, SOME_HOST)).status_code == httpx.codes.OK
+    is_host_available.assert_not_called()
+
+
+@pytest.mark.parametrize("reraise", [True, False])
+async def test_retry_records_last_failure(reraise: bool) -> None:
+    circuit_breaker = CircuitBreakerInMemory(
+        reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+        max_failure_count=MAX_RETRIES,
+        max_cache_size=MAX_CACHE_SIZE,
+    )
+    retrier = Retrier[httpx.Response](
+        stop_rule=tenacity.stop.stop_after_attempt(MAX_RETRIES),
+        retry_cause=tenacity.retry_if_exception_type(ZeroDivisionError),
+        wait_strategy=tenacity.wait_none(),
+        circuit_breaker=circuit_breaker,
+        reraise=reraise,
+    )
+
+    async def foo() -> typing.NoReturn:
+        raise ZeroDivisionError
+
+    async def bar() -> typing.NoReturn:
+        raise ValueError
+
+    with pytest.raises(ZeroDivisionError if reraise else tenacity.RetryError):
+        await retrier.retry(foo, SOME_HOST)
+    assert circuit_breaker.cache_hosts_with_errors[SOME_HOST][0] == MAX_RETRIES
+
+    # failures not matching retry_cause are not the host's fault
+    with pytest.raises(ValueError):  # noqa: PT011
+        await retrier.retry(bar, OTHER_HOST)
+    assert OTHER_HOST not in circuit_breaker.cache_hosts_with_errors
+
+
+async def test_retry_classifies_outcomes() -> None:
+    circuit_breaker = CircuitBreakerInMemory(
+        reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+        max_failure_count=1,
+        max_cache_size=MAX_CACHE_SIZE,
+        outcome_classifier=OutcomeClassifier(slow_call_duration_in_seconds=0.0),
+    )
+    retrier = Retrier[http.HTTPStatus](
+        stop_rule=tenacity.stop.stop_after_attempt(MAX_RETRIES),
+        retry_cause=tenacity.retry_if_exception_type(ZeroDivisionError),
+        wait_strategy=tenacity.wait_none(),
+        circuit_breaker=circuit_breaker,
+        outcome_classifier=OutcomeClassifier(
+            is_failed_result=lambda status: status >= http.HTTPStatus.INTERNAL_SERVER_ERROR
+        ),
+    )
+
+    async def respond(status: http.HTTPStatus) -> http.HTTPStatus:
+        return status
+
+    # failed results are returned as they are and recorded as failures
+    assert await retrier.retry(respond, SOME_HOST, http.HTTPStatus.SERVICE_UNAVAILABLE) == (
+        http.HTTPStatus.SERVICE_UNAVAILABLE
+    )
+    assert await retrier.retry(respond, SOME_HOST, http.HTTPStatus.OK) == http.HTTPStatus.OK
+    assert circuit_breaker.cache_hosts_with_errors[SOME_HOST][0] == 1
+    await retrier.retry(respond, SOME_HOST, http.HTTPStatus.SERVICE_UNAVAILABLE)
+    with pytest.raises(errors.HostUnavailableError):
+        await retrier.retry(respond, SOME_HOST, http.HTTPStatus.OK)
+
+    # without its own classifier the Retrier uses the one of the circuit breaker, slow calls count as failures
+    retrier.outcome_classifier = None
+    for _ in range(2):
+        await retrier.retry(respond, OTHER_HOST, http.HTTPStatus.OK)
+    with pytest.raises(errors.HostUnavailableError):
+        await retrier.retry(respond, OTHER_HOST, http.HTTPStatus.OK)
+
+
+async def test_retry_within_deadline(test_circuit_breaker_in_memory_half_open: CircuitBreakerInMemory) -> None:
+    retrier = Retrier[float | None](
+        stop_rule=tenacity.stop.stop_after_attempt(MAX_RETRIES),
+        retry_cause=tenacity.retry_if_exception_type((ZeroDivisionError, asyncio.TimeoutError)),
+        wait_strategy=tenacity.wait_fixed(RESET_TIMEOUT_IN_SECONDS),
+        circuit_breaker=test_circuit_breaker_in_memory_half_open,
+        attempt_timeout_in_seconds=0.5,
+        min_attempt_duration_in_seconds=0.01,
+    )
+    attempts_count = 0
+
+    async def foo() -> typing.NoReturn:
+        nonlocal attempts_count
+        attempts_count += 1
+        raise ZeroDivisionError
+
+    async def slow() -> None:
+        await asyncio.sleep(RESET_TIMEOUT_IN_SECONDS)
+
+    async def report_budget() -> float | None:
+        return remaining_budget_in_seconds()
+
+    # attempts see their own timeout as the remaining budget, the coroutine can pass it on
+    assert remaining_budget_in_seconds() is None
+    assert (await retrier.retry(report_budget, SOME_HOST)) == pytest.approx(0.5, abs=0.1)
+    with deadline_after(RESET_TIMEOUT_IN_SECONDS), deadline_after(0.2):
+        assert (await retrier.retry(report_budget, SOME_HOST)) == pytest.approx(0.2, abs=0.1)
+    retrier.attempt_timeout_in_seconds = None
+    with deadline_after(0.2):
+        assert (await retrier.retry(report_budget, SOME_HOST)) == pytest.approx(0.2, abs=0.1)
+    retrier.attempt_timeout_in_seconds = 0.5
+    assert remaining_budget_in_seconds() is None
+
+    # backoffs are clamped to the deadline, attempts are not started without min_attempt_duration_in_seconds left
+    started_at = time.monotonic()
+    with deadline_after(0.1), pytest.raises(ZeroDivisionError):
+        await retrier.retry(foo, SOME_HOST)
+    assert attempts_count == 2  # noqa: PLR2004
+    test_circuit_breaker_in_memory_half_open.cache_hosts_with_errors.clear()
+    with deadline_after(0.1), pytest.raises(asyncio.TimeoutError):
+        await retrier.retry(slow, SOME_HOST)
+    assert time.monotonic() - started_at < 1
+
+    # an expired deadline is not the host's fault, it neither calls the host nor takes up a half-open probe
+    test_circuit_breaker_in_memory_half_open.cache_hosts_half_open[OTHER_HOST] = (0, time.monotonic() + 1)
+    with deadline_at(time.monotonic()), pytest.raises(errors.DeadlineExceededError):
+        await retrier.retry(foo, OTHER_HOST)
+    assert attempts_count == 2  # noqa: PLR2004
+    assert test_circuit_breaker_in_memory_half_open.cache_hosts_half_open[OTHER_HOST][0] == 0
+    assert OTHER_HOST not in test_circuit_breaker_in_memory_half_open.cache_hosts_with_errors
+
+
+async def test_decorate(test_circuit_breaker_in_memory: CircuitBreakerInMemory) -> None:
+    retrier = Retrier[httpx.Response](
+        stop_rule=tenacity.stop.stop_after_attempt(MAX_RETRIES),
+        retry_cause=tenacity.retry_if_exception_type(ZeroDivisionError),
+        wait_strategy=tenacity.wait_none(),
+        circuit_breaker=test_circuit_breaker_in_memory,
+    )
+    with pytest.raises(ValueError, match="'host' argument should be defined"):
+        retrier.decorate()
+
+    outcomes: list[int | Exception] = [ZeroDivisionError(), httpx.codes.OK]
+
+    @retrier.decorate(SOME_HOST)
+    async def fetch(path: str) -> httpx.Response:
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return httpx.Response(status_code=outcome, headers={"path": path})
+
+    assert fetch.__name__ == "fetch"
+    response = await fetch("/users")
+    assert response.status_code == httpx.codes.OK
+    assert response.headers["path"] == "/users"
+    assert not outcomes
+
+    # settings changed after decorating apply to the decorated function
+    retrier.retry_cause = tenacity.retry_if_exception_type(ValueError)
+    outcomes.extend([ZeroDivisionError(), httpx.codes.OK])
+    with pytest.raises(ZeroDivisionError):
+        await fetch("/users")
+
+
+async def test_retry_many(
+    test_retry_custom_circuit_breaker_in_memory: Retrier[httpx.Response],
+    test_retry_without_circuit_breaker: Retrier[httpx.Response],
+) -> None:
+    async def bar() -> httpx.Response:
+        return httpx.Response(status_code=httpx.codes.OK)
+
+    async def foo() -> typing.NoReturn:
+        raise ZeroDivisionError
+
+    circuit_breaker = test_retry_custom_circuit_breaker_in_memory.circuit_breaker
+    assert circuit_breaker
+    for _ in range(MAX_RETRIES):
+        await circuit_breaker.increment_failures_count(SOME_HOST)
+
+    ok_response, unavailable_error, failure = await test_retry_custom_circuit_breaker_in_memory.retry_many(
+        [(OTHER_HOST, bar), (SOME_HOST, bar), (OTHER_HOST, foo)]
+    )
+    assert isinstance(ok_response, httpx.Response)
+    assert ok_response.status_code == httpx.codes.OK
+    assert isinstance(unavailable_error, fastapi.exceptions.HTTPException)
+    assert isinstance(failure, fastapi.exceptions.HTTPException)
+
+    assert [
+        type(result) for result in await test_retry_without_circuit_breaker.retry_many([(SOME_HOST, bar), ("", foo)])
+    ] == [httpx.Response, ZeroDivisionError]
+
+    with pytest.raises(ValueError, match="'host' argument should be defined"):
+        await test_retry_custom_circuit_breaker_in_memory.retry_many([("", bar)])
+
+
+async def test_retry_many_admits_half_open_probes_once(
+    test_circuit_breaker_in_memory_half_open: CircuitBreakerInMemory,
+) -> None:
+    retrier = Retrier[httpx.Response](
+        stop_rule=tenacity.stop.stop_after_attempt(1),
+        retry_cause=tenacity.retry_if_exception_type(ZeroDivisionError),
+        wait_strategy=tenacity.wait_none(),
+        circuit_breaker=test_circuit_breaker_in_memory_half_open,
+    )
+    sent_requests_count = 0
+
+    async def bar() -> httpx.Response:
+        nonlocal sent_requests_count
+        sent_requests_count += 1
+        await asyncio.sleep(0.01)
+        return httpx.Response(status_code=httpx.codes.OK)
+
+    for _ in range(MAX_RETRIES):
+        await test_circuit_breaker_in_memory_half_open.increment_failures_count(SOME_HOST)
+    test_circuit_breaker_in_memory_half_open.cache_hosts_with_errors.pop(SOME_HOST)
+
+    results = await retrier.retry_many([(SOME_HOST, bar)] * (HALF_OPEN_MAX_PROBES + 3))
+    assert sent_requests_count == HALF_OPEN_MAX_PROBES
+    assert sum(isinstance(result, errors.HostUnavailableError) for result in results) == 3  # noqa: PLR2004
+
+
+async def test_retry_hedging(test_circuit_breaker_in_memory: CircuitBreakerInMemory) -> None:
+    hedging_policy = HedgingPolicy(delay_in_seconds=0.01, max_concurrent_hedges=1)
+    retrier = Retrier[httpx.Response](
+        stop_rule=tenacity.stop.stop_after_attempt(MAX_RETRIES),
+        retry_cause=tenacity.retry_if_exception_type(ZeroDivisionError),
+        wait_strategy=tenacity.wait_none(),
+        circuit_breaker=test_circuit_breaker_in_memory,
+        hedging_policy=hedging_policy,
+    )
+    calls: list[str] = []
+
+    async def slow_then_fast() -> httpx.Response:
+        calls.append("call")
+        if len(calls) == 1:
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                calls.append("cancelled")
+                raise
+        return httpx.Response(status_code=httpx.codes.OK)
+
+    response = await retrier.retry(slow_then_fast, SOME_HOST)
+    assert response.status_code == httpx.codes.OK
+    assert calls == ["call", "call", "cancelled"]
+    assert hedging_policy.in_flight_hedges == 0
+
+    # failed hedge is recorded as a failure, the slow attempt still wins
+    async def slow_then_failing() -> httpx.Response:
+        calls.append("call")
+        if len(calls) % 2:
+            await asyncio.sleep(0.05)
+            return httpx.Response(status_code=httpx.codes.OK)
+        raise ZeroDivisionError
+
+    calls.clear()
+    assert (await retrier.retry(slow_then_failing, OTHER_HOST)).status_code == httpx.codes.OK
+    assert calls == ["call", "call"]
+    assert test_circuit_breaker_in_memory.cache_hosts_with_errors[OTHER_HOST][0] == 1
+
+    # exhausted budget or banned host do not get hedged attempts
+    hedging_policy.in_flight_hedges = hedging_policy.max_concurrent_hedges
+    calls.clear()
+    assert (await retrier.retry(slow_then_failing, OTHER_HOST)).status_code == httpx.codes.OK
+    assert calls == ["call"]
+
+    hedging_policy.in_flight_hedges = 0
+    for _ in range(MAX_RETRIES):
+        await test_circuit_breaker_in_memory.increment_failures_count(OTHER_HOST)
+
+    async def banning_slow_attempt() -> httpx.Response:
+        calls.append("call")
+        test_circuit_breaker_in_memory.cache_hosts_with_errors[SOME_HOST] = (MAX_RETRIES, time.monotonic() + 1)
+        await asyncio.sleep(0.05)
+        return httpx.Response(status_code=httpx.codes.OK)
+
+    calls.clear()
+    assert (await retrier.retry(banning_slow_attempt, SOME_HOST)).status_code == httpx.codes.OK
+    assert calls == ["call"]
+
+
+async def test_retry_hedging_outcomes(
+    test_retry_without_circuit_breaker: Retrier[httpx.Response],
+    test_circuit_breaker_in_memory: CircuitBreakerInMemory,
+) -> None:
+    test_retry_without_circuit_breaker.hedging_policy = HedgingPolicy(delay_in_seconds=0.01)
+    calls: list[str] = []
+
+    async def slow_failing() -> typing.NoReturn:
+        calls.append("call")
+        await asyncio.sleep(0.02)
+        raise ZeroDivisionError
+
+    with pytest.raises(ZeroDivisionError):
+        await test_retry_without_circuit_breaker.retry(slow_failing)
+    assert len(calls) == MAX_RETRIES * 2
+
+    # attempts finishing together: one wins, the other is recorded as a success
+    test_retry_without_circuit_breaker.circuit_breaker = test_circuit_breaker_in_memory
+    both_started = asyncio.Event()
+
+    async def finishing_together() -> httpx.Response:
+        await both_started.wait()
+        return httpx.Response(status_code=httpx.codes.OK)
+
+    with mock.patch.object(test_circuit_breaker_in_memory, "record_success") as record_success:
+        retry_task = asyncio.create_task(test_retry_without_circuit_breaker.retry(finishing_together, SOME_HOST))
+        await asyncio.sleep(0.05)
+        both_started.set()
+        assert (await retry_task).status_code == httpx.codes.OK
+    assert record_success.await_count == 2  # noqa: PLR2004
+
+    # extra successes go through the outcome classifier like the winner does
+    test_retry_without_circuit_breaker.outcome_classifier = OutcomeClassifier(is_failed_result=lambda _: True)
+    both_started.clear()
+    with mock.patch.object(test_circuit_breaker_in_memory, "record_outcome") as record_outcome:
+        retry_task = asyncio.create_task(test_retry_without_circuit_breaker.retry(finishing_together, SOME_HOST))
+        await asyncio.sleep(0.05)
+        both_started.set()
+        await retry_task
+    assert [call.args for call in record_outcome.await_args_list] == [(SOME_HOST, Outcome.FAILURE)] * 2
+
+
+async def test_retry_hedging_classifies_losers(
+    test_circuit_breaker_in_memory_half_open: CircuitBreakerInMemory,
+) -> None:
+    hedging_policy = HedgingPolicy(delay_in_seconds=0.01, max_concurrent_hedges=1)
+    retrier = Retrier[httpx.Response](
+        stop_rule=tenacity.stop.stop_after_attempt(1),
+        retry_cause=tenacity.retry_if_exception_type(ZeroDivisionError),
+        wait_strategy=tenacity.wait_none(),
+        circuit_breaker=test_circuit_breaker_in_memory_half_open,
+        hedging_policy=hedging_policy,
+    )
+    hedged_errors: list[Exception] = [KeyError(), errors.BulkheadFullError()]
+
+    async def slow_then_failing() -> httpx.Response:
+        if hedged_errors and hedging_policy.in_flight_hedges:
+            raise hedged_errors.pop()
+        await asyncio.sleep(0.05)
+        return httpx.Response(status_code=httpx.codes.OK)
+
+    # losers failed without a retry_cause, or refused on our side, are not the host's failures
+    for _ in range(2):
+        assert (await retrier.retry(slow_then_failing, SOME_HOST)).status_code == httpx.codes.OK
+    assert SOME_HOST not in test_circuit_breaker_in_memory_half_open.cache_hosts_with_errors
+
+    # hedge refused by the budget does not take up a half-open probe
+    for _ in range(MAX_RETRIES):
+        await test_circuit_breaker_in_memory_half_open.increment_failures_count(SOME_HOST)
+    test_circuit_breaker_in_memory_half_open.cache_hosts_with_errors.pop(SOME_HOST)
+    hedging_policy.in_flight_hedges = hedging_policy.max_concurrent_hedges
+    with mock.patch.object(
+        test_circuit_breaker_in_memory_half_open,
+        "is_host_available",
+        wraps=test_circuit_breaker_in_memory_half_open.is_host_available,
+    ) as is_host_available:
+        assert (await retrier.retry(slow_then_failing, SOME_HOST)).status_code == httpx.codes.OK
+    assert is_host_available.await_count == 1
+
+
+def test_hedging_policy_percentile_delay() -> None:
+    hedging_policy = HedgingPolicy(delay_in_seconds=1, delay_percentile=90, recalculate_delay_every=10)
+    for latency in range(1, 10):
+        hedging_policy.observe_latency(latency / 100)
+    assert hedging_policy.current_delay_in_seconds == 1
+
+    hedging_policy.observe_latency(0.1)
+    assert hedging_policy.current_delay_in_seconds == 0.09  # noqa: PLR2004
@@ -0,0 +1,74 @@
+import typing
+from unittest import mock
+
+import fakeredis
+import httpx
+import pytest
+import tenacity
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from circuit_breaker_box import Retrier, RetryBudgetInMemory, RetryBudgetRedis
+from tests.conftest import MAX_RETRIES, OTHER_HOST, SOME_HOST
+
+
+async def test_retrier_with_retry_budget() -> None:
+    retry_budget = RetryBudgetInMemory(max_tokens=MAX_RETRIES - 1, token_ratio=1, per_host=True)
+    retrier = Retrier[httpx.Response](
+        stop_rule=tenacity.stop.stop_after_attempt(MAX_RETRIES),
+        retry_cause=tenacity.retry_if_exception_type(ZeroDivisionError),
+        wait_strategy=tenacity.wait_none(),
+        retry_budget=retry_budget,
+    )
+    calls: list[str] = []
+
+    async def foo(host: str) -> typing.NoReturn:
+        calls.append(host)
+        raise ZeroDivisionError
+
+    async def bar() -> httpx.Response:
+        return httpx.Response(status_code=httpx.codes.OK)
+
+    # the first failure spends the whole budget, the next one is not retried at all
+    for _ in range(2):
+        with pytest.raises(ZeroDivisionError):
+            await retrier.retry(foo, SOME_HOST, SOME_HOST)
+    assert calls == [SOME_HOST] * (MAX_RETRIES + 1)
+
+    # budget of other hosts is untouched
+    with pytest.raises(ZeroDivisionError):
+        await retrier.retry(foo, OTHER_HOST, OTHER_HOST)
+    assert calls.count(OTHER_HOST) == MAX_RETRIES
+
+    # successes refill the budget
+    for _ in range(2):
+        await retrier.retry(bar, SOME_HOST)
+    calls.clear()
+    with pytest.raises(ZeroDivisionError):
+        await retrier.retry(foo, SOME_HOST, SOME_HOST)
+    assert calls == [SOME_HOST] * 3
+
+
+async def test_retry_budget_redis() -> None:
+    redis_connection = fakeredis.FakeAsyncRedis(decode_responses=True)
+    retry_budget = RetryBudgetRedis(max_tokens=2, token_ratio=0.5, redis_connection=redis_connection)
+
+    assert [await retry_budget.withdraw(SOME_HOST) for _ in range(3)] == [True, True, False]
+
+    # deposits are written once they add up to a whole token
+    await retry_budget.deposit(SOME_HOST)
+    assert await redis_connection.get("retry-budget-") == "0"
+    await retry_budget.deposit(OTHER_HOST)
+    assert await redis_connection.get("retry-budget-") == "1"
+    assert await retry_budget.withdraw(SOME_HOST)
+
+    # pending deposits are kept for at most max_cache_size budget keys
+    per_host_retry_budget = RetryBudgetRedis(
+        token_ratio=0.5, per_host=True, max_cache_size=1, redis_connection=redis_connection
+    )
+    await per_host_retry_budget.deposit(SOME_HOST)
+    await per_host_retry_budget.deposit(OTHER_HOST)
+    assert dict(per_host_retry_budget.pending_deposits) == {OTHER_HOST: 0.5}
+
+    # redis errors allow retries
+    with mock.patch.object(retry_budget, "change_tokens_script", side_effect=RedisConnectionError):
+        assert await retry_budget.withdraw(SOME_HOST)
@@ -0,0 +1,249 @@
+import asyncio
+import fcntl
+import multiprocessing
+import pathlib
+import struct
+import threading
+import typing
+import uuid
+
+import pytest
+
+from circuit_breaker_box import CircuitBreakerSharedMemory
+from tests.conftest import (
+    CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+    HALF_OPEN_MAX_PROBES,
+    MAX_CACHE_SIZE,
+    MAX_RETRIES,
+    OTHER_HOST,
+    RESET_TIMEOUT_IN_SECONDS,
+    SOME_HOST,
+    FakeTimer,
+)
+
+
+# slots count, then per slot: sequence, key hash, failures count, failures and half-open expiry, admitted probes
+HEADER_SIZE: typing.Final = struct.calcsize("=Q")
+SLOT_SIZE: typing.Final = struct.calcsize("=QQqddq")
+
+
+@pytest.fixture(name="build_circuit_breaker")
+def fixture_build_circuit_breaker(
+    tmp_path: pathlib.Path,
+) -> typing.Iterator[typing.Callable[..., CircuitBreakerSharedMemory]]:
+    name: typing.Final = f"circuit-breaker-box-test-{uuid.uuid4().hex[:8]}"
+    circuit_breakers: typing.Final[list[CircuitBreakerSharedMemory]] = []
+
+    def build_circuit_breaker(**kwargs: typing.Any) -> CircuitBreakerSharedMemory:  # noqa: ANN401
+        circuit_breaker: typing.Final = CircuitBreakerSharedMemory(
+            **{
+                "reset_timeout_in_seconds": RESET_TIMEOUT_IN_SECONDS,
+                "max_failure_count": CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+                "max_cache_size": MAX_CACHE_SIZE,
+                "name": name,
+                "lock_path": tmp_path / "circuit-breaker-box.lock",
+                **kwargs,
+            }
+        )
+        circuit_breakers.append(circuit_breaker)
+        return circuit_breaker
+
+    yield build_circuit_breaker
+    circuit_breakers[0].unlink()
+    for circuit_breaker in circuit_breakers:
+        circuit_breaker.close()
+
+
+async def test_shared_memory_circuit_breaker_is_shared(
+    build_circuit_breaker: typing.Callable[..., CircuitBreakerSharedMemory],
+) -> None:
+    timer: typing.Final = FakeTimer(now=1000.0)
+    worker, other_worker = build_circuit_breaker(timer=timer), build_circuit_breaker(timer=timer)
+    for _ in range(MAX_RETRIES):
+        await worker.increment_failures_count(SOME_HOST)
+
+    # a ban recorded by one worker applies to every worker attached to the table
+    assert not await other_worker.is_host_available(SOME_HOST)
+    assert await other_worker.are_hosts_available([SOME_HOST, OTHER_HOST]) == {SOME_HOST: False, OTHER_HOST: True}
+    assert await other_worker.increment_failures_count_and_check(OTHER_HOST)
+    with pytest.raises(Exception, match="banned"):
+        await other_worker.raise_host_unavailable_error(SOME_HOST)
+
+    # successes of healthy hosts change nothing, bans lapse after the reset timeout
+    await other_worker.record_success(SOME_HOST)
+    await other_worker.record_success(OTHER_HOST)
+    await other_worker.record_success("http://unknown.com/")
+    assert not await worker.is_host_available(SOME_HOST)
+    timer.now += RESET_TIMEOUT_IN_SECONDS
+    assert await worker.is_host_available(SOME_HOST)
+
+
+async def test_shared_memory_circuit_breaker_half_open(
+    build_circuit_breaker: typing.Callable[..., CircuitBreakerSharedMemory],
+) -> None:
+    timer: typing.Final = FakeTimer(now=1000.0)
+    worker, other_worker = (
+        build_circuit_breaker(timer=timer, half_open_max_probes=HALF_OPEN_MAX_PROBES),
+        build_circuit_breaker(timer=timer, half_open_max_probes=HALF_OPEN_MAX_PROBES),
+    )
+    for _ in range(CIRCUIT_BREAKER_MAX_FAILURE_COUNT + 1):
+        await worker.increment_failures_count(SOME_HOST)
+    assert not await other_worker.is_host_available(SOME_HOST)
+
+    # probes are counted across workers
+    timer.now += RESET_TIMEOUT_IN_SECONDS
+    assert [await other_worker.is_host_available(SOME_HOST) for _ in range(HALF_OPEN_MAX_PROBES)] == [True, True]
+    assert not await worker.is_host_available(SOME_HOST)
+
+    # a failed probe reopens the circuit right away
+    await worker.increment_failures_count(SOME_HOST)
+    assert not await other_worker.is_host_available(SOME_HOST)
+
+    # a successful probe closes it for every worker
+    timer.now += RESET_TIMEOUT_IN_SECONDS
+    assert await worker.is_host_available(SOME_HOST)
+    await worker.record_success(SOME_HOST)
+    assert [await other_worker.is_host_available(SOME_HOST) for _ in range(HALF_OPEN_MAX_PROBES + 1)] == [True] * 3
+
+    # the half-open window lapses along with the failures
+    for _ in range(CIRCUIT_BREAKER_MAX_FAILURE_COUNT + 1):
+        await worker.increment_failures_count(SOME_HOST)
+    timer.now += RESET_TIMEOUT_IN_SECONDS * 2
+    assert await other_worker.is_host_available(SOME_HOST)
+
+
+async def test_shared_memory_circuit_breaker_decays_failures_on_success(
+    build_circuit_breaker: typing.Callable[..., CircuitBreakerSharedMemory],
+) -> None:
+    worker: typing.Final = build_circuit_breaker(max_failure_count=3, success_decay_ratio=0.5)
+    for _ in range(3):
+        await worker.increment_failures_count(SOME_HOST)
+    await worker.record_success(SOME_HOST)
+    # 3 halved to 1, two more failures keep the circuit closed
+    assert await worker.increment_failures_count_and_check(SOME_HOST)
+    assert await worker.increment_failures_count_and_check(SOME_HOST)
+    assert not await worker.increment_failures_count_and_check(SOME_HOST)
+
+
+async def test_shared_memory_circuit_breaker_reuses_slots(
+    build_circuit_breaker: typing.Callable[..., CircuitBreakerSharedMemory],
+) -> None:
+    timer: typing.Final = FakeTimer(now=1000.0)
+    # one host per worker cache, two slots in the table
+    worker: typing.Final = build_circuit_breaker(timer=timer, max_cache_size=1)
+    first_host, second_host, third_host = (f"http://host-{index}.com/" for index in range(3))
+    for host in (first_host, second_host):
+        for _ in range(CIRCUIT_BREAKER_MAX_FAILURE_COUNT + 1):
+            await worker.increment_failures_count(host)
+        timer.now += 1
+    assert await worker.is_host_available(third_host)
+
+    # the crowded table hands over the slot expiring first
+    await worker.increment_failures_count(third_host)
+    assert await worker.is_host_available(first_host)
+    assert not await worker.is_host_available(second_host)
+
+    # expired slots are taken before live ones
+    timer.now += RESET_TIMEOUT_IN_SECONDS
+    for _ in range(CIRCUIT_BREAKER_MAX_FAILURE_COUNT + 1):
+        await worker.increment_failures_count(first_host)
+    await worker.increment_failures_count(second_host)
+    assert not await worker.is_host_available(first_host)
+
+
+async def test_shared_memory_circuit_breaker_rechecks_under_lock(
+    build_circuit_breaker: typing.Callable[..., CircuitBreakerSharedMemory],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    timer: typing.Final = FakeTimer(now=1000.0)
+    worker, other_worker = (
+        build_circuit_breaker(timer=timer, half_open_max_probes=HALF_OPEN_MAX_PROBES),
+        build_circuit_breaker(timer=timer, half_open_max_probes=HALF_OPEN_MAX_PROBES),
+    )
+    for _ in range(CIRCUIT_BREAKER_MAX_FAILURE_COUNT + 1):
+        await worker.increment_failures_count(SOME_HOST)
+    timer.now += RESET_TIMEOUT_IN_SECONDS
+    flock: typing.Final = fcntl.flock
+    races: typing.Final[list[typing.Callable[[], typing.Awaitable[typing.Any]]]] = []
+
+    def racing_flock(fd: int, operation: int) -> None:
+        # another process changes the host between the lock-free read and the lock
+        if operation == fcntl.LOCK_EX and races:
+            race_thread = threading.Thread(target=asyncio.run, args=(races.pop()(),))
+            race_thread.start()
+            race_thread.join()
+        flock(fd, operation)
+
+    monkeypatch.setattr(fcntl, "flock", racing_flock)
+
+    # the other worker took the last probes
+    races.append(lambda: other_worker.are_hosts_available([SOME_HOST] * HALF_OPEN_MAX_PROBES))
+    assert not await worker.is_host_available(SOME_HOST)
+
+    # the other worker closed the circuit first
+    races.append(lambda: other_worker.record_success(SOME_HOST))
+    assert await worker.is_host_available(SOME_HOST)
+
+    for _ in range(CIRCUIT_BREAKER_MAX_FAILURE_COUNT + 1):
+        await worker.increment_failures_count(SOME_HOST)
+    timer.now += RESET_TIMEOUT_IN_SECONDS
+    races.append(lambda: other_worker.record_success(SOME_HOST))
+    await worker.record_success(SOME_HOST)
+    assert [await worker.is_host_available(SOME_HOST) for _ in range(HALF_OPEN_MAX_PROBES + 1)] == [True] * 3
+
+
+def test_shared_memory_circuit_breaker_size_mismatch(
+    build_circuit_breaker: typing.Callable[..., CircuitBreakerSharedMemory],
+) -> None:
+    build_circuit_breaker()
+    # smaller and larger tables alike, every worker has to probe the same slots
+    for max_cache_size in (1, MAX_CACHE_SIZE * 2):
+        with pytest.raises(ValueError, match="max_cache_size must match"):
+            build_circuit_breaker(max_cache_size=max_cache_size)
+
+
+async def test_shared_memory_circuit_breaker_repairs_torn_slots(
+    build_circuit_breaker: typing.Callable[..., CircuitBreakerSharedMemory],
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    worker: typing.Final = build_circuit_breaker(max_cache_size=1)
+    # a writer died mid-write and left every sequence odd
+    for offset in range(HEADER_SIZE, len(worker.buffer), SLOT_SIZE):
+        struct.pack_into("=Q", worker.buffer, offset, 1)
+    assert await worker.is_host_available(SOME_HOST)
+    assert "stays written" in caplog.text
+
+    caplog.clear()
+    for _ in range(CIRCUIT_BREAKER_MAX_FAILURE_COUNT + 1):
+        await worker.increment_failures_count(SOME_HOST)
+    caplog.clear()
+    assert not await worker.is_host_available(SOME_HOST)
+    assert "stays written" not in caplog.text
+
+
+def fail_in_worker(name: str, lock_path: pathlib.Path) -> None:  # pragma: no cover
+    circuit_breaker: typing.Final = CircuitBreakerSharedMemory(
+        reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+        max_failure_count=CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+        max_cache_size=MAX_CACHE_SIZE,
+        name=name,
+        lock_path=lock_path,
+    )
+    for _ in range(CIRCUIT_BREAKER_MAX_FAILURE_COUNT + 1):
+        asyncio.run(circuit_breaker.increment_failures_count(SOME_HOST))
+    circuit_breaker.close()
+
+
+async def test_shared_memory_circuit_breaker_across_processes(
+    build_circuit_breaker: typing.Callable[..., CircuitBreakerSharedMemory],
+) -> None:
+    worker: typing.Final = build_circuit_breaker()
+    assert worker.lock_path is not None
+    process: typing.Final = multiprocessing.get_context("spawn").Process(
+        target=fail_in_worker, args=(worker.name, worker.lock_path)
+    )
+    process.start()
+    await asyncio.to_thread(process.join)
+    assert process.exitcode == 0
+    # the table outlives the worker that wrote to it
+    assert not await worker.is_host_available(SOME_HOST)
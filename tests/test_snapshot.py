@@ -0,0 +1,123 @@
+import asyncio
+import pathlib
+import time
+import typing
+
+import pytest
+
+from circuit_breaker_box import CircuitBreakerFastInMemory, CircuitBreakerInMemory, SnapshotFile
+from circuit_breaker_box.snapshot import HostSnapshot, dump_snapshot, load_snapshot
+from tests.conftest import (
+    CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+    FLUSH_INTERVAL_IN_SECONDS,
+    HALF_OPEN_MAX_PROBES,
+    MAX_CACHE_SIZE,
+    MAX_RETRIES,
+    OTHER_HOST,
+    RESET_TIMEOUT_IN_SECONDS,
+    SOME_HOST,
+    FakeTimer,
+)
+
+
+def build_circuit_breakers() -> list[CircuitBreakerInMemory | CircuitBreakerFastInMemory]:
+    return [
+        CircuitBreakerInMemory(
+            reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+            max_failure_count=CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+            max_cache_size=MAX_CACHE_SIZE,
+            half_open_max_probes=HALF_OPEN_MAX_PROBES,
+        ),
+        CircuitBreakerFastInMemory(
+            reset_timeout_in_seconds=RESET_TIMEOUT_IN_SECONDS,
+            max_failure_count=CIRCUIT_BREAKER_MAX_FAILURE_COUNT,
+            max_cache_size=MAX_CACHE_SIZE,
+            half_open_max_probes=HALF_OPEN_MAX_PROBES,
+            timer=FakeTimer(now=time.monotonic()),
+        ),
+    ]
+
+
+@pytest.mark.parametrize("index", [0, 1], ids=["in_memory", "fast_in_memory"])
+async def test_circuit_breaker_snapshot(index: int) -> None:
+    circuit_breaker, restarted_circuit_breaker = build_circuit_breakers()[index], build_circuit_breakers()[index]
+    for _ in range(MAX_RETRIES):
+        await circuit_breaker.increment_failures_count(SOME_HOST)
+    await circuit_breaker.increment_failures_count(OTHER_HOST)
+
+    # a restarted process keeps bans and counts, expiry is carried over as absolute time
+    restarted_circuit_breaker.import_snapshot(circuit_breaker.export_snapshot())
+    assert not await restarted_circuit_breaker.is_host_available(SOME_HOST)
+    assert await restarted_circuit_breaker.increment_failures_count_and_check(OTHER_HOST) is False
+    (some_host,) = [host for host in load_snapshot(circuit_breaker.export_snapshot()) if host.host == SOME_HOST]
+    (restored_some_host,) = [
+        host for host in load_snapshot(restarted_circuit_breaker.export_snapshot()) if host.host == SOME_HOST
+    ]
+    assert restored_some_host.failures_expire_at == pytest.approx(some_host.failures_expire_at, abs=0.01)
+    assert restored_some_host.half_open_expire_at == pytest.approx(some_host.half_open_expire_at, abs=0.01)
+
+    # the open period lapses, the restored half-open window admits probes
+    now: typing.Final = time.time()
+    restarted_circuit_breaker = build_circuit_breakers()[index]
+    restarted_circuit_breaker.import_snapshot(
+        dump_snapshot(
+            [
+                HostSnapshot(
+                    host=SOME_HOST,
+                    failures_count=MAX_RETRIES,
+                    failures_expire_at=now - 1,
+                    half_open_expire_at=now + RESET_TIMEOUT_IN_SECONDS,
+                ),
+                HostSnapshot(host=OTHER_HOST, failures_count=MAX_RETRIES, failures_expire_at=now - 1),
+            ]
+        )
+    )
+    assert [await restarted_circuit_breaker.is_host_available(SOME_HOST) for _ in range(HALF_OPEN_MAX_PROBES + 1)] == [
+        True
+    ] * HALF_OPEN_MAX_PROBES + [False]
+    assert await restarted_circuit_breaker.is_host_available(OTHER_HOST)
+
+    # hosts already tracked are kept
+    restarted_circuit_breaker.import_snapshot(
+        dump_snapshot([HostSnapshot(host=SOME_HOST, failures_count=1, failures_expire_at=now + 1)])
+    )
+    assert not await restarted_circuit_breaker.is_host_available(SOME_HOST)
+
+
+def test_load_snapshot_rejects_unreadable_snapshots() -> None:
+    for snapshot in (b"{}", b'{"version":0,"hosts":[]}', b'{"version":1,"hosts":[1]}', b"not json"):
+        with pytest.raises(ValueError, match="snapshot"):
+            load_snapshot(snapshot)
+
+
+async def test_snapshot_file(tmp_path: pathlib.Path) -> None:
+    circuit_breaker, restarted_circuit_breaker = build_circuit_breakers()
+    path = tmp_path / "circuit-breaker.json"
+    snapshot_file = SnapshotFile(
+        circuit_breaker=circuit_breaker, path=path, interval_in_seconds=FLUSH_INTERVAL_IN_SECONDS
+    )
+    assert not snapshot_file.load()
+
+    # saved periodically and on stop
+    snapshot_file.start()
+    snapshot_file.start()
+    for _ in range(MAX_RETRIES):
+        await circuit_breaker.increment_failures_count(SOME_HOST)
+    await asyncio.sleep(FLUSH_INTERVAL_IN_SECONDS * 5)
+    assert load_snapshot(path.read_bytes())
+    await snapshot_file.stop()
+    assert snapshot_file.save_task is None
+
+    assert SnapshotFile(circuit_breaker=restarted_circuit_breaker, path=path).load()
+    assert not await restarted_circuit_breaker.is_host_available(SOME_HOST)
+
+    # unreadable snapshots are ignored, failed saves are retried on the next interval
+    path.write_bytes(b"not json")
+    assert not SnapshotFile(circuit_breaker=restarted_circuit_breaker, path=path).load()
+    broken_snapshot_file = SnapshotFile(
+        circuit_breaker=circuit_breaker, path=tmp_path / "missing" / "circuit-breaker.json", interval_in_seconds=0
+    )
+    broken_snapshot_file.start()
+    await asyncio.sleep(FLUSH_INTERVAL_IN_SECONDS)
+    with pytest.raises(OSError):  # noqa: PT011
+        await broken_snapshot_file.stop()